@@ -7,6 +7,7 @@ from alembic import context
 
 
 from db.base import Base
+from db.partitions import is_partition_name
 from config.settings import get_settings
 
 
@@ -33,6 +34,15 @@ if config.config_file_name is not None:
 
 target_metadata = Base.metadata
 
+
+
+def include_name(name, type_, parent_names):
+    # yearly partitions are created by db.partitions, not by autogenerate
+    if type_ == "table":
+        return not is_partition_name(name)
+    return True
+
+
 # other values from the config, defined by the needs of env.py,
 # can be acquired:
 # my_important_option = config.get_main_option("my_important_option")
@@ -55,6 +65,7 @@ def run_migrations_offline() -> None:
     context.configure(
         url=url,
         target_metadata=target_metadata,
+        include_name=include_name,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
     )
@@ -78,7 +89,9 @@ def run_migrations_online() -> None:
 
     with connectable.connect() as connection:
         context.configure(
-            connection=connection, target_metadata=target_metadata
+            connection=connection,
+            target_metadata=target_metadata,
+            include_name=include_name,
         )
 
         with context.begin_transaction():
@@ -0,0 +1,94 @@
+"""Partition price tables by trading date
+
+Revision ID: 33a2d1efdd1b
+Revises: f1b657ebced3
+Create Date: 2026-10-18 16:02:40.118245
+
+"""
+from datetime import date
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '33a2d1efdd1b'
+down_revision: Union[str, Sequence[str], None] = 'f1b657ebced3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (table, surrogate key, unique constraint, date index)
+TABLES = (
+    ('equity_eod_prices', 'eod_price_id', 'uq_eod_equity_date', 'ix_eod_date_equity'),
+    ('equity_residual_quantities', 'residual_id', 'uq_residual_equity_date',
+     'ix_residual_date_equity'),
+)
+
+
+def _add_constraints(table, key, unique, index, primary_key):
+    op.execute(f"ALTER TABLE {table} ADD PRIMARY KEY ({primary_key})")
+    op.execute(
+        f"ALTER TABLE {table} ADD CONSTRAINT {unique} UNIQUE (equity_id, trading_date)"
+    )
+    op.execute(
+        f"ALTER TABLE {table} ADD FOREIGN KEY (equity_id) "
+        f"REFERENCES equities (equity_id)"
+    )
+    op.execute(
+        f"ALTER TABLE {table} ADD FOREIGN KEY (trading_date) "
+        f"REFERENCES trading_days (trading_date)"
+    )
+    op.execute(f"CREATE INDEX {index} ON {table} (trading_date, equity_id)")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+    # SQLite keeps plain tables
+    if bind.dialect.name != 'postgresql':
+        return
+
+    next_year = date.today().year + 1
+    for table, key, unique, index in TABLES:
+        old = f"{table}_unpartitioned"
+        op.execute(f"ALTER TABLE {table} RENAME TO {old}")
+        op.execute(f"ALTER INDEX {table}_pkey RENAME TO {old}_pkey")
+        op.execute(f"ALTER INDEX {unique} RENAME TO {unique}_unpartitioned")
+        op.execute(f"ALTER INDEX {index} RENAME TO {index}_unpartitioned")
+
+        # same columns and id sequence, partitioned by year
+        op.execute(
+            f"CREATE TABLE {table} (LIKE {old} INCLUDING DEFAULTS) "
+            f"PARTITION BY RANGE (trading_date)"
+        )
+        _add_constraints(table, key, unique, index, f"{key}, trading_date")
+
+        first = bind.execute(sa.text(f"SELECT min(trading_date) FROM {old}")).scalar()
+        for year in range(first.year if first else next_year - 1, next_year + 1):
+            op.execute(
+                f"CREATE TABLE {table}_{year} PARTITION OF {table} "
+                f"FOR VALUES FROM ('{year}-01-01') TO ('{year + 1}-01-01')"
+            )
+        op.execute(f"CREATE TABLE {table}_default PARTITION OF {table} DEFAULT")
+
+        op.execute(f"INSERT INTO {table} SELECT * FROM {old}")
+        op.execute(f"ALTER SEQUENCE {table}_{key}_seq OWNED BY {table}.{key}")
+        op.execute(f"DROP TABLE {old}")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    bind = op.get_bind()
+    if bind.dialect.name != 'postgresql':
+        return
+
+    for table, key, unique, index in TABLES:
+        plain = f"{table}_plain"
+        op.execute(f"CREATE TABLE {plain} (LIKE {table} INCLUDING DEFAULTS)")
+        op.execute(f"INSERT INTO {plain} SELECT * FROM {table}")
+        op.execute(f"ALTER SEQUENCE {table}_{key}_seq OWNED BY {plain}.{key}")
+        # drops every partition with it
+        op.execute(f"DROP TABLE {table}")
+        op.execute(f"ALTER TABLE {plain} RENAME TO {table}")
+        _add_constraints(table, key, unique, index, key)
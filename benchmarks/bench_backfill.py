@@ -0,0 +1,53 @@
+"""
+Benchmark EOD backfill: executemany upsert vs COPY into a staging table
+
+Usage: python -m benchmarks.bench_backfill --url postgresql+psycopg2://... --allow-drop [--equities 47] [--days 2500]
+"""
+
+import argparse
+import os
+import time
+
+from benchmarks.bench_eod_ingest import make_rows, setup
+from ingest.backfill import backfill
+from models.trading import EquityEODPrice
+
+
+def timed(url, equities, days, method, batch_size, allow_drop):
+    engine, db, equity_ids = setup(url, equities, days, allow_drop)
+    started = time.perf_counter()
+    if method == "copy":
+        backfill(db, EquityEODPrice, make_rows(equity_ids, days))
+    else:
+        EquityEODPrice.bulk_upsert(db, make_rows(equity_ids, days), batch_size=batch_size)
+    seconds = time.perf_counter() - started
+    db.close()
+    engine.dispose()
+    return seconds
+
+
+def run(url, equities, days, batch_size, allow_drop=False):
+    total = equities * days
+    if not url.startswith("postgresql"):
+        print("COPY needs PostgreSQL, backfill() falls back to executemany here")
+
+    executemany = timed(url, equities, days, "executemany", batch_size, allow_drop)
+    copy = timed(url, equities, days, "copy", batch_size, allow_drop)
+
+    print(f"rows: {total}")
+    print(f"executemany : {executemany:8.3f}s  {total / executemany:10.0f} rows/s")
+    print(f"copy        : {copy:8.3f}s  {total / copy:10.0f} rows/s")
+    print(f"speed-up    : {executemany / copy:8.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--equities", type=int, default=47)
+    parser.add_argument("--days", type=int, default=2500)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument(
+        "--url", default=os.environ.get("TEST_POSTGRES_URL", "sqlite:///:memory:")
+    )
+    parser.add_argument("--allow-drop", action="store_true")
+    args = parser.parse_args()
+    run(args.url, args.equities, args.days, args.batch_size, args.allow_drop)
@@ -0,0 +1,84 @@
+"""
+Benchmark EOD price ingestion: per-row create vs bulk_create
+
+Usage: python -m benchmarks.bench_eod_ingest [--equities 47] [--days 250] [--url URL --allow-drop]
+"""
+
+import argparse
+import time
+from datetime import date, timedelta
+
+from benchmarks.data import fresh_database
+from models.enums import CountryEnum
+from models.stocks import Company, Equity
+from models.trading import EquityEODPrice, TradingDay
+
+
+def trading_dates(days):
+    start = date(2015, 1, 1)
+    return [start + timedelta(days=offset) for offset in range(days)]
+
+
+def make_rows(equity_ids, days):
+    for trading_date in trading_dates(days):
+        for equity_id in equity_ids:
+            yield {
+                "equity_id": equity_id,
+                "trading_date": trading_date,
+                "open_price": 1000.0,
+                "high_price": 1050.0,
+                "low_price": 990.0,
+                "close_price": 1020.0,
+                "volume": 500,
+                "traded_value": 510000.0,
+            }
+
+
+def setup(url, equities, days, allow_drop=False):
+    engine, db = fresh_database(url, allow_drop)
+    company = Company.create(
+        db, company_name="Benchmark", country=CountryEnum.COTE_D_IVOIRE
+    )
+    equity_ids = [
+        Equity.create(
+            db, company_id=company.company_id, ticker=f"T{i:03}", isin=f"BM{i:010}"
+        ).equity_id
+        for i in range(equities)
+    ]
+    TradingDay.bulk_create(db, [{"trading_date": d} for d in trading_dates(days)])
+    return engine, db, equity_ids
+
+
+def run(url, equities, days, batch_size, allow_drop=False):
+    total = equities * days
+
+    engine, db, equity_ids = setup(url, equities, days, allow_drop)
+    started = time.perf_counter()
+    for row in make_rows(equity_ids, days):
+        EquityEODPrice.create(db, **row)
+    loop_seconds = time.perf_counter() - started
+    db.close()
+    engine.dispose()
+
+    engine, db, equity_ids = setup(url, equities, days, allow_drop)
+    started = time.perf_counter()
+    EquityEODPrice.bulk_create(db, make_rows(equity_ids, days), batch_size=batch_size)
+    bulk_seconds = time.perf_counter() - started
+    db.close()
+    engine.dispose()
+
+    print(f"rows: {total}")
+    print(f"create loop : {loop_seconds:8.3f}s  {total / loop_seconds:10.0f} rows/s")
+    print(f"bulk_create : {bulk_seconds:8.3f}s  {total / bulk_seconds:10.0f} rows/s")
+    print(f"speed-up    : {loop_seconds / bulk_seconds:8.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--equities", type=int, default=47)
+    parser.add_argument("--days", type=int, default=250)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--url", default="sqlite:///:memory:")
+    parser.add_argument("--allow-drop", action="store_true")
+    args = parser.parse_args()
+    run(args.url, args.equities, args.days, args.batch_size, args.allow_drop)
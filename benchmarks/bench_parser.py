@@ -0,0 +1,91 @@
+"""
+Benchmark the streaming bulletin parser on a synthetic corpus
+
+Usage: python -m benchmarks.bench_parser [--pages 2000] [--tickers 47] [--backend lxml]
+"""
+
+import argparse
+import random
+import resource
+import time
+from datetime import date, timedelta
+
+from ingest.parser import DEFAULT_BACKEND, parse_document
+
+
+def french(value: float, decimals: int = 0) -> str:
+    """Format a number the way BRVM bulletins do, e.g. 1 234,50."""
+    text = f"{value:,.{decimals}f}".replace(",", " ")
+    return text.replace(".", ",")
+
+
+def generate_bulletin(trading_date: date, tickers, rng: random.Random) -> bytes:
+    """One bulletin page with a price table and a residual table."""
+    prices = [
+        "<tr><th>Symbole</th><th>Nom</th><th>Volume</th><th>Valeur (FCFA)</th>"
+        "<th>Ouverture</th><th>Plus haut</th><th>Plus bas</th><th>Clôture</th></tr>"
+    ]
+    residuals = [
+        "<tr><th>Symbole</th><th>Prix achat</th><th>Qté achat</th>"
+        "<th>Prix vente</th><th>Qté vente</th></tr>"
+    ]
+    for ticker in tickers:
+        close = rng.uniform(500, 50000)
+        volume = rng.randint(0, 20000)
+        prices.append(
+            f"<tr><td>{ticker}</td><td>Société {ticker}</td>"
+            f"<td>{french(volume)}</td><td>{french(volume * close, 2)}</td>"
+            f"<td>{french(close * 0.99)}</td><td>{french(close * 1.02)}</td>"
+            f"<td>{french(close * 0.98)}</td><td>{french(close, 2)}</td></tr>"
+        )
+        residuals.append(
+            f"<tr><td>{ticker}</td><td>{french(close * 0.995)}</td>"
+            f"<td>{french(rng.randint(0, 500))}</td><td>{french(close * 1.005)}</td>"
+            f"<td>{french(rng.randint(0, 500))}</td></tr>"
+        )
+    html = (
+        f"<html><head><title>BOC {trading_date}</title></head><body>"
+        f"<table>{''.join(prices)}</table><table>{''.join(residuals)}</table>"
+        "</body></html>"
+    )
+    return html.encode("utf-8")
+
+
+def corpus(pages: int, tickers: int, seed: int = 0):
+    """Yield (trading_date, content) pairs without keeping them around."""
+    rng = random.Random(seed)
+    symbols = [f"T{i:03}" for i in range(tickers)]
+    start = date(2015, 1, 1)
+    for offset in range(pages):
+        trading_date = start + timedelta(days=offset)
+        yield trading_date, generate_bulletin(trading_date, symbols, rng)
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is reported in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run(pages: int, tickers: int, backend: str):
+    rows = 0
+    checkpoints = {pages // 10, pages // 2, pages}
+    parse_seconds = 0.0
+    for number, (trading_date, content) in enumerate(corpus(pages, tickers), 1):
+        started = time.perf_counter()
+        for _ in parse_document(content, trading_date, backend=backend):
+            rows += 1
+        parse_seconds += time.perf_counter() - started
+        if number in checkpoints:
+            print(f"{number:6} pages  peak RSS {peak_rss_mb():7.1f} MB")
+
+    print(f"backend: {backend}")
+    print(f"rows   : {rows} in {parse_seconds:.2f}s, {rows / parse_seconds:,.0f} rows/s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--pages", type=int, default=2000)
+    parser.add_argument("--tickers", type=int, default=47)
+    parser.add_argument("--backend", default=DEFAULT_BACKEND)
+    args = parser.parse_args()
+    run(args.pages, args.tickers, args.backend)
@@ -0,0 +1,67 @@
+"""
+Benchmark price history reads: ORM relationship traversal vs query.prices
+
+Usage: python -m benchmarks.bench_price_reads [--equities 47] [--days 2500] [--url URL --allow-drop]
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from benchmarks.bench_eod_ingest import make_rows, setup
+from models.stocks import Equity
+from models.trading import EquityEODPrice
+from query.prices import get_cross_section, get_price_history
+
+
+def timed(label, fn, rows):
+    started = time.perf_counter()
+    result = fn()
+    seconds = time.perf_counter() - started
+    print(f"{label:28}: {seconds:8.3f}s  {rows / seconds:12,.0f} rows/s")
+    return result, seconds
+
+
+def orm_traversal(db):
+    """What a consumer has to do today: walk Equity.eod_prices."""
+    db.expunge_all()
+    history = {}
+    for equity in db.query(Equity):
+        history[equity.ticker] = [
+            (price.trading_date, price.close_price) for price in equity.eod_prices
+        ]
+    return history
+
+
+def run(url, equities, days, allow_drop=False):
+    engine, db, equity_ids = setup(url, equities, days, allow_drop)
+    EquityEODPrice.bulk_create(db, make_rows(equity_ids, days), batch_size=5000)
+    total = equities * days
+    print(f"rows: {total}")
+
+    _, orm_seconds = timed("ORM eod_prices traversal", lambda: orm_traversal(db), total)
+    _, long_seconds = timed("get_price_history (long)", lambda: get_price_history(db), total)
+    matrix, wide_seconds = timed(
+        "get_price_history (wide)", lambda: get_price_history(db, wide=True), total
+    )
+    timed(
+        "get_cross_section",
+        lambda: get_cross_section(db, matrix.dates[-1].astype(object)),
+        equities,
+    )
+    assert np.isfinite(matrix.values["close_price"]).all()
+    print(f"speed-up vs ORM            : {orm_seconds / long_seconds:8.1f}x long, "
+          f"{orm_seconds / wide_seconds:.1f}x wide")
+    db.close()
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--equities", type=int, default=47)
+    parser.add_argument("--days", type=int, default=2500)
+    parser.add_argument("--url", default="sqlite:///:memory:")
+    parser.add_argument("--allow-drop", action="store_true")
+    args = parser.parse_args()
+    run(args.url, args.equities, args.days, args.allow_drop)
@@ -0,0 +1,122 @@
+"""
+Synthetic BRVM dataset for benchmarks: companies, equities, trading days
+and years of EOD / residual rows
+"""
+
+import random
+from datetime import date
+
+from sqlalchemy import create_engine, make_url
+from sqlalchemy.orm import Session, sessionmaker
+
+from db.base import Base
+from models.enums import CountryEnum
+from models.stocks import Company, Equity
+from models.trading import TradingDay
+from models.trading_calendar import generate_trading_days
+
+COUNTRIES = list(CountryEnum)
+
+
+def make_companies(count: int):
+    for number in range(count):
+        yield {
+            "company_name": f"Company {number:03}",
+            "country": COUNTRIES[number % len(COUNTRIES)],
+        }
+
+
+def make_equities(company_ids, count: int):
+    for number in range(count):
+        yield {
+            "company_id": company_ids[number % len(company_ids)],
+            "ticker": f"T{number:03}",
+            "isin": f"BM{number:010}",
+        }
+
+
+def make_trading_days(years: int, first_year: int = 2015) -> list[date]:
+    return generate_trading_days(date(first_year, 1, 1), date(first_year + years - 1, 12, 31))
+
+
+def make_eod_rows(equity_ids, days, seed: int = 0):
+    """
+    A daily random walk per equity, with consistent OHLC, volume and
+    traded value, in (trading_date, equity_id) order like a bulletin.
+    """
+    rng = random.Random(seed)
+    closes = {equity_id: rng.uniform(500, 20_000) for equity_id in equity_ids}
+    for trading_date in days:
+        for equity_id in equity_ids:
+            previous = closes[equity_id]
+            close = round(previous * (1 + rng.gauss(0, 0.015)), 2)
+            high = round(max(previous, close) * (1 + rng.uniform(0, 0.01)), 2)
+            low = round(min(previous, close) * (1 - rng.uniform(0, 0.01)), 2)
+            volume = rng.randint(0, 5_000)
+            closes[equity_id] = close
+            yield {
+                "equity_id": equity_id,
+                "trading_date": trading_date,
+                "open_price": previous,
+                "high_price": high,
+                "low_price": low,
+                "close_price": close,
+                "volume": volume,
+                "traded_value": round(volume * (high + low) / 2, 2),
+            }
+
+
+def make_residual_rows(equity_ids, days, seed: int = 0):
+    rng = random.Random(seed)
+    for trading_date in days:
+        for equity_id in equity_ids:
+            price = rng.uniform(500, 20_000)
+            yield {
+                "equity_id": equity_id,
+                "trading_date": trading_date,
+                "buy_price": round(price * 0.99, 2),
+                "buy_quantity": rng.randint(0, 1_000),
+                "sell_price": round(price * 1.01, 2),
+                "sell_quantity": rng.randint(0, 1_000),
+            }
+
+
+def populate_reference(db: Session, companies: int, equities: int, days) -> list[int]:
+    """
+    Store companies, equities and trading days. Returns the equity ids.
+    """
+    company_ids = [
+        Company.create(db, **row).company_id for row in make_companies(companies)
+    ]
+    equity_ids = [
+        Equity.create(db, **row).equity_id
+        for row in make_equities(company_ids, equities)
+    ]
+    TradingDay.bulk_create(db, [{"trading_date": day} for day in days])
+    return equity_ids
+
+
+def is_memory_database(url: str) -> bool:
+    parsed = make_url(url)
+    return parsed.get_backend_name() == "sqlite" and parsed.database in (
+        None,
+        "",
+        ":memory:",
+    )
+
+
+def fresh_database(url: str, allow_drop: bool = False):
+    """
+    Engine and session on an empty schema. Returns (engine, db).
+    Every table is dropped first, so any database but in-memory SQLite
+    needs `allow_drop`.
+    """
+    if not allow_drop and not is_memory_database(url):
+        raise ValueError(
+            f"Refusing to drop every table of {make_url(url).render_as_string()}; "
+            "pass --allow-drop for a throwaway database"
+        )
+    engine = create_engine(url)
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    return engine, sessionmaker(bind=engine)()
@@ -0,0 +1,186 @@
+"""
+Cold-start import benchmark built on `python -X importtime`
+
+Usage:
+  python -m benchmarks.startup run [--rounds 5] [--only MODULE ...] [--save PATH]
+  python -m benchmarks.startup compare BASELINE CURRENT [--threshold 0.25] [--metric min]
+
+Every round imports each module in a fresh interpreter and reads its
+cumulative import time from the -X importtime report. Results have the
+same shape as benchmarks.suite, so `compare` gates regressions the same
+way (status 1 when a key module got slower than the threshold). `run`
+also fails when a module pulls in something listed in DEFERRED for it.
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+from datetime import datetime
+from pathlib import Path
+
+from benchmarks.suite import _print_comparison, compare
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Entry points of CLI commands, workers and Alembic; key modules gate `compare`.
+# db.base registers every model for Alembic and create_all, so its time is
+# the whole model graph by design
+MODULES = {
+    "main": True,
+    "config.settings": False,
+    "db.session": True,
+    "db.base": True,
+    "ingest.jobs": True,
+    "metrics.summary": False,
+    "query.prices": False,
+}
+
+# Imports that must wait until first use
+DEFERRED = {
+    "main": ("sqlalchemy", "config.settings", "numpy", "pandas", "pyarrow"),
+    # config is loaded by every layer and depends on none of them
+    "config.settings": ("ingest", "sqlalchemy", "numpy", "pandas"),
+    "db.session": (
+        "config.settings",
+        "pydantic_settings",
+        "sqlalchemy.ext.asyncio",
+        "numpy",
+        "pandas",
+    ),
+    "db.base": ("config.settings", "sqlalchemy.ext.asyncio", "numpy", "pandas"),
+    "ingest.jobs": (
+        "config.settings",
+        "sqlalchemy.ext.asyncio",
+        "lxml",
+        "numpy",
+        "pandas",
+    ),
+    "metrics.summary": ("numpy", "pandas"),
+    "query.prices": ("numpy", "pandas"),
+}
+
+
+def parse_importtime(report: str) -> dict[str, tuple[int, int]]:
+    """
+    (self, cumulative) microseconds per imported module from the stderr
+    of `python -X importtime`, keeping the first import of each name.
+    """
+    times = {}
+    for line in report.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        if not self_us.strip().isdigit():
+            continue  # header
+        times.setdefault(name.strip(), (int(self_us), int(cumulative_us)))
+    return times
+
+
+def import_times(module: str) -> dict[str, tuple[int, int]]:
+    """Import `module` in a new interpreter and return its importtime report."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT,
+        env={**os.environ, "PYTHONPATH": str(ROOT)},
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr[-2000:]}")
+    return parse_importtime(result.stderr)
+
+
+def measure(module: str, rounds: int, warmup: int = 1) -> dict:
+    """
+    Cumulative import time of `module` in seconds over `rounds` fresh
+    interpreters, after `warmup` that refresh the bytecode caches.
+    """
+    times = []
+    for number in range(warmup + rounds):
+        report = import_times(module)
+        if number >= warmup:
+            times.append(report[module][1] / 1e6)
+    heaviest = sorted(
+        ((name, self_us) for name, (self_us, _) in report.items()),
+        key=lambda item: -item[1],
+    )[:10]
+    return {
+        "key": MODULES.get(module, False),
+        "rounds": rounds,
+        "min": min(times),
+        "max": max(times),
+        "mean": statistics.fmean(times),
+        "median": statistics.median(times),
+        "stddev": statistics.stdev(times) if len(times) > 1 else 0.0,
+        "modules": len(report),
+        "heaviest": heaviest,
+        "eager": sorted(set(DEFERRED.get(module, ())) & set(report)),
+    }
+
+
+def run_startup(rounds: int, only=None) -> dict:
+    results = {
+        module: measure(module, rounds)
+        for module in MODULES
+        if not only or module in only
+    }
+    return {
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "machine": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+        },
+        "params": {"rounds": rounds},
+        "results": results,
+    }
+
+
+def _print_results(report: dict):
+    for module, result in report["results"].items():
+        eager = f"  EAGER: {', '.join(result['eager'])}" if result["eager"] else ""
+        print(
+            f"{module:20} median {result['median'] * 1000:8.1f} ms "
+            f"± {result['stddev'] * 1000:6.1f}  {result['modules']:5} modules{eager}"
+        )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="Time the imports")
+    run.add_argument("--rounds", type=int, default=5)
+    run.add_argument("--only", nargs="*", help="Modules to time")
+    run.add_argument("--save", help="Write the results as JSON to this path")
+
+    check = commands.add_parser("compare", help="Compare a run against a baseline")
+    check.add_argument("baseline")
+    check.add_argument("current")
+    check.add_argument("--threshold", type=float, default=0.25)
+    check.add_argument("--metric", choices=("min", "median", "mean"), default="min")
+
+    args = parser.parse_args(argv)
+    if args.command == "run":
+        report = run_startup(args.rounds, args.only)
+        if args.save:
+            with open(args.save, "w") as file:
+                json.dump(report, file, indent=2)
+                file.write("\n")
+        _print_results(report)
+        return 1 if any(r["eager"] for r in report["results"].values()) else 0
+
+    with open(args.baseline) as file:
+        baseline = json.load(file)
+    with open(args.current) as file:
+        current = json.load(file)
+    rows, regressions = compare(baseline, current, args.threshold, args.metric)
+    _print_comparison(rows, regressions, args.threshold)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,344 @@
+"""
+Data-layer benchmark suite with JSON baselines and a regression gate
+
+Usage:
+  python -m benchmarks.suite run [--scale small|full] [--rounds 5] [--url URL --allow-drop]
+                                [--only PREFIX ...] [--save PATH]
+  python -m benchmarks.suite compare BASELINE CURRENT [--threshold 0.25] [--metric min]
+
+`compare` exits with status 1 when a key case got slower than its
+baseline by more than the threshold (0.25 = 25%). Baselines live in
+benchmarks/baselines/ and only compare meaningfully with runs on the
+same machine, backend and scale; re-record them after an intended change.
+"""
+
+import argparse
+import gc
+import json
+import platform
+import statistics
+import sys
+import time
+from datetime import date, datetime
+from typing import Callable, NamedTuple
+
+import numpy as np
+import sqlalchemy
+from sqlalchemy import delete, func, select
+
+from benchmarks.data import (
+    fresh_database,
+    make_eod_rows,
+    make_residual_rows,
+    make_trading_days,
+    populate_reference,
+)
+from ingest.backfill import backfill
+from ingest.validation import check_eod
+from models.trading import EquityEODPrice, EquityResidualQuantity, TradingDay
+from models.trading_calendar import generate_trading_days, materialize_calendar
+from query.prices import get_cross_section, get_price_history
+
+SCALES = {
+    "small": {"companies": 10, "equities": 20, "years": 1},
+    "full": {"companies": 40, "equities": 47, "years": 10},
+}
+
+# Far from the benchmark data so materializing it never collides
+CALENDAR_START, CALENDAR_END = date(2100, 1, 1), date(2129, 12, 31)
+
+
+class Case(NamedTuple):
+    name: str
+    fn: Callable
+    setup: Callable | None
+    # calls per timed round, for operations too quick to time alone
+    iterations: int
+    # regressions of key cases fail `compare`
+    key: bool
+
+
+CASES: list[Case] = []
+
+
+def case(name: str, setup=None, iterations: int = 1, key: bool = True):
+    """Register fn(ctx) as a benchmark; returns the number of rows it handled."""
+
+    def register(fn):
+        CASES.append(Case(name, fn, setup, iterations, key))
+        return fn
+
+    return register
+
+
+class Context:
+    def __init__(self, url: str, scale: str, allow_drop: bool = False):
+        self.scale = SCALES[scale]
+        self.engine, self.db = fresh_database(url, allow_drop)
+        self.days = make_trading_days(self.scale["years"])
+        self.equity_ids = populate_reference(
+            self.db, self.scale["companies"], self.scale["equities"], self.days
+        )
+        self.eod_rows = list(make_eod_rows(self.equity_ids, self.days))
+        self.residual_rows = list(make_residual_rows(self.equity_ids, self.days))
+        # (equity, day) pairs for single-row creates, on days outside the data
+        single_days = make_trading_days(1, first_year=1990)
+        TradingDay.bulk_create(self.db, [{"trading_date": d} for d in single_days])
+        self.single_rows = iter(make_eod_rows(self.equity_ids, single_days, seed=1))
+
+    def close(self):
+        self.db.close()
+        self.engine.dispose()
+
+
+def _clear(model):
+    def setup(ctx):
+        ctx.db.execute(delete(model))
+        ctx.db.commit()
+
+    return setup
+
+
+def _load(model, attribute: str):
+    """Store ctx.<attribute> in `model`'s table unless it already holds it."""
+
+    def setup(ctx):
+        rows = getattr(ctx, attribute)
+        stored = ctx.db.scalar(select(func.count()).select_from(model))
+        if stored != len(rows):
+            ctx.db.execute(delete(model))
+            ctx.db.commit()
+            backfill(ctx.db, model, rows, publish=False)
+
+    return setup
+
+
+_load_eod = _load(EquityEODPrice, "eod_rows")
+
+
+def _clear_calendar(ctx):
+    ctx.db.execute(
+        delete(TradingDay).where(
+            TradingDay.trading_date.between(CALENDAR_START, CALENDAR_END)
+        )
+    )
+    ctx.db.commit()
+
+
+@case("create.eod_price", iterations=50)
+def create_eod_price(ctx):
+    EquityEODPrice.create(ctx.db, **next(ctx.single_rows))
+    return 1
+
+
+@case("bulk.eod_insert", setup=_clear(EquityEODPrice))
+def bulk_eod_insert(ctx):
+    results = EquityEODPrice.bulk_create(ctx.db, ctx.eod_rows, batch_size=5000)
+    return sum(result["inserted"] for result in results)
+
+
+@case("bulk.eod_upsert_unchanged", setup=_load_eod)
+def bulk_eod_upsert_unchanged(ctx):
+    results = EquityEODPrice.bulk_upsert(ctx.db, ctx.eod_rows, batch_size=5000)
+    return sum(result["inserted"] + result["conflicts"] for result in results)
+
+
+@case("validate.eod", key=False)
+def validate_eod(ctx):
+    return len(check_eod(ctx.eod_rows))
+
+
+@case("bulk.residual_backfill", setup=_clear(EquityResidualQuantity))
+def bulk_residual_backfill(ctx):
+    return backfill(ctx.db, EquityResidualQuantity, ctx.residual_rows)["rows"]
+
+
+@case("read.price_history", setup=_load_eod)
+def read_price_history(ctx):
+    matrix = get_price_history(ctx.db, wide=True)
+    return int(np.count_nonzero(~np.isnan(matrix.values["close_price"])))
+
+
+@case("read.price_history_one_ticker", setup=_load_eod, iterations=10)
+def read_price_history_one_ticker(ctx):
+    return len(get_price_history(ctx.db, tickers=["T000"])["close_price"])
+
+
+@case("read.cross_section", setup=_load_eod, iterations=20)
+def read_cross_section(ctx):
+    return len(get_cross_section(ctx.db, ctx.days[-1])["close_price"])
+
+
+@case("calendar.generate", iterations=5)
+def calendar_generate(ctx):
+    return len(generate_trading_days(CALENDAR_START, CALENDAR_END))
+
+
+@case("calendar.materialize", setup=_clear_calendar)
+def calendar_materialize(ctx):
+    return materialize_calendar(ctx.db, CALENDAR_START, CALENDAR_END)
+
+
+def measure(ctx: Context, bench: Case, rounds: int, warmup: int = 1) -> dict:
+    """
+    Time `rounds` rounds of `bench` after `warmup` untimed ones, with the
+    garbage collector paused so its pauses don't land in one round. Times
+    are per call, in seconds.
+    """
+    times, rows = [], 0
+    for number in range(warmup + rounds):
+        if bench.setup is not None:
+            bench.setup(ctx)
+        gc.collect()
+        gc.disable()
+        try:
+            started = time.perf_counter()
+            handled = sum(bench.fn(ctx) or 0 for _ in range(bench.iterations))
+            elapsed = (time.perf_counter() - started) / bench.iterations
+        finally:
+            gc.enable()
+        if number >= warmup:
+            times.append(elapsed)
+            rows = handled // bench.iterations
+    median = statistics.median(times)
+    return {
+        "key": bench.key,
+        "rounds": rounds,
+        "iterations": bench.iterations,
+        "min": min(times),
+        "max": max(times),
+        "mean": statistics.fmean(times),
+        "median": median,
+        "stddev": statistics.stdev(times) if len(times) > 1 else 0.0,
+        "rows": rows,
+        "rows_per_second": rows / median if median else 0.0,
+    }
+
+
+def run_suite(
+    url: str, scale: str, rounds: int, only=None, allow_drop: bool = False
+) -> dict:
+    ctx = Context(url, scale, allow_drop)
+    results = {}
+    try:
+        for bench in CASES:
+            if only and not any(bench.name.startswith(prefix) for prefix in only):
+                continue
+            results[bench.name] = measure(ctx, bench, rounds)
+    finally:
+        ctx.close()
+    return {
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "machine": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "sqlalchemy": sqlalchemy.__version__,
+        },
+        "params": {
+            "backend": sqlalchemy.make_url(url).get_backend_name(),
+            "scale": scale,
+            "rounds": rounds,
+            **SCALES[scale],
+        },
+        "results": results,
+    }
+
+
+def compare(baseline: dict, current: dict, threshold: float, metric: str = "min"):
+    """
+    Compare two suite runs. Returns (rows, regressions): one
+    (name, baseline, current, ratio, status) row per case, and the names
+    of key cases slower than baseline by more than `threshold`.
+    """
+    rows, regressions = [], []
+    for name, before in baseline["results"].items():
+        after = current["results"].get(name)
+        if after is None:
+            rows.append((name, before[metric], None, None, "missing"))
+            if before["key"]:
+                regressions.append(name)
+            continue
+        ratio = after[metric] / before[metric] if before[metric] else 1.0
+        if ratio > 1 + threshold:
+            status = "REGRESSED" if before["key"] else "slower"
+            if before["key"]:
+                regressions.append(name)
+        elif ratio < 1 - threshold:
+            status = "faster"
+        else:
+            status = "ok"
+        rows.append((name, before[metric], after[metric], ratio, status))
+    return rows, regressions
+
+
+def _print_results(report: dict):
+    params = report["params"]
+    print(f"{params['backend']} / {params['scale']} scale, {params['rounds']} rounds")
+    for name, result in report["results"].items():
+        print(
+            f"{name:32} median {result['median'] * 1000:10.3f} ms "
+            f"± {result['stddev'] * 1000:8.3f}  {result['rows_per_second']:12,.0f} rows/s"
+        )
+
+
+def _print_comparison(rows, regressions, threshold):
+    for name, before, after, ratio, status in rows:
+        after_text = f"{after * 1000:10.3f}" if after is not None else f"{'-':>10}"
+        ratio_text = f"{ratio:6.2f}x" if ratio is not None else f"{'-':>7}"
+        print(f"{name:32} {before * 1000:10.3f} -> {after_text} ms {ratio_text}  {status}")
+    if regressions:
+        print(f"{len(regressions)} key case(s) regressed by more than {threshold:.0%}")
+    else:
+        print("No key regressions")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="Run the suite")
+    run.add_argument("--url", default="sqlite:///:memory:")
+    run.add_argument(
+        "--allow-drop", action="store_true",
+        help="Drop and recreate the tables of a database other than in-memory SQLite",
+    )
+    run.add_argument("--scale", choices=SCALES, default="small")
+    run.add_argument("--rounds", type=int, default=5)
+    run.add_argument("--only", nargs="*", help="Case name prefixes to run")
+    run.add_argument("--save", help="Write the results as JSON to this path")
+
+    check = commands.add_parser("compare", help="Compare a run against a baseline")
+    check.add_argument("baseline")
+    check.add_argument("current")
+    check.add_argument("--threshold", type=float, default=0.25)
+    # the fastest round is the least disturbed by other load on the machine
+    check.add_argument("--metric", choices=("min", "median", "mean"), default="min")
+
+    args = parser.parse_args(argv)
+    if args.command == "run":
+        try:
+            report = run_suite(
+                args.url, args.scale, args.rounds, args.only, args.allow_drop
+            )
+        except ValueError as error:
+            parser.error(str(error))
+        if args.save:
+            with open(args.save, "w") as file:
+                json.dump(report, file, indent=2)
+                file.write("\n")
+        _print_results(report)
+        return 0
+
+    with open(args.baseline) as file:
+        baseline = json.load(file)
+    with open(args.current) as file:
+        current = json.load(file)
+    if baseline["params"] != current["params"]:
+        print(f"warning: parameters differ: {baseline['params']} vs {current['params']}")
+    rows, regressions = compare(baseline, current, args.threshold, args.metric)
+    _print_comparison(rows, regressions, args.threshold)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,5 @@
+"""
+Defaults shared by the settings and by modules that don't load them
+"""
+
+BRVM_BASE_URL = "https://www.brvm.org"
@@ -3,14 +3,17 @@ App settings
 """
 
 from pathlib import Path
-from pydantic_settings import BaseSettings
+from pydantic_settings import BaseSettings, SettingsConfigDict
 from pydantic import Field
 from functools import lru_cache
 
+from config.defaults import BRVM_BASE_URL
+
 BASE_DIR = Path(__file__).resolve().parent.parent.parent
 
 
 class Settings(BaseSettings):
+    model_config = SettingsConfigDict(env_file=".env")
 
     # === Environment ===
     ENV: str = Field(default="dev")
@@ -21,6 +24,27 @@ class Settings(BaseSettings):
     POSTGRES_PASSWORD: str
     POSTGRES_DB: str
     SQLITE_TEST_DATABASE_URI: str = "sqlite:///test.db"
+    DATABASE_REPLICA_URL: str | None = None
+    # === Connection pool ===
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30.0
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = False
+    DB_STATEMENT_TIMEOUT_MS: int = 0
+    DB_SERVER_SIDE_CURSORS: bool = False
+    # Count and time every statement per operation (db.instrument)
+    DB_INSTRUMENT: bool = False
+    # === Ingestion ===
+    BRVM_BASE_URL: str = BRVM_BASE_URL
+    INGEST_CONCURRENCY: int = 8
+    # Requests per second to one host in total; backfill workers split it
+    INGEST_RATE_PER_HOST: float = 4.0
+    INGEST_MAX_RETRIES: int = 3
+    # Raw page archive, disabled when empty
+    RAW_ARCHIVE_DIR: str = "data/raw"
+    # Memory-mapped price history (query.cache), disabled when empty
+    HISTORY_CACHE_DIR: str = "data/history"
 
     @property
     def DATABASE_URL(self) -> str:
@@ -35,9 +59,6 @@ class Settings(BaseSettings):
             f"{self.POSTGRES_DB}"
         )
 
-    class Config:
-        env_file = ".env"
-
 # Instantiate a global settings object
 
 
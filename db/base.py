@@ -5,4 +5,20 @@ base.py
 # Import all the models so Base has them before alembic
 # import thems
 
-from db.base_class import Base
+from db.base_class import Base  # noqa: F401
+from models.stocks import Company, Equity  # noqa: F401
+from models.trading import (  # noqa: F401
+    TradingDay,
+    EquityEODPrice,
+    EquityEODPriceRevision,
+    EquityResidualQuantity,
+)
+from models.metrics import EquityDailyMetric, MetricWatermark  # noqa: F401
+from models.jobs import BackfillShard  # noqa: F401
+from models.quality import QuarantinedRow  # noqa: F401
+from models.summary import (  # noqa: F401
+    MarketDailySummary,
+    MarketDailyMover,
+    MarketCountrySummary,
+)
+from models.changes import PriceChangeBatch  # noqa: F401
@@ -2,8 +2,39 @@
 Database setup
 """
 
+from typing import TYPE_CHECKING
+
 from sqlalchemy.orm import declarative_base
 
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+
+class AsyncWrites:
+    """
+    Async counterparts of the models' create / bulk classmethods.
+
+    Each runs the sync method on the AsyncSession's underlying Session
+    through run_sync, so queries are awaited on the event loop (no thread
+    pool) and the write logic lives in one place. The sync methods commit;
+    within async_unit_of_work that only releases a savepoint, so the
+    block's writes still roll back together.
+    """
+
+    @classmethod
+    async def acreate(cls, db: "AsyncSession", **kwargs):
+        return await db.run_sync(lambda session: cls.create(session, **kwargs))
+
+    @classmethod
+    async def abulk_create(cls, db: "AsyncSession", rows, **kwargs):
+        rows = list(rows)
+        return await db.run_sync(lambda session: cls.bulk_create(session, rows, **kwargs))
+
+    @classmethod
+    async def abulk_upsert(cls, db: "AsyncSession", rows, **kwargs):
+        rows = list(rows)
+        return await db.run_sync(lambda session: cls.bulk_upsert(session, rows, **kwargs))
+
 
 # Base model
-Base = declarative_base()
+Base = declarative_base(cls=AsyncWrites)
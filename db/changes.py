@@ -0,0 +1,281 @@
+"""
+Change feed of stored price and residual rows
+
+Writers publish (equity_id, trading_date, operation) events inside their
+transaction, so they are seen only once it commits. Events are encoded
+into compact text payloads, sent with NOTIFY on CHANNEL on PostgreSQL
+and stored as price_change_batches rows elsewhere. ChangeFeed subscribes
+to either and hands out deduplicated batches.
+
+Readers that poll updated_at instead use change_watermark().
+"""
+
+import time
+from datetime import date, datetime, timedelta
+from select import select as select_fds
+from typing import Iterable, NamedTuple
+
+from sqlalchemy import Engine, delete, func, insert, select
+from sqlalchemy.orm import Session
+
+from db.instrument import instrumented
+from models.changes import PriceChangeBatch
+from models.enums import ChangeOperationEnum
+
+CHANNEL = "price_changes"
+# NOTIFY payloads must stay under 8000 bytes
+PAYLOAD_LIMIT = 7900
+# outbox batches read per query
+OUTBOX_READ = 100
+# how long after its updated_at a write may still commit: PostgreSQL
+# stamps the transaction start, SQLite has one-second resolution
+CHANGE_OVERLAP = timedelta(minutes=5)
+
+_CODES = {ChangeOperationEnum.INSERT: "I", ChangeOperationEnum.UPDATE: "U"}
+_OPERATIONS = {code: operation for operation, code in _CODES.items()}
+
+
+class Change(NamedTuple):
+    table_name: str
+    equity_id: int
+    trading_date: date
+    operation: ChangeOperationEnum
+
+
+def encode(changes: Iterable[Change]) -> list[str]:
+    """
+    Payloads for `changes`: per table, the table name then one
+    "equity_id,YYYY-MM-DD,I|U" line per change, split under PAYLOAD_LIMIT.
+    """
+    payloads = []
+    lines, size, table = [], 0, None
+    for change in changes:
+        line = (
+            f"{change.equity_id},{change.trading_date.isoformat()},"
+            f"{_CODES[change.operation]}"
+        )
+        if change.table_name != table or size + len(line) + 1 > PAYLOAD_LIMIT:
+            if lines:
+                payloads.append("\n".join(lines))
+            table = change.table_name
+            lines, size = [table], len(table)
+        lines.append(line)
+        size += len(line) + 1
+    if lines:
+        payloads.append("\n".join(lines))
+    return payloads
+
+
+def decode(payload: str) -> list[Change]:
+    table, *lines = payload.split("\n")
+    changes = []
+    for line in lines:
+        equity_id, trading_date, code = line.split(",")
+        changes.append(
+            Change(
+                table,
+                int(equity_id),
+                date.fromisoformat(trading_date),
+                _OPERATIONS[code],
+            )
+        )
+    return changes
+
+
+@instrumented("publish_changes", batched=True)
+def publish_changes(db: Session, table_name: str, rows) -> int:
+    """
+    Publish the rows written to `table_name`, given as (equity_id,
+    trading_date, inserted) tuples. Doesn't commit: subscribers get the
+    changes when the caller's transaction commits. Returns the count.
+    """
+    changes = [
+        Change(
+            table_name,
+            equity_id,
+            trading_date,
+            ChangeOperationEnum.INSERT if inserted else ChangeOperationEnum.UPDATE,
+        )
+        for equity_id, trading_date, inserted in rows
+    ]
+    if not changes:
+        return 0
+    payloads = encode(changes)
+    if db.get_bind().dialect.name == "postgresql":
+        for payload in payloads:
+            db.execute(select(func.pg_notify(CHANNEL, payload)))
+    else:
+        db.execute(
+            insert(PriceChangeBatch),
+            [{"table_name": table_name, "payload": payload} for payload in payloads],
+        )
+    return len(changes)
+
+
+def prune_changes(db: Session, older_than: timedelta = timedelta(days=7)) -> int:
+    """
+    Delete outbox batches older than `older_than`, by the database clock
+    that stamps created_at, and commit.
+    """
+    cutoff = db.scalar(select(func.now())).replace(tzinfo=None) - older_than
+    deleted = db.execute(
+        delete(PriceChangeBatch).where(PriceChangeBatch.created_at < cutoff)
+    ).rowcount
+    db.commit()
+    return deleted
+
+
+def change_watermark(db: Session) -> datetime:
+    """
+    Database time from which the next poll of updated_at must re-read:
+    now less CHANGE_OVERLAP. Compare with >=; the rows in the overlap are
+    read again, so whatever consumes them must be idempotent.
+    """
+    return db.scalar(select(func.now())).replace(tzinfo=None) - CHANGE_OVERLAP
+
+
+def merge_changes(changes: Iterable[Change]) -> list[Change]:
+    """
+    One change per row, in first-seen order. A row inserted then
+    updated is still new to a consumer, so INSERT wins.
+    """
+    merged = {}
+    for change in changes:
+        key = change[:3]
+        previous = merged.get(key)
+        if previous is None or change.operation is ChangeOperationEnum.INSERT:
+            merged[key] = change
+    return list(merged.values())
+
+
+class ChangeFeed:
+    """
+    Subscription to the changes committed from now on. Each poll()
+    returns one deduplicated batch; iterating yields batches forever.
+
+    Listens on PostgreSQL with its own connection; elsewhere the outbox
+    is read after the last batch_id seen, every `poll_interval` seconds.
+    `bind` is an Engine, or for the outbox also a Connection.
+    """
+
+    def __init__(
+        self,
+        bind,
+        tables: Iterable[str] | None = None,
+        # stop collecting once this many changes are pending
+        batch_size: int = 1000,
+        linger: float = 0.2,
+        poll_interval: float = 1.0,
+    ):
+        self.tables = set(tables) if tables is not None else None
+        self.batch_size = batch_size
+        # how long to keep collecting once a first change arrived
+        self.linger = linger
+        self.poll_interval = poll_interval
+        self._pending = []
+        self._notify = bind.dialect.name == "postgresql"
+        if self._notify:
+            if not isinstance(bind, Engine):
+                raise ValueError("LISTEN needs an Engine to open its own connection")
+            self._raw = bind.raw_connection()
+            self._listener = self._raw.driver_connection
+            self._listener.autocommit = True
+            with self._listener.cursor() as cursor:
+                cursor.execute(f"LISTEN {CHANNEL}")
+        else:
+            self._owned = isinstance(bind, Engine)
+            self._connection = bind.connect() if self._owned else bind
+            [(last,)] = self._read_outbox(select(func.max(PriceChangeBatch.batch_id)))
+            self.position = last or 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        if self._notify:
+            with self._listener.cursor() as cursor:
+                cursor.execute(f"UNLISTEN {CHANNEL}")
+            # back to the pool as it was taken
+            self._listener.autocommit = False
+            self._raw.close()
+        elif self._owned:
+            self._connection.close()
+
+    def _read_outbox(self, statement) -> list:
+        rows = self._connection.execute(statement).all()
+        if self._owned:
+            # don't hold a read transaction between polls
+            self._connection.commit()
+        return rows
+
+    def _fetch(self, timeout: float) -> list[Change]:
+        """Changes that arrive within `timeout` seconds, possibly none."""
+        if self._notify:
+            if not self._listener.notifies:
+                ready, _, _ = select_fds([self._listener], [], [], timeout)
+                if ready:
+                    self._listener.poll()
+            changes = []
+            while self._listener.notifies:
+                changes.extend(decode(self._listener.notifies.pop(0).payload))
+            return changes
+
+        deadline = time.monotonic() + timeout
+        while True:
+            statement = (
+                select(PriceChangeBatch.batch_id, PriceChangeBatch.payload)
+                .where(PriceChangeBatch.batch_id > self.position)
+                .order_by(PriceChangeBatch.batch_id)
+                .limit(OUTBOX_READ)
+            )
+            if self.tables is not None:
+                statement = statement.where(
+                    PriceChangeBatch.table_name.in_(self.tables)
+                )
+            rows = self._read_outbox(statement)
+            if rows:
+                self.position = rows[-1][0]
+                return [change for _, payload in rows for change in decode(payload)]
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return []
+            time.sleep(min(self.poll_interval, remaining))
+
+    def poll(self, timeout: float | None = None) -> list[Change]:
+        """
+        Wait up to `timeout` seconds (forever when None) for a change, then
+        up to `linger` more for others, and return them deduplicated;
+        an empty list when nothing arrived.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not self._pending:
+            remaining = 3600.0 if deadline is None else deadline - time.monotonic()
+            self._pending = self._accept(self._fetch(max(remaining, 0.0)))
+            if not self._pending and deadline is not None and remaining <= 0:
+                return []
+
+        ready = time.monotonic() + self.linger
+        while len(self._pending) < self.batch_size:
+            remaining = ready - time.monotonic()
+            if remaining <= 0:
+                break
+            changes = self._accept(self._fetch(remaining))
+            if not changes and not self._notify:
+                break
+            self._pending.extend(changes)
+
+        batch = merge_changes(self._pending)
+        self._pending = []
+        return batch
+
+    def _accept(self, changes):
+        if self.tables is None:
+            return changes
+        return [change for change in changes if change.table_name in self.tables]
+
+    def __iter__(self):
+        while True:
+            yield self.poll()
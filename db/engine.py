@@ -0,0 +1,284 @@
+"""
+Engine construction, pool metrics and unit-of-work helpers
+"""
+
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import TYPE_CHECKING
+
+from sqlalchemy import create_engine, event, exc
+from sqlalchemy.engine import URL, Engine, make_url
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+if TYPE_CHECKING:
+    # sqlalchemy.ext.asyncio loads asyncio; imported when first needed
+    from sqlalchemy.ext.asyncio import AsyncEngine
+
+# Async driver used for each sync driver's backend
+ASYNC_DRIVERS = {"postgresql": "asyncpg", "sqlite": "aiosqlite"}
+
+
+class PoolMetrics:
+    """
+    Running totals of connection checkouts for one pool. Checkout time
+    covers waiting for a free connection plus opening a new one.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.peak_checked_out = 0
+
+    def record(self, wait: float, checked_out: int):
+        with self._lock:
+            self.checkouts += 1
+            self.wait_total += wait
+            self.wait_max = max(self.wait_max, wait)
+            self.peak_checked_out = max(self.peak_checked_out, checked_out)
+
+    def record_timeout(self):
+        with self._lock:
+            self.timeouts += 1
+
+
+class TimedQueuePool(QueuePool):
+    """
+    QueuePool that times every checkout into a PoolMetrics.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.metrics = PoolMetrics()
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            connection = super().connect()
+        except exc.TimeoutError:
+            self.metrics.record_timeout()
+            raise
+        self.metrics.record(time.perf_counter() - started, self.checkedout())
+        return connection
+
+    def recreate(self):
+        # keep the totals across engine.dispose()
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+
+class TimedAsyncQueuePool(TimedQueuePool, AsyncAdaptedQueuePool):
+    """
+    TimedQueuePool for async engines.
+    """
+
+
+def _emit_sqlite_begin(sync_engine: Engine):
+    # the driver delays BEGIN until the first write, so a SAVEPOINT opened
+    # first would run outside the transaction; emit BEGIN ourselves
+    @event.listens_for(sync_engine, "connect")
+    def disable_driver_begin(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+
+    @event.listens_for(sync_engine, "begin")
+    def begin(connection):
+        connection.exec_driver_sql("BEGIN")
+
+
+def build_engine(
+    url: str,
+    *,
+    pool_size: int = 5,
+    max_overflow: int = 10,
+    pool_timeout: float = 30.0,
+    pool_recycle: int = 1800,
+    pre_ping: bool = False,
+    statement_timeout: int = 0,
+    server_side_cursors: bool = False,
+    read_only: bool = False,
+) -> Engine:
+    """
+    Create an engine with an instrumented, sized pool.
+    statement_timeout is in milliseconds (0 disables it) and, like
+    read_only, is applied per session on PostgreSQL only. With
+    server_side_cursors every query streams its results.
+    """
+    kwargs = {"pool_pre_ping": pre_ping}
+    if server_side_cursors:
+        kwargs["execution_options"] = {"stream_results": True}
+
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    # in-memory SQLite keeps one connection per thread, there is no pool to size
+    if backend != "sqlite" or parsed.database not in (None, "", ":memory:"):
+        kwargs.update(
+            poolclass=TimedQueuePool,
+            pool_size=pool_size,
+            max_overflow=max_overflow,
+            pool_timeout=pool_timeout,
+            pool_recycle=pool_recycle,
+        )
+
+    if backend == "postgresql":
+        options = []
+        if statement_timeout:
+            options.append(f"-c statement_timeout={int(statement_timeout)}")
+        if read_only:
+            options.append("-c default_transaction_read_only=on")
+        if options:
+            kwargs["connect_args"] = {"options": " ".join(options)}
+
+    return create_engine(url, **kwargs)
+
+
+def async_url(url) -> URL:
+    """
+    The same database URL with the backend's async driver, e.g.
+    postgresql+psycopg2://... -> postgresql+asyncpg://...
+    """
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver configured for '{backend}'")
+    return parsed.set(drivername=f"{backend}+{ASYNC_DRIVERS[backend]}")
+
+
+def build_async_engine(
+    url: str,
+    *,
+    pool_size: int = 5,
+    max_overflow: int = 10,
+    pool_timeout: float = 30.0,
+    pool_recycle: int = 1800,
+    pre_ping: bool = False,
+    statement_timeout: int = 0,
+    read_only: bool = False,
+) -> "AsyncEngine":
+    """
+    Async counterpart of build_engine. `url` may name the sync driver,
+    it is switched to the backend's async driver.
+    """
+    parsed = async_url(url)
+    kwargs = {"pool_pre_ping": pre_ping}
+
+    backend = parsed.get_backend_name()
+    # in-memory SQLite shares a single connection, there is no pool to size
+    if backend != "sqlite" or parsed.database not in (None, "", ":memory:"):
+        kwargs.update(
+            poolclass=TimedAsyncQueuePool,
+            pool_size=pool_size,
+            max_overflow=max_overflow,
+            pool_timeout=pool_timeout,
+            pool_recycle=pool_recycle,
+        )
+
+    if backend == "postgresql":
+        server_settings = {}
+        if statement_timeout:
+            server_settings["statement_timeout"] = str(int(statement_timeout))
+        if read_only:
+            server_settings["default_transaction_read_only"] = "on"
+        if server_settings:
+            kwargs["connect_args"] = {"server_settings": server_settings}
+
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    engine = create_async_engine(parsed, **kwargs)
+    if backend == "sqlite":
+        # async_unit_of_work runs the session in a savepoint
+        _emit_sqlite_begin(engine.sync_engine)
+    return engine
+
+
+def _pool_settings(settings, kwargs: dict) -> dict:
+    kwargs.setdefault("pool_size", settings.DB_POOL_SIZE)
+    kwargs.setdefault("max_overflow", settings.DB_MAX_OVERFLOW)
+    kwargs.setdefault("pool_timeout", settings.DB_POOL_TIMEOUT)
+    kwargs.setdefault("pool_recycle", settings.DB_POOL_RECYCLE)
+    kwargs.setdefault("pre_ping", settings.DB_POOL_PRE_PING)
+    kwargs.setdefault("statement_timeout", settings.DB_STATEMENT_TIMEOUT_MS)
+    return kwargs
+
+
+def async_engine_from_settings(
+    settings, url: str | None = None, **kwargs
+) -> "AsyncEngine":
+    return build_async_engine(
+        url or settings.DATABASE_URL, **_pool_settings(settings, kwargs)
+    )
+
+
+def engine_from_settings(settings, url: str | None = None, **kwargs) -> Engine:
+    _pool_settings(settings, kwargs)
+    kwargs.setdefault("server_side_cursors", settings.DB_SERVER_SIDE_CURSORS)
+    return build_engine(url or settings.DATABASE_URL, **kwargs)
+
+
+def pool_stats(engine: "Engine | AsyncEngine") -> dict | None:
+    """
+    Checkout and utilization figures for the engine's pool, or None when
+    the pool isn't instrumented (in-memory SQLite). Async engines too.
+    """
+    pool = engine.pool
+    if not isinstance(pool, TimedQueuePool):
+        return None
+    metrics = pool.metrics
+    capacity = pool.size() + max(pool._max_overflow, 0)
+    checked_out = pool.checkedout()
+    return {
+        "size": pool.size(),
+        "capacity": capacity,
+        "checked_out": checked_out,
+        "utilization": checked_out / capacity if capacity else 0.0,
+        "peak_checked_out": metrics.peak_checked_out,
+        "checkouts": metrics.checkouts,
+        "timeouts": metrics.timeouts,
+        "wait_total": metrics.wait_total,
+        "wait_mean": metrics.wait_total / metrics.checkouts if metrics.checkouts else 0.0,
+        "wait_max": metrics.wait_max,
+    }
+
+
+@contextmanager
+def unit_of_work(factory):
+    """
+    Open a session from `factory`, commit when the block succeeds,
+    roll back when it raises, and always close it.
+    """
+    db = factory()
+    try:
+        yield db
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+@asynccontextmanager
+async def async_unit_of_work(factory):
+    """
+    Async counterpart of unit_of_work for an async_sessionmaker.
+
+    The session joins a transaction begun on its own connection, so the
+    model methods that commit (acreate, abulk_create, ...) only release
+    a savepoint and the whole block commits or rolls back as one.
+    """
+    async with factory.kw["bind"].connect() as connection:
+        transaction = await connection.begin()
+        db = factory(bind=connection, join_transaction_mode="create_savepoint")
+        try:
+            yield db
+            await db.commit()
+            await transaction.commit()
+        except Exception:
+            await db.rollback()
+            await transaction.rollback()
+            raise
+        finally:
+            await db.close()
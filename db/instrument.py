@@ -0,0 +1,244 @@
+"""
+Statement instrumentation: counts, latency and rows per logical
+operation, N+1 warnings and Prometheus-style export
+"""
+
+import functools
+import json
+import logging
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+# Identical SELECTs within one operation before it is reported as N+1
+N_PLUS_ONE_THRESHOLD = 10
+
+# Statements listed past the limit when assert_max_statements fails
+ASSERT_SAMPLE = 20
+
+# Label of statements run outside any operation
+UNSCOPED = "unscoped"
+
+
+class OperationStats:
+    """
+    Totals for one operation name. Statements of nested operations count
+    towards every enclosing operation too.
+    """
+
+    __slots__ = ("calls", "statements", "seconds", "rows", "n_plus_one")
+
+    def __init__(self):
+        self.calls = 0
+        self.statements = 0
+        self.seconds = 0.0
+        self.rows = 0
+        self.n_plus_one = 0
+
+    def as_dict(self) -> dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class Scope:
+    """
+    Statements seen while one operation is open: a count, and the text
+    of the first `sample` of them only.
+    """
+
+    def __init__(self, name: str, batched: bool = False, sample: int = 0):
+        self.name = name
+        # repeated statements are expected, e.g. one INSERT per batch
+        self.batched = batched
+        self.count = 0
+        self.sample_size = sample
+        self.sample = []
+        self.seconds = 0.0
+        self.rows = 0
+        # by hash of the statement; the text is kept once it looks like N+1
+        self.repeats = Counter()
+        self.repeated = {}
+
+    def add(self, statement: str, seconds: float, rows: int, repeatable: bool):
+        self.count += 1
+        self.seconds += seconds
+        self.rows += rows
+        if len(self.sample) < self.sample_size:
+            self.sample.append(_normalize(statement))
+        if not repeatable:
+            key = hash(statement)
+            self.repeats[key] += 1
+            if self.repeats[key] == N_PLUS_ONE_THRESHOLD:
+                self.repeated[key] = _normalize(statement)
+
+    def suspected_n_plus_one(self):
+        return [(text, self.repeats[key]) for key, text in self.repeated.items()]
+
+
+_scopes: ContextVar[tuple[Scope, ...]] = ContextVar("instrument_scopes", default=())
+_totals: dict[str, OperationStats] = {}
+_lock = threading.Lock()
+
+
+def _stats(name: str) -> OperationStats:
+    stats = _totals.get(name)
+    if stats is None:
+        stats = _totals.setdefault(name, OperationStats())
+    return stats
+
+
+def _normalize(statement: str) -> str:
+    return re.sub(r"\s+", " ", statement).strip()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # on the execution context, so a failed statement leaves nothing behind
+    if context is not None:
+        context._instrument_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, "_instrument_started", None)
+    seconds = time.perf_counter() - started if started is not None else 0.0
+    # rows affected, or returned when the driver reports it up front
+    rows = max(cursor.rowcount, 0)
+    scopes = _scopes.get()
+    if scopes:
+        repeatable = (
+            executemany
+            or statement.lstrip()[:6].upper() != "SELECT"
+            or any(scope.batched for scope in scopes)
+        )
+        for scope in scopes:
+            scope.add(statement, seconds, rows, repeatable)
+    else:
+        with _lock:
+            stats = _stats(UNSCOPED)
+            stats.statements += 1
+            stats.seconds += seconds
+            stats.rows += rows
+
+
+def instrument(bind):
+    """
+    Record the statements of an Engine, Connection or AsyncEngine. Safe
+    to call more than once for the same bind.
+    """
+    bind = getattr(bind, "sync_engine", bind)
+    if not event.contains(bind, "before_cursor_execute", _before_cursor_execute):
+        event.listen(bind, "before_cursor_execute", _before_cursor_execute)
+        event.listen(bind, "after_cursor_execute", _after_cursor_execute)
+    return bind
+
+
+@contextmanager
+def operation(name: str, batched: bool = False, sample: int = 0):
+    """
+    Attribute statements run inside the block to operation `name`, and
+    warn when the same SELECT repeats often enough to look like N+1.
+    Yields the Scope, which keeps the text of the first `sample` statements.
+    """
+    scope = Scope(name, batched, sample)
+    token = _scopes.set(_scopes.get() + (scope,))
+    try:
+        yield scope
+    finally:
+        _scopes.reset(token)
+        suspects = scope.suspected_n_plus_one()
+        with _lock:
+            stats = _stats(name)
+            stats.calls += 1
+            stats.statements += scope.count
+            stats.seconds += scope.seconds
+            stats.rows += scope.rows
+            stats.n_plus_one += len(suspects)
+        for statement, count in suspects:
+            logger.warning(
+                "Possible N+1 in %s: %d identical statements: %.200s",
+                name, count, statement,
+                extra={"operation": name, "repeats": count, "statement": statement},
+            )
+
+
+def instrumented(name: str, batched: bool = False):
+    """
+    Decorator running a function as operation `name`.
+    """
+
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with operation(name, batched):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorate
+
+
+@contextmanager
+def assert_max_statements(limit: int, bind=None):
+    """
+    Fail with AssertionError when the block runs more than `limit`
+    statements, listing the first ones. `bind` is instrumented first
+    when given.
+    """
+    if bind is not None:
+        instrument(bind)
+    with operation("assert_max_statements", sample=limit + ASSERT_SAMPLE) as scope:
+        yield scope
+    if scope.count > limit:
+        listing = "\n".join(f"  {number}. {text[:200]}" for number, text in enumerate(
+            scope.sample, 1
+        ))
+        if scope.count > len(scope.sample):
+            listing += f"\n  ... {scope.count - len(scope.sample)} more"
+        raise AssertionError(
+            f"{scope.count} statements executed, expected at most {limit}:\n{listing}"
+        )
+
+
+def snapshot() -> dict[str, dict]:
+    """Totals per operation name."""
+    with _lock:
+        return {name: stats.as_dict() for name, stats in _totals.items()}
+
+
+def reset():
+    with _lock:
+        _totals.clear()
+
+
+def log_stats(log: logging.Logger = logger, level: int = logging.INFO):
+    """One structured (JSON) log line per operation."""
+    for name, stats in sorted(snapshot().items()):
+        log.log(level, json.dumps({"operation": name, **stats}))
+
+
+_METRICS = (
+    ("calls", "counter", "Operations completed"),
+    ("statements", "counter", "SQL statements executed"),
+    ("seconds", "counter", "Time spent executing SQL statements"),
+    ("rows", "counter", "Rows affected or returned"),
+    ("n_plus_one", "counter", "Suspected N+1 statement patterns"),
+)
+
+
+def prometheus_text(prefix: str = "brvm_db") -> str:
+    """The totals in the Prometheus text exposition format."""
+    totals = snapshot()
+    lines = []
+    for field, kind, help_text in _METRICS:
+        metric = f"{prefix}_operation_{field}_total"
+        lines.append(f"# HELP {metric} {help_text}")
+        lines.append(f"# TYPE {metric} {kind}")
+        for name, stats in sorted(totals.items()):
+            label = name.replace("\\", "\\\\").replace('"', '\\"')
+            lines.append(f'{metric}{{operation="{label}"}} {stats[field]}')
+    return "\n".join(lines) + "\n"
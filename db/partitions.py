@@ -0,0 +1,144 @@
+"""
+Yearly range partitions on trading_date (PostgreSQL only)
+"""
+
+from datetime import date
+
+from sqlalchemy import PrimaryKeyConstraint, Table, event, text
+from sqlalchemy.ext.compiler import compiles
+
+# Table option for models partitioned by year of trading_date
+PARTITION_COLUMN = "trading_date"
+PARTITION_BY = f"RANGE ({PARTITION_COLUMN})"
+
+
+def is_partitioned(table: Table) -> bool:
+    return bool(table.dialect_options["postgresql"].get("partition_by"))
+
+
+def partition_name(table: Table, year: int) -> str:
+    return f"{table.name}_{year}"
+
+
+def default_partition_name(table: Table) -> str:
+    return f"{table.name}_default"
+
+
+@compiles(PrimaryKeyConstraint, "postgresql")
+def _partitioned_primary_key(constraint, compiler, **kw):
+    # A partitioned table's key must include the partition column. The
+    # models keep the surrogate id as their only key so SQLite still
+    # numbers rows, and PostgreSQL adds trading_date here.
+    table = constraint.table
+    if not is_partitioned(table) or PARTITION_COLUMN in constraint.columns:
+        return compiler.visit_primary_key_constraint(constraint, **kw)
+    preparer = compiler.preparer
+    columns = ", ".join(
+        preparer.format_column(column)
+        for column in [*constraint.columns, table.c[PARTITION_COLUMN]]
+    )
+    prefix = ""
+    if constraint.name is not None:
+        prefix = f"CONSTRAINT {preparer.format_constraint(constraint)} "
+    return f"{prefix}PRIMARY KEY ({columns})"
+
+
+@event.listens_for(Table, "after_create")
+def _create_default_partition(table, connection, **kw):
+    # Without a matching partition inserts fail, so metadata.create_all()
+    # gives every partitioned table a DEFAULT partition to fall back on
+    if connection.dialect.name == "postgresql" and is_partitioned(table):
+        connection.execute(
+            text(
+                f"CREATE TABLE IF NOT EXISTS {default_partition_name(table)} "
+                f"PARTITION OF {table.name} DEFAULT"
+            )
+        )
+
+
+def date_bounds(column, dates):
+    """
+    A BETWEEN on the partition column covering `dates`. Added next to
+    key lookups such as (equity_id, trading_date) IN (...), which the
+    planner can't prune by on its own.
+    """
+    dates = list(dates)
+    return column.between(min(dates), max(dates))
+
+
+def _exists(connection, name: str) -> bool:
+    found = connection.execute(text("SELECT to_regclass(:name)"), {"name": name})
+    return found.scalar() is not None
+
+
+def create_year_partition(connection, table: Table, year: int) -> bool:
+    """
+    Create the partition holding `year` for `table`. Rows for that year
+    already stored in the DEFAULT partition are moved into it. Returns
+    False when the partition exists or the database isn't PostgreSQL.
+    """
+    if connection.dialect.name != "postgresql" or not is_partitioned(table):
+        return False
+    name = partition_name(table, year)
+    if _exists(connection, name):
+        return False
+
+    lower, upper = date(year, 1, 1), date(year + 1, 1, 1)
+    bounds = f"FROM ('{lower}') TO ('{upper}')"
+    default = default_partition_name(table)
+    if not _exists(connection, default):
+        connection.execute(
+            text(f"CREATE TABLE {name} PARTITION OF {table.name} FOR VALUES {bounds}")
+        )
+        return True
+
+    # The default partition may not hold rows that belong to the new one
+    moved = f"_moved_{name}"
+    window = f"{PARTITION_COLUMN} >= '{lower}' AND {PARTITION_COLUMN} < '{upper}'"
+    connection.execute(text(f"CREATE TEMPORARY TABLE {moved} (LIKE {default})"))
+    connection.execute(
+        text(
+            f"WITH rows AS (DELETE FROM {default} WHERE {window} RETURNING *) "
+            f"INSERT INTO {moved} SELECT * FROM rows"
+        )
+    )
+    connection.execute(
+        text(f"CREATE TABLE {name} PARTITION OF {table.name} FOR VALUES {bounds}")
+    )
+    connection.execute(text(f"INSERT INTO {table.name} SELECT * FROM {moved}"))
+    connection.execute(text(f"DROP TABLE {moved}"))
+    return True
+
+
+def partitioned_tables() -> list[Table]:
+    from db.base_class import Base
+
+    return [table for table in Base.metadata.sorted_tables if is_partitioned(table)]
+
+
+def is_partition_name(name: str) -> bool:
+    """
+    True for the yearly and DEFAULT partitions of a partitioned table.
+    """
+    parent, _, suffix = name.rpartition("_")
+    return (suffix == "default" or (len(suffix) == 4 and suffix.isdigit())) and any(
+        table.name == parent for table in partitioned_tables()
+    )
+
+
+def create_next_year_partitions(db, today: date | None = None) -> list[str]:
+    """
+    Make sure every partitioned table has partitions for the current and
+    the next year, so inserts never land in the DEFAULT partition.
+    Commits and returns the names of the partitions created.
+    """
+    year = (today or date.today()).year
+    connection = db.connection()
+    created = [
+        partition_name(table, y)
+        for table in partitioned_tables()
+        for y in (year, year + 1)
+        if create_year_partition(connection, table, y)
+    ]
+    db.commit()
+    return created
@@ -0,0 +1,285 @@
+"""
+Seed companies and equities from the reference workbook
+"""
+
+import time
+import unicodedata
+from datetime import date, datetime
+from pathlib import Path
+from typing import NamedTuple
+
+from sqlalchemy import func, or_, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from db.upsert import insert_for
+from models.enums import CountryEnum, StatusEnum, TradingStatusEnum
+from models.reference import invalidate_reference_caches
+from models.stocks import Company, Equity
+
+DEFAULT_WORKBOOK = Path(__file__).resolve().parent.parent / "Data For DB.xlsx"
+
+# A listing sheet is any sheet with a header row holding these columns
+REQUIRED_COLUMNS = ("company_name", "country", "ticker", "isin")
+OPTIONAL_COLUMNS = ("listing_date", "status", "trading_status")
+
+
+class ListingRow(NamedTuple):
+    line: str
+    company_name: str
+    country: CountryEnum
+    status: StatusEnum
+    ticker: str
+    isin: str
+    listing_date: date | None
+    trading_status: TradingStatusEnum
+
+
+def _fold(text: str) -> str:
+    """
+    Lower-case, strip accents and normalise apostrophes and spaces, so
+    "Cote d’Ivoire" and "Côte d'Ivoire" compare equal.
+    """
+    text = unicodedata.normalize("NFKD", str(text).replace("’", "'"))
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    return " ".join(text.casefold().replace("_", " ").split())
+
+
+def _lookup(enum) -> dict:
+    # French display value first, member name as a fallback
+    table = {_fold(member.name): member for member in enum}
+    table.update({_fold(member.value): member for member in enum})
+    return table
+
+
+COUNTRIES = _lookup(CountryEnum)
+STATUSES = _lookup(StatusEnum)
+TRADING_STATUSES = _lookup(TradingStatusEnum)
+
+
+def _header(values) -> dict[str, int] | None:
+    positions = {}
+    for index, value in enumerate(values):
+        if isinstance(value, str):
+            positions.setdefault(_fold(value).replace(" ", "_"), index)
+    if all(column in positions for column in REQUIRED_COLUMNS):
+        return positions
+    return None
+
+
+def _text(value) -> str | None:
+    if value is None:
+        return None
+    text = " ".join(str(value).split())
+    return text or None
+
+
+def _date(value) -> date | None:
+    if value is None or value == "":
+        return None
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value).strip())
+
+
+def read_listings(path=DEFAULT_WORKBOOK) -> list[ListingRow]:
+    """
+    Stream the workbook in read-only mode and validate every listing row.
+    Raises ValueError listing all problems found, so nothing is written
+    unless the whole file is clean.
+    """
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    rows, errors = [], []
+    try:
+        for sheet in workbook.worksheets:
+            positions = None
+            for line, values in enumerate(sheet.iter_rows(values_only=True), 1):
+                if positions is None:
+                    positions = _header(values)
+                    continue
+                cells = {
+                    column: values[index] if index < len(values) else None
+                    for column, index in positions.items()
+                    if column in REQUIRED_COLUMNS + OPTIONAL_COLUMNS
+                }
+                if all(value in (None, "") for value in cells.values()):
+                    continue
+                row = _parse_row(f"{sheet.title}!{line}", cells, errors)
+                if row is not None:
+                    rows.append(row)
+    finally:
+        workbook.close()
+
+    errors.extend(_check_unique(rows))
+    if errors:
+        raise ValueError("Invalid listings:\n" + "\n".join(errors))
+    return rows
+
+
+def _parse_row(line: str, cells: dict, errors: list) -> ListingRow | None:
+    problems = []
+    values = {column: _text(cells.get(column)) for column in REQUIRED_COLUMNS}
+    for column, value in values.items():
+        if value is None:
+            problems.append(f"{column} is required")
+
+    country = COUNTRIES.get(_fold(values["country"] or ""))
+    if values["country"] and country is None:
+        problems.append(f"unknown country '{values['country']}'")
+
+    status = StatusEnum.ACTIVE
+    if _text(cells.get("status")):
+        status = STATUSES.get(_fold(cells["status"]))
+        if status is None:
+            problems.append(f"unknown status '{cells['status']}'")
+
+    trading_status = TradingStatusEnum.ACTIVE
+    if _text(cells.get("trading_status")):
+        trading_status = TRADING_STATUSES.get(_fold(cells["trading_status"]))
+        if trading_status is None:
+            problems.append(f"unknown trading status '{cells['trading_status']}'")
+
+    isin = (values["isin"] or "").upper()
+    if isin and (len(isin) != 12 or not isin.isalnum()):
+        problems.append(f"malformed ISIN '{values['isin']}'")
+
+    try:
+        listing_date = _date(cells.get("listing_date"))
+    except ValueError:
+        problems.append(f"bad listing date '{cells.get('listing_date')}'")
+        listing_date = None
+
+    if problems:
+        errors.extend(f"{line}: {problem}" for problem in problems)
+        return None
+    return ListingRow(
+        line=line,
+        company_name=values["company_name"],
+        country=country,
+        status=status,
+        ticker=values["ticker"].upper(),
+        isin=isin,
+        listing_date=listing_date,
+        trading_status=trading_status,
+    )
+
+
+def _check_unique(rows: list[ListingRow]) -> list[str]:
+    errors = []
+    for field in ("ticker", "isin"):
+        seen = {}
+        for row in rows:
+            key = getattr(row, field)
+            if key in seen:
+                errors.append(f"{row.line}: duplicate {field} '{key}' (see {seen[key]})")
+            else:
+                seen[key] = row.line
+
+    # A company may list several equities but must agree on its details
+    companies = {}
+    for row in rows:
+        first = companies.setdefault(row.company_name, row)
+        if (first.country, first.status) != (row.country, row.status):
+            errors.append(
+                f"{row.line}: company '{row.company_name}' conflicts with {first.line}"
+            )
+    return errors
+
+
+def _update_changed(stmt, index_elements, fields):
+    """
+    ON CONFLICT DO UPDATE of `fields` only where one of them differs, so
+    re-seeding the same rows keeps their updated_at.
+    """
+    table = stmt.table
+    return stmt.on_conflict_do_update(
+        index_elements=index_elements,
+        set_={
+            **{field: stmt.excluded[field] for field in fields},
+            "updated_at": func.now(),
+        },
+        where=or_(
+            *(table.c[field].is_distinct_from(stmt.excluded[field]) for field in fields)
+        ),
+    )
+
+
+def seed_listings(db: Session, rows: list[ListingRow]) -> dict:
+    """
+    Upsert companies then equities in one transaction, three statements.
+    Re-running with the same rows leaves the tables unchanged.
+    """
+    if not rows:
+        return {"companies": 0, "equities": 0}
+
+    companies = {}
+    for row in rows:
+        companies.setdefault(row.company_name, row)
+
+    table = Company.__table__
+    stmt = _update_changed(
+        insert_for(db, table), [table.c.company_name], ("country", "status")
+    )
+    records = [
+        {"company_name": name, "country": row.country, "status": row.status}
+        for name, row in companies.items()
+    ]
+
+    try:
+        db.execute(stmt, records)
+        # unchanged companies aren't RETURNed by the upsert
+        company_ids = dict(
+            db.execute(
+                select(table.c.company_name, table.c.company_id).where(
+                    table.c.company_name.in_(list(companies))
+                )
+            ).all()
+        )
+
+        table = Equity.__table__
+        stmt = _update_changed(
+            insert_for(db, table),
+            [table.c.ticker],
+            ("company_id", "isin", "listing_date", "trading_status"),
+        )
+        records = [
+            {
+                "company_id": company_ids[row.company_name],
+                "ticker": row.ticker,
+                "isin": row.isin,
+                "listing_date": row.listing_date,
+                "trading_status": row.trading_status,
+            }
+            for row in rows
+        ]
+        db.execute(stmt, records)
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise ValueError("Listings violate a database constraint")
+    # Core statements don't fire the model listeners
+    invalidate_reference_caches("companies", "equities")
+
+    return {"companies": len(company_ids), "equities": len(records)}
+
+
+def seed(db: Session, path=DEFAULT_WORKBOOK) -> dict:
+    """
+    Read, validate and load the workbook. Returns row counts and the
+    time spent reading and writing.
+    """
+    started = time.perf_counter()
+    rows = read_listings(path)
+    read_seconds = time.perf_counter() - started
+
+    stats = seed_listings(db, rows)
+    stats.update(
+        rows=len(rows),
+        read_seconds=read_seconds,
+        write_seconds=time.perf_counter() - started - read_seconds,
+    )
+    return stats
@@ -1,17 +1,161 @@
 """
 DB session
+
+Settings, engines and session factories are module attributes built on
+first access, so importing this module reads no configuration and opens
+nothing: short-lived commands that never touch the database don't pay
+for it. A forked child drops the pooled connections it inherited and
+opens its own on first use.
 """
 
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-from config.settings import get_settings
+import os
+import threading
 
-# Settings
-settings = get_settings()
+from sqlalchemy.orm import sessionmaker
 
-engine = create_engine(
-    url=settings.DATABASE_URL,
-    pool_pre_ping=True,
+from db.engine import (
+    async_engine_from_settings,
+    async_unit_of_work,
+    engine_from_settings,
+    unit_of_work,
 )
+from db.instrument import instrument
+
+
+def _build_settings():
+    from config.settings import get_settings
+
+    return {"settings": get_settings()}
+
+
+def _build_engines():
+    settings = __getattr__("settings")
+    engine = engine_from_settings(settings)
+
+    # Reads go to the replica when one is configured
+    if settings.DATABASE_REPLICA_URL:
+        read_engine = engine_from_settings(
+            settings, settings.DATABASE_REPLICA_URL, read_only=True
+        )
+    else:
+        read_engine = engine
+
+    if settings.DB_INSTRUMENT:
+        instrument(engine)
+        instrument(read_engine)
+
+    return {
+        "engine": engine,
+        "read_engine": read_engine,
+        "SessionLocal": sessionmaker(autoflush=False, autocommit=False, bind=engine),
+        "ReadSessionLocal": sessionmaker(
+            autoflush=False, autocommit=False, bind=read_engine
+        ),
+    }
+
+
+def _build_async():
+    # needs the async driver (asyncpg / aiosqlite)
+    from sqlalchemy.ext.asyncio import async_sessionmaker
+
+    settings = __getattr__("settings")
+    bind = async_engine_from_settings(settings)
+    if settings.DB_INSTRUMENT:
+        instrument(bind)
+    return {
+        "async_engine": bind,
+        # no expiry on commit: expired attributes can't lazy-load under asyncio
+        "AsyncSessionLocal": async_sessionmaker(
+            autoflush=False, expire_on_commit=False, bind=bind
+        ),
+    }
+
+
+# Lazy attribute -> function building it along with its siblings
+_BUILDERS = {
+    "settings": _build_settings,
+    "engine": _build_engines,
+    "read_engine": _build_engines,
+    "SessionLocal": _build_engines,
+    "ReadSessionLocal": _build_engines,
+    "async_engine": _build_async,
+    "AsyncSessionLocal": _build_async,
+}
+
+_built = {}
+_lock = threading.RLock()
+
+
+def __getattr__(name):
+    builder = _BUILDERS.get(name)
+    if builder is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    if name not in _built:
+        with _lock:
+            if name not in _built:
+                _built.update(builder())
+    return _built[name]
+
+
+def _after_fork_in_child():
+    """
+    Replace the pools inherited from the parent without closing their
+    connections, which the parent still uses.
+    """
+    global _lock
+    # another thread may have held the lock at fork time
+    _lock = threading.RLock()
+    for name in ("engine", "read_engine"):
+        if name in _built:
+            _built[name].dispose(close=False)
+    if "async_engine" in _built:
+        _built["async_engine"].sync_engine.dispose(close=False)
+
+
+os.register_at_fork(after_in_child=_after_fork_in_child)
+
+
+def dispose_engines():
+    """
+    Close the sync engines' pooled connections and forget them; the next
+    access builds them again.
+    """
+    with _lock:
+        for name in ("engine", "read_engine"):
+            if name in _built:
+                _built[name].dispose()
+        for name in ("engine", "read_engine", "SessionLocal", "ReadSessionLocal"):
+            _built.pop(name, None)
+
+
+def create_session_factory(**engine_kwargs) -> sessionmaker:
+    """
+    Session factory on a new engine, for worker processes that must not
+    share the parent's connections.
+    """
+    settings = __getattr__("settings")
+    bind = engine_from_settings(settings, **engine_kwargs)
+    if settings.DB_INSTRUMENT:
+        instrument(bind)
+    return sessionmaker(autoflush=False, autocommit=False, bind=bind)
+
+
+def session_scope():
+    """
+    Unit of work on the primary: commits on success, rolls back on error.
+    """
+    return unit_of_work(__getattr__("SessionLocal"))
+
+
+def read_session():
+    """
+    Session on the read engine, for queries only.
+    """
+    return unit_of_work(__getattr__("ReadSessionLocal"))
+
 
-SessionLocal = sessionmaker(autoflush=False, autocommit=False, bind=engine)
+def async_session_scope():
+    """
+    Async unit of work on the primary.
+    """
+    return async_unit_of_work(__getattr__("AsyncSessionLocal"))
@@ -0,0 +1,69 @@
+"""
+Dialect-aware INSERT ... ON CONFLICT helpers
+"""
+
+import hashlib
+from itertools import islice
+from typing import Iterable, Iterator
+
+from sqlalchemy import func
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+
+def insert_for(db: Session, model):
+    """
+    Return an INSERT construct for `model` that supports ON CONFLICT
+    on the dialect the session is bound to.
+    """
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        return postgresql.insert(model)
+    if dialect == "sqlite":
+        return sqlite.insert(model)
+    raise ValueError(f"ON CONFLICT inserts are not supported on '{dialect}'")
+
+
+def batched(rows: Iterable, size: int) -> Iterator[list]:
+    """
+    Split an iterable into lists of at most `size` items.
+    """
+    if size < 1:
+        raise ValueError("batch size must be at least 1")
+    iterator = iter(rows)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def row_hash(record: dict, fields) -> str:
+    """
+    Digest of a record's values for `fields`, stored next to the row so
+    an upsert can tell whether incoming values differ from stored ones.
+    Integers and floats hash alike, so 100 and 100.0 are the same value.
+    """
+    values = []
+    for field in fields:
+        value = record.get(field)
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            value = float(value)
+        values.append("" if value is None else repr(value))
+    return hashlib.blake2b("\x1f".join(values).encode(), digest_size=16).hexdigest()
+
+
+def on_conflict_update_changed(stmt, index_elements, fields, now=None):
+    """
+    ON CONFLICT DO UPDATE of `fields` that only touches rows whose
+    row_hash differs, so unchanged rows keep their updated_at and no
+    dead tuple is written for them. Rows left alone aren't RETURNed.
+    Updated rows get `now` as updated_at, the database's now() by default.
+    """
+    table = stmt.table
+    return stmt.on_conflict_do_update(
+        index_elements=index_elements,
+        set_={
+            **{field: stmt.excluded[field] for field in fields},
+            "row_hash": stmt.excluded.row_hash,
+            "updated_at": func.now() if now is None else now,
+        },
+        where=table.c.row_hash.is_distinct_from(stmt.excluded.row_hash),
+    )
@@ -0,0 +1,195 @@
+"""
+Columnar Parquet snapshot of the BRVM dataset
+"""
+
+import json
+import os
+from datetime import date, datetime
+from enum import Enum
+from pathlib import Path
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+from sqlalchemy import (
+    Boolean,
+    Date,
+    DateTime,
+    Enum as SQLEnum,
+    Float,
+    Integer,
+    String,
+    func,
+    select,
+)
+from sqlalchemy.orm import Session
+
+from db.changes import change_watermark
+from models.stocks import Company, Equity
+from models.trading import EquityEODPrice, EquityResidualQuantity
+
+MANIFEST = "manifest.json"
+
+# Tables partitioned by year/month of trading_date
+PARTITIONED = (EquityEODPrice, EquityResidualQuantity)
+# Small reference tables, written as a single file
+SNAPSHOT = (Company, Equity)
+
+
+def arrow_type(column) -> pa.DataType:
+    column_type = column.type
+    if isinstance(column_type, SQLEnum):
+        return pa.string()
+    if isinstance(column_type, Boolean):
+        return pa.bool_()
+    if isinstance(column_type, Integer):
+        return pa.int64()
+    if isinstance(column_type, Float):
+        return pa.float64()
+    if isinstance(column_type, DateTime):
+        return pa.timestamp("us")
+    if isinstance(column_type, Date):
+        return pa.date32()
+    if isinstance(column_type, String):
+        return pa.string()
+    raise ValueError(f"No Arrow type for column '{column.name}' ({column_type})")
+
+
+def arrow_schema(model) -> pa.Schema:
+    return pa.schema(
+        [pa.field(c.name, arrow_type(c), c.nullable) for c in model.__table__.columns]
+    )
+
+
+def _record_batch(rows, schema: pa.Schema) -> pa.RecordBatch:
+    columns = list(zip(*rows))
+    arrays = []
+    for field, values in zip(schema, columns):
+        if pa.types.is_string(field.type):
+            values = [v.name if isinstance(v, Enum) else v for v in values]
+        arrays.append(pa.array(values, type=field.type))
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def _write_atomic(path: Path, schema: pa.Schema, batches) -> int:
+    """Write batches to `path` via a temporary file; returns the row count."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".parquet.tmp")
+    rows = 0
+    with pq.ParquetWriter(tmp, schema, compression="zstd") as writer:
+        for batch in batches:
+            writer.write_batch(batch)
+            rows += batch.num_rows
+    os.replace(tmp, path)
+    return rows
+
+
+def _stream(db: Session, stmt, batch_size: int, schema: pa.Schema):
+    """
+    Yield record batches through a server-side cursor (where supported),
+    so at most `batch_size` rows are held at a time.
+    """
+    result = db.connection().execution_options(
+        stream_results=True, yield_per=batch_size
+    ).execute(stmt)
+    for rows in result.partitions(batch_size):
+        yield _record_batch(rows, schema)
+
+
+def partition_path(root: Path, model, year: int, month: int) -> Path:
+    return (
+        root / model.__tablename__ / f"year={year}" / f"month={month:02}"
+        / "part-0.parquet"
+    )
+
+
+def _month_bounds(year: int, month: int) -> tuple[date, date]:
+    start = date(year, month, 1)
+    end = date(year + month // 12, month % 12 + 1, 1)
+    return start, end
+
+
+def _changed_months(db: Session, model, since: datetime | None) -> list[tuple[int, int]]:
+    stmt = select(model.trading_date).distinct()
+    if since is not None:
+        stmt = stmt.where(model.updated_at >= since)
+    months = {(d.year, d.month) for d in db.scalars(stmt)}
+    return sorted(months)
+
+
+def _export_partitioned(db, root, model, since, batch_size) -> dict:
+    schema = arrow_schema(model)
+    table = model.__table__
+    stats = {"rows": 0, "partitions": 0}
+    for year, month in _changed_months(db, model, since):
+        start, end = _month_bounds(year, month)
+        stmt = (
+            select(table)
+            .where(table.c.trading_date >= start, table.c.trading_date < end)
+            .order_by(table.c.trading_date, table.c.equity_id)
+        )
+        stats["rows"] += _write_atomic(
+            partition_path(root, model, year, month),
+            schema,
+            _stream(db, stmt, batch_size, schema),
+        )
+        stats["partitions"] += 1
+    return stats
+
+
+def _export_snapshot(db, root, model, since, batch_size) -> dict:
+    table = model.__table__
+    if since is not None:
+        changed = db.scalar(select(func.count()).where(table.c.updated_at >= since))
+        if not changed:
+            return {"rows": 0, "partitions": 0}
+    schema = arrow_schema(model)
+    primary_key = list(table.primary_key.columns)
+    rows = _write_atomic(
+        root / model.__tablename__ / "part-0.parquet",
+        schema,
+        _stream(db, select(table).order_by(*primary_key), batch_size, schema),
+    )
+    return {"rows": rows, "partitions": 1}
+
+
+def read_manifest(root: Path) -> dict:
+    path = Path(root) / MANIFEST
+    if not path.exists():
+        return {"tables": {}}
+    return json.loads(path.read_text())
+
+
+def export_dataset(
+    db: Session, root, incremental: bool = False, batch_size: int = 50_000
+) -> dict:
+    """
+    Export companies, equities, EOD prices and residual quantities to
+    Parquet under `root`. Price tables are partitioned as
+    <table>/year=YYYY/month=MM/part-0.parquet.
+
+    With `incremental`, only the partitions holding rows updated since the
+    previous export (per the manifest), or within CHANGE_OVERLAP before
+    it, are rewritten. Returns row and partition counts per table.
+    """
+    root = Path(root)
+    manifest = read_manifest(root) if incremental else {"tables": {}}
+    stats = {}
+    for model in SNAPSHOT + PARTITIONED:
+        name = model.__tablename__
+        entry = manifest["tables"].get(name, {})
+        since = entry.get("last_updated_at") if incremental else None
+        since = datetime.fromisoformat(since) if since else None
+
+        # watermark taken before reading, so concurrent updates are picked up next time
+        watermark = change_watermark(db)
+        if model in PARTITIONED:
+            stats[name] = _export_partitioned(db, root, model, since, batch_size)
+        else:
+            stats[name] = _export_snapshot(db, root, model, since, batch_size)
+        entry["last_updated_at"] = watermark.isoformat()
+        entry["exported_at"] = datetime.now().isoformat()
+        manifest["tables"][name] = entry
+
+    root.mkdir(parents=True, exist_ok=True)
+    (root / MANIFEST).write_text(json.dumps(manifest, indent=2))
+    return stats
@@ -0,0 +1,211 @@
+"""
+Content-addressed archive of raw fetched pages
+
+Every page is stored once, zstd-compressed, under the SHA-256 of its raw
+bytes. A small SQLite index maps each URL to the blob last fetched from
+it, along with the ETag / Last-Modified headers needed for conditional
+requests, so pages can be re-parsed later without touching the network.
+"""
+
+import asyncio
+import hashlib
+import os
+import sqlite3
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+from pathlib import Path
+from typing import Iterator, NamedTuple
+
+import zstandard
+
+from ingest.fetcher import Page
+from ingest.sources import PageRequest, digest_of
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+    url TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    trading_date TEXT NOT NULL,
+    ticker TEXT,
+    digest TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    etag TEXT,
+    last_modified TEXT,
+    fetched_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_pages_date_kind ON pages (trading_date, kind);
+"""
+
+
+class PageNotArchived(LookupError):
+    """Raised when an offline fetch asks for a URL the archive doesn't hold."""
+
+
+class ArchivedPage(NamedTuple):
+    request: PageRequest
+    digest: str
+    size: int
+    etag: str | None
+    last_modified: str | None
+    fetched_at: datetime
+
+
+class RawArchive:
+    """
+    Blobs live at `root/blobs/<2 hex>/<digest>.zst` and the index at
+    `root/index.sqlite`. Several processes may share one archive: blobs
+    are written atomically and the index runs in WAL mode.
+    """
+
+    def __init__(self, root, level: int = 10):
+        self.root = Path(root)
+        self.level = level
+        self._blobs = self.root / "blobs"
+        self._blobs.mkdir(parents=True, exist_ok=True)
+        # used from the thread the Fetcher runs archive calls on
+        self._index = sqlite3.connect(
+            self.root / "index.sqlite", timeout=30, check_same_thread=False
+        )
+        self._index.execute("PRAGMA journal_mode=WAL")
+        self._index.executescript(_SCHEMA)
+        self._compressor = zstandard.ZstdCompressor(level=level)
+        self._decompressor = zstandard.ZstdDecompressor()
+
+    def __reduce__(self):
+        # worker processes reopen the archive rather than share the index
+        return type(self), (self.root, self.level)
+
+    def close(self):
+        self._index.close()
+
+    def blob_path(self, digest: str) -> Path:
+        return self._blobs / digest[:2] / f"{digest}.zst"
+
+    def write_blob(self, content: bytes) -> str:
+        """Store `content` unless it is already archived. Returns its digest."""
+        digest = hashlib.sha256(content).hexdigest()
+        path = self.blob_path(digest)
+        if not path.exists():
+            path.parent.mkdir(exist_ok=True)
+            handle, temp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+            with os.fdopen(handle, "wb") as file:
+                file.write(self._compressor.compress(content))
+            os.replace(temp, path)
+        return digest
+
+    def read_blob(self, digest: str) -> bytes:
+        try:
+            compressed = self.blob_path(digest).read_bytes()
+        except FileNotFoundError:
+            raise PageNotArchived(f"No blob {digest}") from None
+        return self._decompressor.decompress(compressed)
+
+    def read_source(self, data_source: str) -> bytes:
+        """The raw page a stored row's data_source points at."""
+        digest = digest_of(data_source)
+        if digest is None:
+            raise ValueError(f"'{data_source}' does not reference an archived page")
+        return self.read_blob(digest)
+
+    def put(
+        self,
+        request: PageRequest,
+        content: bytes,
+        etag: str | None = None,
+        last_modified: str | None = None,
+        fetched_at: datetime | None = None,
+    ) -> str:
+        """Archive a fetched page and index it by URL. Returns its digest."""
+        digest = self.write_blob(content)
+        with self._index:
+            self._index.execute(
+                "INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    request.url,
+                    request.kind,
+                    request.trading_date.isoformat(),
+                    request.ticker,
+                    digest,
+                    len(content),
+                    etag,
+                    last_modified,
+                    (fetched_at or datetime.now()).isoformat(),
+                ),
+            )
+        return digest
+
+    def touch(self, url: str, fetched_at: datetime | None = None):
+        """Record that `url` was revalidated without changing."""
+        with self._index:
+            self._index.execute(
+                "UPDATE pages SET fetched_at = ? WHERE url = ?",
+                ((fetched_at or datetime.now()).isoformat(), url),
+            )
+
+    @staticmethod
+    def _entry(row) -> ArchivedPage:
+        url, kind, day, ticker, digest, size, etag, modified, fetched_at = row
+        request = PageRequest(kind, url, date.fromisoformat(day), ticker)
+        return ArchivedPage(
+            request, digest, size, etag, modified, datetime.fromisoformat(fetched_at)
+        )
+
+    def lookup(self, url: str) -> ArchivedPage | None:
+        row = self._index.execute(
+            "SELECT * FROM pages WHERE url = ?", (url,)
+        ).fetchone()
+        return self._entry(row) if row else None
+
+    def entries(
+        self, start: date, end: date, kinds=None
+    ) -> Iterator[ArchivedPage]:
+        """Index entries for pages of trading days between start and end."""
+        query = "SELECT * FROM pages WHERE trading_date BETWEEN ? AND ?"
+        params = [start.isoformat(), end.isoformat()]
+        if kinds:
+            kinds = list(kinds)
+            query += f" AND kind IN ({', '.join('?' * len(kinds))})"
+            params += kinds
+        query += " ORDER BY trading_date, url"
+        for row in self._index.execute(query, params).fetchall():
+            yield self._entry(row)
+
+
+class ArchiveFetcher:
+    """
+    Drop-in replacement for Fetcher that serves pages from the archive,
+    for re-ingesting without any network access. Pages the archive lacks
+    raise PageNotArchived, which the pipeline counts as failed.
+    """
+
+    def __init__(self, archive: RawArchive, concurrency: int = 1):
+        self.archive = archive
+        self.concurrency = concurrency
+        self._thread = None
+
+    async def __aenter__(self):
+        # one reader thread, like Fetcher, so the index isn't shared
+        self._thread = ThreadPoolExecutor(1, "raw-archive")
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self._thread.shutdown()
+        self._thread = None
+
+    async def fetch(self, request: PageRequest) -> Page:
+        if self._thread is None:
+            raise RuntimeError(
+                "ArchiveFetcher must be used as an async context manager"
+            )
+        loop = asyncio.get_running_loop()
+        entry, content = await loop.run_in_executor(
+            self._thread, self._read, request.url
+        )
+        return Page(request, 200, content, entry.fetched_at, entry.digest)
+
+    def _read(self, url: str):
+        entry = self.archive.lookup(url)
+        if entry is None:
+            raise PageNotArchived(f"{url} is not archived")
+        return entry, self.archive.read_blob(entry.digest)
@@ -0,0 +1,284 @@
+"""
+Bulk backfill writer: COPY into a staging table on PostgreSQL,
+batched ON CONFLICT inserts elsewhere
+"""
+
+import csv
+import io
+import time
+
+from sqlalchemy import (
+    BigInteger,
+    Column,
+    MetaData,
+    Table,
+    func,
+    select,
+    tuple_,
+)
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from db.changes import publish_changes
+from db.instrument import instrumented
+from db.partitions import date_bounds
+from db.upsert import batched, insert_for, on_conflict_update_changed
+from models.trading import (
+    EquityEODPrice,
+    EquityEODPriceRevision,
+    EquityResidualQuantity,
+    OHLCV_FIELDS,
+    RESIDUAL_HASH_FIELDS,
+)
+
+KEY_FIELDS = ("equity_id", "trading_date")
+
+# Columns written by a backfill, besides the key
+VALUE_FIELDS = {
+    EquityEODPrice: OHLCV_FIELDS
+    + ("traded_value", "full_data_flag", "data_source", "row_hash"),
+    EquityResidualQuantity: RESIDUAL_HASH_FIELDS + ("data_source", "row_hash"),
+}
+
+
+def prepare_records(model, batch):
+    """
+    Validate and de-duplicate a batch of row dicts for `model`, with the
+    checks of its create(). Returns (records, skipped).
+    """
+    return model._prepare_batch(batch)
+
+
+def _csv_chunk(records, columns) -> io.StringIO:
+    # empty unquoted fields load as NULL with FORMAT csv
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerows([record[column] for column in columns] for record in records)
+    buffer.seek(0)
+    return buffer
+
+
+def _staging_table(model) -> Table:
+    table = model.__table__
+    return Table(
+        f"_backfill_{table.name}",
+        MetaData(),
+        Column("seq", BigInteger, primary_key=True, autoincrement=True),
+        *(
+            Column(name, table.c[name].type)
+            for name in KEY_FIELDS + VALUE_FIELDS[model]
+        ),
+        prefixes=["TEMPORARY"],
+    )
+
+
+def _latest_staged(model, stage: Table):
+    """The last staged row per key."""
+    return (
+        select(*(stage.c[name] for name in KEY_FIELDS + VALUE_FIELDS[model]))
+        .ext(postgresql.distinct_on(stage.c.equity_id, stage.c.trading_date))
+        .order_by(stage.c.equity_id, stage.c.trading_date, stage.c.seq.desc())
+    )
+
+
+def _merge_statement(model, stage: Table, update: bool, now=None):
+    """
+    INSERT ... SELECT from staging, keeping the last staged row per key.
+    """
+    table = model.__table__
+    columns = KEY_FIELDS + VALUE_FIELDS[model]
+    stmt = postgresql.insert(table).from_select(columns, _latest_staged(model, stage))
+    keys = [table.c.equity_id, table.c.trading_date]
+    if update:
+        stmt = on_conflict_update_changed(stmt, keys, VALUE_FIELDS[model], now=now)
+    else:
+        stmt = stmt.on_conflict_do_nothing(index_elements=keys)
+    # created_at is only set on insert; now() is the transaction's start
+    return stmt.returning(
+        table.c.equity_id,
+        table.c.trading_date,
+        (table.c.created_at == table.c.updated_at).label("inserted"),
+    )
+
+
+def _key_counts(model, stage: Table, dates):
+    # distinct staged keys, and how many of them the target already holds
+    table = model.__table__
+    keys = (
+        select(stage.c.equity_id, stage.c.trading_date).distinct().subquery()
+    )
+    return select(func.count(), func.count(table.c.equity_id)).select_from(
+        keys.outerjoin(
+            table,
+            (table.c.equity_id == keys.c.equity_id)
+            & (table.c.trading_date == keys.c.trading_date)
+            & date_bounds(table.c.trading_date, dates),
+        )
+    )
+
+
+def _copy_backfill(
+    db: Session, model, rows, chunk_size: int, update: bool, stats, changes
+):
+    columns = KEY_FIELDS + VALUE_FIELDS[model]
+    stage = _staging_table(model)
+    connection = db.connection()
+    stage.create(connection)
+
+    copy_sql = (
+        f"COPY {stage.name} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)"
+    )
+    dates = set()
+    cursor = connection.connection.cursor()
+    try:
+        for batch in batched(rows, chunk_size):
+            records, skipped = prepare_records(model, batch)
+            stats["rows"] += len(batch)
+            stats["skipped"] += skipped
+            if records:
+                cursor.copy_expert(copy_sql, _csv_chunk(records, columns))
+                stats["staged"] += len(records)
+                dates.update(record["trading_date"] for record in records)
+    finally:
+        cursor.close()
+
+    if not dates:
+        stage.drop(connection)
+        return
+    keys, existing = connection.execute(_key_counts(model, stage, dates)).one()
+    now = None
+    if update and model is EquityEODPrice and existing:
+        # keep the stored versions that are about to change
+        table = model.__table__
+        latest = _latest_staged(model, stage).subquery()
+        now = EquityEODPriceRevision.supersede(
+            db,
+            date_bounds(table.c.trading_date, dates),
+            table.c.row_hash.is_distinct_from(latest.c.row_hash),
+            select_from=table.join(
+                latest,
+                (table.c.equity_id == latest.c.equity_id)
+                & (table.c.trading_date == latest.c.trading_date),
+            ),
+        )
+    written = connection.execute(_merge_statement(model, stage, update, now)).all()
+    changes.extend(written)
+    merged = len(written)
+    stats["inserted"] = keys - existing
+    if update:
+        stats["updated"] = merged - stats["inserted"]
+        stats["unchanged"] = existing - stats["updated"]
+    stage.drop(connection)
+
+
+def _insert_backfill(
+    db: Session, model, rows, batch_size: int, update: bool, stats, changes
+):
+    table = model.__table__
+    keys = [table.c.equity_id, table.c.trading_date]
+    for batch in batched(rows, batch_size):
+        records, skipped = prepare_records(model, batch)
+        stats["rows"] += len(batch)
+        stats["skipped"] += skipped
+        if not records:
+            continue
+        stats["staged"] += len(records)
+
+        stmt = insert_for(db, table)
+        if update:
+            pairs = [(r["equity_id"], r["trading_date"]) for r in records]
+            # stored row_hash by key
+            existing = {
+                (equity_id, trading_date): stored
+                for equity_id, trading_date, stored in db.execute(
+                    select(*keys, table.c.row_hash).where(
+                        date_bounds(table.c.trading_date, (day for _, day in pairs)),
+                        tuple_(*keys).in_(pairs),
+                    )
+                )
+            }
+            changed = [
+                pair
+                for pair, record in zip(pairs, records)
+                if pair in existing and existing[pair] != record["row_hash"]
+            ]
+            now = None
+            if model is EquityEODPrice and changed:
+                now = EquityEODPriceRevision.supersede(
+                    db,
+                    date_bounds(table.c.trading_date, (day for _, day in changed)),
+                    tuple_(*keys).in_(changed),
+                )
+            stmt = on_conflict_update_changed(stmt, keys, VALUE_FIELDS[model], now=now)
+            written = [tuple(key) for key in db.execute(stmt.returning(*keys), records)]
+            inserted = len(records) - len(existing)
+            stats["inserted"] += inserted
+            stats["updated"] += len(written) - inserted
+            stats["unchanged"] += len(existing) - (len(written) - inserted)
+            changes.extend((*key, key not in existing) for key in written)
+        else:
+            stmt = stmt.on_conflict_do_nothing(index_elements=keys)
+            written = db.execute(stmt.returning(*keys), records).all()
+            stats["inserted"] += len(written)
+            changes.extend((*key, True) for key in written)
+
+
+@instrumented("backfill", batched=True)
+def backfill(
+    db: Session,
+    model,
+    rows,
+    update: bool = True,
+    chunk_size: int = 100_000,
+    batch_size: int = 500,
+    publish: bool = True,
+) -> dict:
+    """
+    Load `rows` (dicts keyed by column name) into the EOD price or residual
+    quantity table in a single transaction.
+
+    On PostgreSQL rows are streamed with COPY into a temporary staging
+    table, `chunk_size` rows at a time, then merged with one
+    INSERT ... SELECT ... ON CONFLICT. Other dialects fall back to batched
+    executemany inserts of `batch_size` rows. When `update` is true,
+    existing rows are overwritten only if their values changed (compared
+    by row_hash), and the EOD prices they replace are kept in
+    EquityEODPriceRevision; otherwise existing rows are left alone.
+    Inserted and changed rows are published to the change feed
+    (db.changes) in the same transaction unless `publish` is false.
+
+    Returns {"method", "rows", "skipped", "staged", "inserted", "updated",
+    "unchanged", "conflicts", "seconds", "rows_per_second"}.
+    """
+    if model not in VALUE_FIELDS:
+        raise ValueError(f"Backfill is not supported for {model.__name__}")
+
+    copy = db.get_bind().dialect.name == "postgresql"
+    stats = {
+        "method": "copy" if copy else "insert",
+        "rows": 0,
+        "skipped": 0,
+        "staged": 0,
+        "inserted": 0,
+        "updated": 0,
+        "unchanged": 0,
+    }
+    changes = []
+    started = time.perf_counter()
+    try:
+        if copy:
+            _copy_backfill(db, model, rows, chunk_size, update, stats, changes)
+        else:
+            _insert_backfill(db, model, rows, batch_size, update, stats, changes)
+        if publish:
+            publish_changes(db, model.__tablename__, changes)
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise ValueError(f"{model.__tablename__} backfill violates a database constraint")
+
+    stats["conflicts"] = 0 if update else stats["staged"] - stats["inserted"]
+    stats["seconds"] = time.perf_counter() - started
+    stats["rows_per_second"] = stats["rows"] / stats["seconds"] if stats["seconds"] else 0.0
+    return stats
@@ -0,0 +1,197 @@
+"""
+Concurrent page fetcher for the BRVM site
+"""
+
+import asyncio
+import logging
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from functools import partial
+from typing import NamedTuple
+from urllib.parse import urlsplit
+
+import httpx
+
+from ingest.sources import PageRequest
+
+logger = logging.getLogger(__name__)
+
+# Responses worth another attempt
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class Page(NamedTuple):
+    request: PageRequest
+    status_code: int
+    content: bytes
+    fetched_at: datetime
+    # SHA-256 of the content when the page is archived
+    digest: str | None = None
+
+
+class HostRateLimiter:
+    """
+    Space requests to the same host at least 1 / rate seconds apart.
+    """
+
+    def __init__(self, rate: float | None):
+        self.interval = 1.0 / rate if rate else 0.0
+        self._next_slot: dict[str, float] = {}
+        self._locks: dict[str, asyncio.Lock] = {}
+
+    async def wait(self, host: str):
+        if not self.interval:
+            return
+        lock = self._locks.setdefault(host, asyncio.Lock())
+        async with lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+
+class Fetcher:
+    """
+    Download pages through one shared httpx.AsyncClient.
+
+    At most `concurrency` requests are in flight, each host gets at most
+    `rate_per_host` requests per second, and transport errors or retryable
+    statuses are retried with exponential backoff.
+
+    With an `archive` every downloaded page is stored in it, and pages
+    already archived are requested conditionally (If-None-Match /
+    If-Modified-Since); a 304 is answered from the archive. Archive
+    calls (compression, blob files, the SQLite index) run one at a time
+    on a dedicated thread, off the event loop.
+    """
+
+    def __init__(
+        self,
+        concurrency: int = 8,
+        rate_per_host: float | None = 4.0,
+        max_retries: int = 3,
+        backoff: float = 0.5,
+        timeout: float = 30.0,
+        client: httpx.AsyncClient | None = None,
+        archive=None,
+    ):
+        if concurrency < 1:
+            raise ValueError("concurrency must be at least 1")
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.rate_limiter = HostRateLimiter(rate_per_host)
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._client = client
+        self._owns_client = client is None
+        self.archive = archive
+        self._archive_thread = None
+
+    @classmethod
+    def from_settings(cls, settings, **kwargs):
+        kwargs.setdefault("concurrency", settings.INGEST_CONCURRENCY)
+        kwargs.setdefault("rate_per_host", settings.INGEST_RATE_PER_HOST)
+        kwargs.setdefault("max_retries", settings.INGEST_MAX_RETRIES)
+        return cls(**kwargs)
+
+    async def __aenter__(self):
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                follow_redirects=True,
+                limits=httpx.Limits(
+                    max_connections=self.concurrency,
+                    max_keepalive_connections=self.concurrency,
+                ),
+            )
+        if self.archive is not None:
+            self._archive_thread = ThreadPoolExecutor(1, "raw-archive")
+        return self
+
+    async def __aexit__(self, *exc_info):
+        if self._owns_client and self._client is not None:
+            await self._client.aclose()
+            self._client = None
+        if self._archive_thread is not None:
+            self._archive_thread.shutdown()
+            self._archive_thread = None
+
+    async def _archive_call(self, method, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._archive_thread, partial(method, *args, **kwargs)
+        )
+
+    async def fetch(self, request: PageRequest) -> Page:
+        if self._client is None:
+            raise RuntimeError("Fetcher must be used as an async context manager")
+
+        host = urlsplit(request.url).netloc
+        cached = None
+        if self.archive is not None:
+            cached = await self._archive_call(self.archive.lookup, request.url)
+        headers = _conditional_headers(cached)
+        attempt = 0
+        while True:
+            # hold a concurrency slot for the request only, not the backoff
+            async with self._semaphore:
+                await self.rate_limiter.wait(host)
+                try:
+                    response = await self._client.get(request.url, headers=headers)
+                except httpx.TransportError as exc:
+                    response, error = None, exc
+
+            if response is not None:
+                if response.status_code not in RETRY_STATUSES:
+                    return await self._page(request, response, cached)
+                error = httpx.HTTPStatusError(
+                    f"{response.status_code} for {request.url}",
+                    request=response.request,
+                    response=response,
+                )
+
+            if attempt >= self.max_retries:
+                raise error
+            delay = self.backoff * 2 ** attempt * (1 + random.random() / 2)
+            attempt += 1
+            logger.warning(
+                "Retrying %s in %.2fs (attempt %d): %s",
+                request.url, delay, attempt, error,
+            )
+            await asyncio.sleep(delay)
+
+    async def _page(
+        self, request: PageRequest, response: httpx.Response, cached
+    ) -> Page:
+        fetched_at = datetime.now()
+        if response.status_code == 304 and cached is not None:
+            await self._archive_call(self.archive.touch, request.url, fetched_at)
+            content = await self._archive_call(self.archive.read_blob, cached.digest)
+            return Page(request, 304, content, fetched_at, cached.digest)
+
+        response.raise_for_status()
+        digest = None
+        if self.archive is not None:
+            digest = await self._archive_call(
+                self.archive.put,
+                request,
+                response.content,
+                etag=response.headers.get("ETag"),
+                last_modified=response.headers.get("Last-Modified"),
+                fetched_at=fetched_at,
+            )
+        return Page(request, response.status_code, response.content, fetched_at, digest)
+
+
+def _conditional_headers(cached) -> dict:
+    headers = {}
+    if cached is not None:
+        if cached.etag:
+            headers["If-None-Match"] = cached.etag
+        if cached.last_modified:
+            headers["If-Modified-Since"] = cached.last_modified
+    return headers
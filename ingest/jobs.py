@@ -0,0 +1,232 @@
+"""
+Sharded, resumable backfill of BRVM pages over a process pool
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date, timedelta
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from db.upsert import batched
+from ingest.archive import ArchiveFetcher
+from ingest.backfill import backfill
+from ingest.fetcher import Fetcher
+from ingest.pipeline import run_pipeline
+from ingest.sources import BRVM_BASE_URL, requests_for
+from metrics.summary import refresh_market_summaries
+from models.enums import JobStatusEnum
+from models.jobs import BackfillShard
+from models.reference import reference_cache
+from models.trading import EquityEODPrice, EquityResidualQuantity
+from models.trading_calendar import TradingCalendar
+
+logger = logging.getLogger(__name__)
+
+
+def split_shards(days: list[date], shards: int) -> list[tuple[date, date]]:
+    """
+    Split sorted trading days into at most `shards` contiguous ranges of
+    nearly equal length.
+    """
+    if shards < 1:
+        raise ValueError("shard count must be at least 1")
+    size, extra = divmod(len(days), shards)
+    ranges, first = [], 0
+    for number in range(min(shards, len(days))):
+        last = first + size + (number < extra)
+        ranges.append((days[first], days[last - 1]))
+        first = last
+    return ranges
+
+
+def plan_job(db: Session, name: str, days: list[date], shards: int) -> list[int]:
+    """
+    Create the shards of job `name` the first time it runs. Returns the
+    ids of the shards that aren't done yet, so a rerun resumes the job.
+    """
+    existing = db.scalars(
+        select(BackfillShard).where(BackfillShard.job_name == name)
+    ).all()
+    if not existing:
+        existing = [
+            BackfillShard(job_name=name, shard_start=start, shard_end=end)
+            for start, end in split_shards(days, shards)
+        ]
+        db.add_all(existing)
+        db.commit()
+    return [
+        shard.shard_id
+        for shard in sorted(existing, key=lambda shard: shard.shard_start)
+        if shard.status != JobStatusEnum.DONE
+    ]
+
+
+def _split_rows(db: Session, rows):
+    from ingest.parser import EODRow
+
+    eod, residual, unknown = [], [], 0
+    for row in rows:
+        equity_id = reference_cache.equity_id(db, row.ticker)
+        if equity_id is None:
+            unknown += 1
+            continue
+        record = row._asdict()
+        record["equity_id"] = equity_id
+        (eod if isinstance(row, EODRow) else residual).append(record)
+    return eod, residual, unknown
+
+
+async def _run_days(
+    db: Session,
+    shard: BackfillShard,
+    days,
+    base_url,
+    step_days,
+    fetcher_options,
+    offline,
+):
+    # lxml and numpy are only needed once a shard runs, not by the CLI
+    from ingest.parser import parse_page
+    from ingest.validation import validate_rows
+
+    fetcher_class = ArchiveFetcher if offline else Fetcher
+    fetcher = fetcher_class(**fetcher_options)
+    async with fetcher:
+        for step in batched(days, step_days):
+            started = time.perf_counter()
+            rows = []
+            stats = await run_pipeline(
+                requests_for(step, base_url=base_url), fetcher, parse_page, rows.extend
+            )
+            eod, residual, unknown = _split_rows(db, rows)
+            if unknown:
+                logger.warning("%s: %d rows for unknown tickers", shard.job_name, unknown)
+            # rejects go to quarantine with the step's rows, warned rows are stored
+            eod = validate_rows(db, EquityEODPrice, eod).passed
+            residual = validate_rows(db, EquityResidualQuantity, residual).passed
+            if eod:
+                backfill(db, EquityEODPrice, eod)
+            if residual:
+                backfill(db, EquityResidualQuantity, residual)
+            if eod:
+                # the step's days are complete
+                refresh_market_summaries(db, step)
+
+            # checkpoint once the step is stored
+            shard.last_completed_date = step[-1]
+            shard.pages += stats["pages"]
+            shard.failed_pages += stats["failed"]
+            shard.rows += len(eod) + len(residual)
+            shard.seconds += time.perf_counter() - started
+            db.commit()
+
+
+def run_shard(
+    db: Session,
+    shard_id: int,
+    base_url: str = BRVM_BASE_URL,
+    step_days: int = 20,
+    fetcher_options: dict | None = None,
+    offline: bool = False,
+) -> dict:
+    """
+    Fetch, parse and store every trading day of a shard, `step_days` at a
+    time, checkpointing after each step. Resumes after the last completed
+    day. Returns the shard's counters for this attempt.
+
+    `fetcher_options` are passed to Fetcher, or to ArchiveFetcher when
+    `offline` re-ingests pages from the raw archive.
+    """
+    shard = db.get(BackfillShard, shard_id)
+    start = shard.shard_start
+    if shard.last_completed_date is not None:
+        start = shard.last_completed_date + timedelta(days=1)
+    days = TradingCalendar.from_db(db).between(start, shard.shard_end)
+
+    before = (shard.pages, shard.rows)
+    shard.status = JobStatusEnum.RUNNING
+    shard.attempts += 1
+    shard.error = None
+    db.commit()
+
+    started = time.perf_counter()
+    try:
+        asyncio.run(
+            _run_days(
+                db, shard, days, base_url, step_days, fetcher_options or {}, offline
+            )
+        )
+    except BaseException as exc:
+        db.rollback()
+        shard.status = JobStatusEnum.FAILED
+        shard.error = repr(exc)[:1000]
+        db.commit()
+        raise
+    shard.status = JobStatusEnum.DONE
+    db.commit()
+
+    seconds = time.perf_counter() - started
+    rows = shard.rows - before[1]
+    return {
+        "shard_id": shard_id,
+        "start": shard.shard_start,
+        "end": shard.shard_end,
+        "days": len(days),
+        "pages": shard.pages - before[0],
+        "rows": rows,
+        "seconds": seconds,
+        "rows_per_second": rows / seconds if seconds else 0.0,
+    }
+
+
+# Per-process session factory, set by _init_worker
+_session_factory = None
+
+
+def _init_worker():
+    global _session_factory
+    from db.session import create_session_factory
+
+    # one connection per worker is all a shard needs
+    _session_factory = create_session_factory(pool_size=1, max_overflow=0)
+
+
+def _run_in_worker(shard_id, base_url, step_days, fetcher_options, offline):
+    with _session_factory() as db:
+        return run_shard(db, shard_id, base_url, step_days, fetcher_options, offline)
+
+
+def run_job(
+    shard_ids,
+    workers: int,
+    base_url: str = BRVM_BASE_URL,
+    step_days: int = 20,
+    fetcher_options: dict | None = None,
+    offline: bool = False,
+):
+    """
+    Run shards on a pool of `workers` processes, each with its own engine.
+    Yields each shard's stats as it finishes; a failed shard is logged and
+    left FAILED for the next run.
+    """
+    # spawn: children must not inherit the parent's pooled connections
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(
+        workers, mp_context=context, initializer=_init_worker
+    ) as pool:
+        futures = {
+            pool.submit(
+                _run_in_worker, shard_id, base_url, step_days, fetcher_options, offline
+            ): shard_id
+            for shard_id in shard_ids
+        }
+        for future in as_completed(futures):
+            try:
+                yield future.result()
+            except Exception as exc:
+                logger.error("Shard %s failed: %r", futures[future], exc)
@@ -0,0 +1,281 @@
+"""
+Streaming parser for BRVM quotation pages and bulletins
+"""
+
+import logging
+import math
+import re
+from datetime import date
+from html.parser import HTMLParser
+from io import BytesIO
+from typing import Iterable, Iterator, NamedTuple
+
+from ingest.sources import source_ref
+
+try:
+    from lxml import etree
+except ImportError:  # pragma: no cover - depends on the environment
+    etree = None
+
+logger = logging.getLogger(__name__)
+
+# lxml streams with iterparse, html.parser is the pure-Python fallback
+DEFAULT_BACKEND = "lxml" if etree is not None else "html.parser"
+
+
+class EODRow(NamedTuple):
+    ticker: str
+    trading_date: date
+    open_price: float | None
+    high_price: float | None
+    low_price: float | None
+    close_price: float | None
+    volume: int | None
+    traded_value: float | None
+    data_source: str | None
+
+
+class ResidualRow(NamedTuple):
+    ticker: str
+    trading_date: date
+    buy_price: float | None
+    buy_quantity: int | None
+    sell_price: float | None
+    sell_quantity: int | None
+    data_source: str | None
+
+
+# Normalized column header -> row field
+HEADER_FIELDS = {
+    "symbole": "ticker",
+    "code": "ticker",
+    "ouverture": "open_price",
+    "cours ouverture": "open_price",
+    "cours d'ouverture": "open_price",
+    "plus haut": "high_price",
+    "cours plus haut": "high_price",
+    "plus bas": "low_price",
+    "cours plus bas": "low_price",
+    "cloture": "close_price",
+    "cours cloture": "close_price",
+    "cours de cloture": "close_price",
+    "volume": "volume",
+    "titres echanges": "volume",
+    "quantite echangee": "volume",
+    "valeur": "traded_value",
+    "valeur echangee": "traded_value",
+    "prix achat": "buy_price",
+    "cours acheteur": "buy_price",
+    "quantite achat": "buy_quantity",
+    "qte achat": "buy_quantity",
+    "prix vente": "sell_price",
+    "cours vendeur": "sell_price",
+    "quantite vente": "sell_quantity",
+    "qte vente": "sell_quantity",
+}
+
+INT_FIELDS = {"volume", "buy_quantity", "sell_quantity"}
+MISSING = {"", "-", "--", "—", "n/a", "nd", "n.d."}
+
+# Spaces used as thousands separators are dropped and the decimal comma
+# becomes a dot in a single translate() pass per cell
+_NUMBER_TABLE = str.maketrans({" ": None, "\xa0": None, "\u202f": None, ",": "."})
+_HEADER_TABLE = str.maketrans("éèêàâîôûùç", "eeeaaiouuc")
+_UNITS = re.compile(r"\(.*?\)")
+
+
+def parse_number(text: str, integer: bool = False):
+    """
+    Parse a French-formatted number such as "1 234,50". Empty,
+    placeholder and malformed cells, including "nan", "inf" and values
+    that overflow a float, return None.
+    """
+    text = text.strip()
+    if text.lower() in MISSING:
+        return None
+    try:
+        value = float(text.translate(_NUMBER_TABLE))
+    except ValueError:
+        value = math.nan
+    if not math.isfinite(value):
+        logger.warning("Ignoring malformed number %r", text)
+        return None
+    return int(value) if integer else value
+
+
+def normalize_header(text: str) -> str:
+    text = _UNITS.sub("", text.lower().translate(_HEADER_TABLE))
+    return " ".join(text.split())
+
+
+class _TableState:
+    """
+    Map the cells of each table row to a typed row, one row at a time.
+    """
+
+    def __init__(self, trading_date: date, data_source: str | None):
+        self.trading_date = trading_date
+        self.data_source = data_source
+        self.fields: list[str | None] = []
+
+    def start_table(self):
+        self.fields = []
+
+    def header(self, cells: list[str]):
+        self.fields = [HEADER_FIELDS.get(normalize_header(c)) for c in cells]
+
+    def row(self, cells: list[str]):
+        if "ticker" not in self.fields or len(cells) != len(self.fields):
+            return None
+        values = {}
+        for field, text in zip(self.fields, cells):
+            if field == "ticker":
+                values[field] = text.strip()
+            elif field is not None:
+                values[field] = parse_number(text, field in INT_FIELDS)
+        if not values["ticker"]:
+            return None
+
+        common = {
+            "trading_date": self.trading_date,
+            "data_source": self.data_source,
+        }
+        if "close_price" in values:
+            return EODRow(
+                ticker=values["ticker"],
+                open_price=values.get("open_price"),
+                high_price=values.get("high_price"),
+                low_price=values.get("low_price"),
+                close_price=values["close_price"],
+                volume=values.get("volume"),
+                traded_value=values.get("traded_value"),
+                **common,
+            )
+        if values.keys() & {"buy_price", "sell_price", "buy_quantity", "sell_quantity"}:
+            return ResidualRow(
+                ticker=values["ticker"],
+                buy_price=values.get("buy_price"),
+                buy_quantity=values.get("buy_quantity"),
+                sell_price=values.get("sell_price"),
+                sell_quantity=values.get("sell_quantity"),
+                **common,
+            )
+        return None
+
+
+def _parse_lxml(content: bytes, state: _TableState, encoding: str) -> Iterator:
+    for event, element in etree.iterparse(
+        BytesIO(content),
+        events=("start", "end"),
+        tag=("table", "tr"),
+        html=True,
+        encoding=encoding,
+    ):
+        if event == "start":
+            if element.tag == "table":
+                state.start_table()
+            continue
+
+        if element.tag == "tr":
+            cells = [
+                cell.text if len(cell) == 0 else "".join(cell.itertext())
+                for cell in element
+                if cell.tag in ("td", "th")
+            ]
+            if any(cell.tag == "th" for cell in element):
+                state.header([text or "" for text in cells])
+            elif (row := state.row([text or "" for text in cells])) is not None:
+                yield row
+
+        # drop the finished subtree so memory does not grow with the page
+        element.clear()
+        while element.getprevious() is not None:
+            del element.getparent()[0]
+
+
+class _StreamingHTMLParser(HTMLParser):
+    def __init__(self, state: _TableState):
+        super().__init__(convert_charrefs=True)
+        self.state = state
+        self.rows: list = []
+        self.cells: list[str] | None = None
+        self.cell: list[str] | None = None
+        self.header = False
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "table":
+            self.state.start_table()
+        elif tag == "tr":
+            self.cells, self.header = [], False
+        elif tag in ("th", "td") and self.cells is not None:
+            self.cell = []
+            self.header = self.header or tag == "th"
+
+    def handle_endtag(self, tag):
+        if tag in ("th", "td") and self.cell is not None:
+            self.cells.append("".join(self.cell))
+            self.cell = None
+        elif tag == "tr" and self.cells is not None:
+            if self.header:
+                self.state.header(self.cells)
+            elif (row := self.state.row(self.cells)) is not None:
+                self.rows.append(row)
+            self.cells = None
+
+    def handle_data(self, data):
+        if self.cell is not None:
+            self.cell.append(data)
+
+
+def _parse_html_parser(
+    content: bytes, state: _TableState, encoding: str, chunk_size: int = 65536
+):
+    parser = _StreamingHTMLParser(state)
+    text = content.decode(encoding, errors="replace")
+    for start in range(0, len(text), chunk_size):
+        parser.feed(text[start:start + chunk_size])
+        yield from parser.rows
+        parser.rows.clear()
+    parser.close()
+    yield from parser.rows
+
+
+def parse_document(
+    content: bytes,
+    trading_date: date,
+    data_source: str | None = None,
+    backend: str | None = None,
+    encoding: str = "utf-8",
+) -> Iterator[EODRow | ResidualRow]:
+    """
+    Yield EOD and residual rows from one quotation page or bulletin.
+
+    Tables are recognised by their column headers, so price and residual
+    tables may appear in the same document.
+    """
+    backend = backend or DEFAULT_BACKEND
+    state = _TableState(trading_date, data_source)
+    if backend == "lxml":
+        if etree is None:
+            raise ValueError("lxml is not installed")
+        return _parse_lxml(content, state, encoding)
+    if backend == "html.parser":
+        return _parse_html_parser(content, state, encoding)
+    raise ValueError(f"Unknown parser backend '{backend}'")
+
+
+def parse_page(page, backend: str | None = None) -> Iterator:
+    """
+    Yield rows from a fetched page. Rows are tagged with the archived blob
+    the page was stored as, or with the page URL when it wasn't archived.
+    """
+    data_source = source_ref(page.digest) if page.digest else page.request.url
+    return parse_document(page.content, page.request.trading_date, data_source, backend)
+
+
+def parse_pages(pages: Iterable, backend: str | None = None) -> Iterator:
+    """
+    Yield rows from a stream of fetched pages, one page in memory at a time.
+    """
+    for page in pages:
+        yield from parse_page(page, backend)
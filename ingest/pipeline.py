@@ -0,0 +1,124 @@
+"""
+Fetch -> parse -> write pipeline
+"""
+
+import asyncio
+import inspect
+import logging
+import time
+from typing import TYPE_CHECKING
+
+import httpx
+from sqlalchemy.orm import Session
+
+from ingest.archive import PageNotArchived
+from ingest.fetcher import Fetcher
+
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+logger = logging.getLogger(__name__)
+
+# Marks the end of the row stream
+_DONE = object()
+
+
+def db_writer(db: Session, model):
+    """
+    Return a write callable that stores each batch with model.bulk_create.
+    run_pipeline calls it in a worker thread, one batch at a time.
+    """
+
+    def write(batch):
+        return model.bulk_create(db, batch, batch_size=len(batch))
+
+    return write
+
+
+def async_db_writer(db: "AsyncSession", model):
+    """
+    Async counterpart of db_writer, so writes are awaited on the
+    pipeline's event loop instead of blocking it.
+    """
+
+    async def write(batch):
+        return await model.abulk_create(db, batch, batch_size=len(batch))
+
+    return write
+
+
+async def run_pipeline(
+    requests,
+    fetcher: Fetcher,
+    parse,
+    write,
+    batch_size: int = 500,
+    queue_size: int = 5000,
+) -> dict:
+    """
+    Fetch every request, parse each page into rows and write them in batches.
+
+    `parse(page)` returns an iterable of rows and `write(batch)` may be a
+    plain or async callable. Fetch workers and the writer run concurrently
+    and are connected by a bounded queue, so network waits overlap with
+    parsing and inserts. Parsing and plain writers run in worker threads so
+    they don't stall the event loop; async writers are awaited on it.
+    Pages that still fail after retries are counted and skipped.
+    """
+    workers = fetcher.concurrency
+    request_queue: asyncio.Queue = asyncio.Queue(maxsize=workers * 2)
+    row_queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+    stats = {"pages": 0, "failed": 0, "rows": 0, "batches": 0}
+    started = time.perf_counter()
+
+    async def feed():
+        for request in requests:
+            await request_queue.put(request)
+        for _ in range(workers):
+            await request_queue.put(None)
+
+    async def fetch_worker():
+        while (request := await request_queue.get()) is not None:
+            try:
+                page = await fetcher.fetch(request)
+            except (httpx.HTTPError, PageNotArchived) as exc:
+                stats["failed"] += 1
+                logger.error("Giving up on %s: %s", request.url, exc)
+                continue
+            stats["pages"] += 1
+            rows = await asyncio.to_thread(lambda: list(parse(page)))
+            for row in rows:
+                await row_queue.put(row)
+
+    async def produce():
+        await asyncio.gather(feed(), *(fetch_worker() for _ in range(workers)))
+        await row_queue.put(_DONE)
+
+    async def flush(batch):
+        if inspect.iscoroutinefunction(write):
+            await write(batch)
+        else:
+            # blocking driver I/O stays off the event loop
+            await asyncio.to_thread(write, batch)
+        stats["rows"] += len(batch)
+        stats["batches"] += 1
+
+    async def writer():
+        batch = []
+        while (row := await row_queue.get()) is not _DONE:
+            batch.append(row)
+            if len(batch) >= batch_size:
+                await flush(batch)
+                batch = []
+        if batch:
+            await flush(batch)
+
+    async with asyncio.TaskGroup() as group:
+        group.create_task(writer())
+        group.create_task(produce())
+
+    stats["seconds"] = time.perf_counter() - started
+    stats["pages_per_second"] = (
+        stats["pages"] / stats["seconds"] if stats["seconds"] else 0.0
+    )
+    return stats
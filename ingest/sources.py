@@ -0,0 +1,68 @@
+"""
+BRVM page locations
+"""
+
+from datetime import date
+from typing import NamedTuple
+
+from config.defaults import BRVM_BASE_URL
+
+# Page kinds
+DAILY_QUOTES = "quotes"
+BULLETIN = "bulletin"
+
+# data_source prefix of rows parsed from an archived page
+SOURCE_PREFIX = "sha256:"
+
+# Paths are relative to the base URL
+DAILY_QUOTES_PATH = "/fr/cours-actions/0"
+BULLETIN_PATH = "/fr/bulletins-officiels-de-la-cote"
+
+
+class PageRequest(NamedTuple):
+    kind: str
+    url: str
+    trading_date: date
+    ticker: str | None = None
+
+
+def source_ref(digest: str) -> str:
+    """The data_source value pointing at an archived page."""
+    return f"{SOURCE_PREFIX}{digest}"
+
+
+def digest_of(data_source: str | None) -> str | None:
+    """The archive digest referenced by a data_source value, if any."""
+    if data_source and data_source.startswith(SOURCE_PREFIX):
+        return data_source[len(SOURCE_PREFIX):]
+    return None
+
+
+def daily_quotes_request(
+    trading_date: date, ticker: str | None = None, base_url: str = BRVM_BASE_URL
+) -> PageRequest:
+    url = f"{base_url}{DAILY_QUOTES_PATH}?date={trading_date.isoformat()}"
+    if ticker:
+        url += f"&symbole={ticker}"
+    return PageRequest(DAILY_QUOTES, url, trading_date, ticker)
+
+
+def bulletin_request(
+    trading_date: date, base_url: str = BRVM_BASE_URL
+) -> PageRequest:
+    url = f"{base_url}{BULLETIN_PATH}?date={trading_date.isoformat()}"
+    return PageRequest(BULLETIN, url, trading_date)
+
+
+def requests_for(dates, tickers=None, base_url: str = BRVM_BASE_URL):
+    """
+    Yield the bulletin and quotation requests for every date, and one
+    quotation request per ticker when tickers are given.
+    """
+    for trading_date in dates:
+        yield bulletin_request(trading_date, base_url)
+        if tickers:
+            for ticker in tickers:
+                yield daily_quotes_request(trading_date, ticker, base_url)
+        else:
+            yield daily_quotes_request(trading_date, base_url=base_url)
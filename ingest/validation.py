@@ -0,0 +1,308 @@
+"""
+Vectorized data-quality validation of EOD price and residual rows
+
+Each check runs as an array operation over a whole batch and sets an
+Issue bit per row. Rows with a rejecting issue are quarantined instead of
+stored; rows with warnings only are stored and counted.
+"""
+
+import logging
+from datetime import date, timedelta
+from enum import IntFlag
+from functools import reduce
+from typing import NamedTuple
+
+import numpy as np
+from sqlalchemy import func, insert, or_, select, tuple_
+from sqlalchemy.orm import Session
+
+from db.instrument import instrumented
+from models.quality import QuarantinedRow
+from models.trading import EquityEODPrice, EquityResidualQuantity
+
+logger = logging.getLogger(__name__)
+
+# BRVM daily price band: a close may move at most 7.5% from the last close
+PRICE_BAND = 0.075
+# slack for tick rounding at the band's edge
+BAND_TOLERANCE = 0.001
+# relative slack of traded_value against low * volume .. high * volume
+VALUE_TOLERANCE = 0.01
+# how far back the last close before a batch is looked up
+PREVIOUS_CLOSE_LOOKBACK = timedelta(days=30)
+
+
+class Issue(IntFlag):
+    MISSING_KEY = 1 << 0
+    MISSING_CLOSE = 1 << 1
+    NON_POSITIVE_PRICE = 1 << 2
+    NEGATIVE_VOLUME = 1 << 3
+    NEGATIVE_VALUE = 1 << 4
+    HIGH_BELOW_LOW = 1 << 5
+    OPEN_OUTSIDE_RANGE = 1 << 6
+    CLOSE_OUTSIDE_RANGE = 1 << 7
+    NEGATIVE_QUANTITY = 1 << 8
+    QUANTITY_WITHOUT_PRICE = 1 << 9
+    # warnings
+    VALUE_MISMATCH = 1 << 16
+    PRICE_BAND = 1 << 17
+    CROSSED_BOOK = 1 << 18
+
+
+WARNINGS = Issue.VALUE_MISMATCH | Issue.PRICE_BAND | Issue.CROSSED_BOOK
+REJECTING = ~WARNINGS
+
+
+class ValidationResult(NamedTuple):
+    # rows to store (accepted and warned), in their original order
+    passed: list[dict]
+    rejected: list[dict]
+    # Issue bits per input row
+    issues: np.ndarray
+    counts: dict[str, int]
+
+
+def _column(rows, field) -> np.ndarray:
+    # None becomes NaN, so comparisons on missing values are False
+    return np.array([row.get(field) for row in rows], dtype=np.float64)
+
+
+def _missing_key(rows) -> np.ndarray:
+    return np.array(
+        [row.get("equity_id") is None or row.get("trading_date") is None for row in rows],
+        dtype=bool,
+    )
+
+
+def _flags(*checks) -> np.ndarray:
+    """Combine (mask, Issue) pairs into one int array of Issue bits."""
+    return reduce(
+        np.bitwise_or,
+        (np.where(mask, int(issue), 0) for mask, issue in checks),
+    ).astype(np.int64)
+
+
+def _previous_in_batch(rows, close, missing_key, previous_close):
+    """
+    Each row's previous close: the close of the same equity's row just
+    before it in the batch, else `previous_close[equity_id]`, else NaN.
+    """
+    count = len(rows)
+    equity_ids = np.array(
+        [-1 if missing else row["equity_id"] for row, missing in zip(rows, missing_key)],
+        dtype=np.int64,
+    )
+    ordinals = np.array(
+        [0 if missing else row["trading_date"].toordinal()
+         for row, missing in zip(rows, missing_key)],
+        dtype=np.int64,
+    )
+    order = np.lexsort((ordinals, equity_ids))
+    sorted_ids = equity_ids[order]
+    first = np.ones(count, dtype=bool)
+    first[1:] = sorted_ids[1:] != sorted_ids[:-1]
+
+    previous = np.empty(count)
+    previous[1:] = close[order][:-1]
+    previous[first] = [
+        previous_close.get(int(equity_id), np.nan) for equity_id in sorted_ids[first]
+    ]
+    result = np.empty(count)
+    result[order] = previous
+    return result
+
+
+def check_eod(rows, previous_close: dict[int, float] | None = None) -> np.ndarray:
+    """
+    Issue bits for a batch of EOD row dicts. `previous_close` maps
+    equity_id to its last close before the batch, for the price band.
+    """
+    if not rows:
+        return np.zeros(0, dtype=np.int64)
+    missing_key = _missing_key(rows)
+    open_, high, low, close = (
+        _column(rows, field)
+        for field in ("open_price", "high_price", "low_price", "close_price")
+    )
+    volume = _column(rows, "volume")
+    value = _column(rows, "traded_value")
+    previous = _previous_in_batch(rows, close, missing_key, previous_close or {})
+
+    # bounds of traded_value: every share changed hands between low and high,
+    # or at the close when the day's range is missing
+    floor = np.where(np.isnan(low), close, low) * volume * (1 - VALUE_TOLERANCE)
+    ceiling = np.where(np.isnan(high), close, high) * volume * (1 + VALUE_TOLERANCE)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        move = np.abs(close / previous - 1.0)
+
+    return _flags(
+        (missing_key, Issue.MISSING_KEY),
+        (np.isnan(close), Issue.MISSING_CLOSE),
+        (
+            (open_ <= 0) | (high <= 0) | (low <= 0) | (close <= 0),
+            Issue.NON_POSITIVE_PRICE,
+        ),
+        (volume < 0, Issue.NEGATIVE_VOLUME),
+        (value < 0, Issue.NEGATIVE_VALUE),
+        (high < low, Issue.HIGH_BELOW_LOW),
+        ((open_ < low) | (open_ > high), Issue.OPEN_OUTSIDE_RANGE),
+        ((close < low) | (close > high), Issue.CLOSE_OUTSIDE_RANGE),
+        (
+            ((volume > 0) & ((value < floor) | (value > ceiling)))
+            | ((volume == 0) & (value > 0)),
+            Issue.VALUE_MISMATCH,
+        ),
+        (move > PRICE_BAND + BAND_TOLERANCE, Issue.PRICE_BAND),
+    )
+
+
+def check_residual(rows) -> np.ndarray:
+    """Issue bits for a batch of residual quantity row dicts."""
+    if not rows:
+        return np.zeros(0, dtype=np.int64)
+    buy_price, sell_price = _column(rows, "buy_price"), _column(rows, "sell_price")
+    buy_quantity = _column(rows, "buy_quantity")
+    sell_quantity = _column(rows, "sell_quantity")
+    return _flags(
+        (_missing_key(rows), Issue.MISSING_KEY),
+        ((buy_price <= 0) | (sell_price <= 0), Issue.NON_POSITIVE_PRICE),
+        ((buy_quantity < 0) | (sell_quantity < 0), Issue.NEGATIVE_QUANTITY),
+        (
+            ((buy_quantity > 0) & np.isnan(buy_price))
+            | ((sell_quantity > 0) & np.isnan(sell_price)),
+            Issue.QUANTITY_WITHOUT_PRICE,
+        ),
+        (buy_price > sell_price, Issue.CROSSED_BOOK),
+    )
+
+
+def reasons(issues: int) -> str:
+    """Comma-separated names of the Issue bits set in `issues`."""
+    return ",".join(issue.name for issue in Issue if issues & issue)
+
+
+def previous_closes(db: Session, equity_ids, before: date) -> dict[int, float]:
+    """
+    Last close of each equity in the PREVIOUS_CLOSE_LOOKBACK days before
+    `before`; equities that didn't trade then are left out.
+    """
+    equity_ids = list(set(equity_ids))
+    if not equity_ids:
+        return {}
+    start = before - PREVIOUS_CLOSE_LOOKBACK
+    column = EquityEODPrice.trading_date
+    # constant bounds, so partitions outside the window are pruned
+    window = (
+        column >= start,
+        column < before,
+        EquityEODPrice.equity_id.in_(equity_ids),
+    )
+    latest = (
+        select(EquityEODPrice.equity_id, func.max(column))
+        .where(*window)
+        .group_by(EquityEODPrice.equity_id)
+    )
+    return dict(
+        db.execute(
+            select(EquityEODPrice.equity_id, EquityEODPrice.close_price).where(
+                *window, tuple_(EquityEODPrice.equity_id, column).in_(latest)
+            )
+        ).all()
+    )
+
+
+def _payload(row: dict) -> dict:
+    return {
+        name: value.isoformat() if isinstance(value, date) else value
+        for name, value in row.items()
+    }
+
+
+def quarantine(db: Session, model, rows, issues) -> int:
+    """
+    Store rejected rows with their reasons, skipping those already
+    quarantined for the same (equity_id, trading_date, reasons), so a
+    retried step doesn't store them twice. Doesn't commit.
+    """
+    records = [
+        {
+            "table_name": model.__tablename__,
+            "equity_id": row.get("equity_id"),
+            "trading_date": row.get("trading_date"),
+            "reasons": reasons(int(flags)),
+            "payload": _payload(row),
+            "data_source": row.get("data_source"),
+        }
+        for row, flags in zip(rows, issues)
+    ]
+    if not records:
+        return 0
+    dates = {record["trading_date"] for record in records}
+    column = QuarantinedRow.trading_date
+    seen = set(
+        db.execute(
+            select(QuarantinedRow.equity_id, column, QuarantinedRow.reasons).where(
+                QuarantinedRow.table_name == model.__tablename__,
+                or_(column.in_(dates - {None}), column.is_(None))
+                if None in dates
+                else column.in_(dates),
+            )
+        ).all()
+    )
+    new = []
+    for record in records:
+        key = (record["equity_id"], record["trading_date"], record["reasons"])
+        if key not in seen:
+            seen.add(key)
+            new.append(record)
+    if new:
+        db.execute(insert(QuarantinedRow), new)
+    return len(new)
+
+
+@instrumented("validate_rows")
+def validate_rows(db: Session, model, rows) -> ValidationResult:
+    """
+    Validate a batch of EOD price or residual row dicts and quarantine the
+    rejects. Doesn't commit: they are stored with the caller's transaction.
+    Returns the rows to store and the counts of accepted, warned and
+    rejected rows and of each issue.
+    """
+    rows = list(rows)
+    if model is EquityEODPrice:
+        keyed = [
+            row for row in rows
+            if row.get("equity_id") is not None and row.get("trading_date") is not None
+        ]
+        previous = {}
+        if keyed:
+            first_day = min(row["trading_date"] for row in keyed)
+            previous = previous_closes(db, (row["equity_id"] for row in keyed), first_day)
+        issues = check_eod(rows, previous)
+    elif model is EquityResidualQuantity:
+        issues = check_residual(rows)
+    else:
+        raise ValueError(f"Validation is not supported for {model.__name__}")
+
+    rejected_mask = (issues & int(REJECTING)) != 0
+    warned_mask = ~rejected_mask & (issues != 0)
+    rejected_index = np.flatnonzero(rejected_mask)
+    rejected = [rows[i] for i in rejected_index]
+    passed = [rows[i] for i in np.flatnonzero(~rejected_mask)]
+
+    counts = {
+        "accepted": int((issues == 0).sum()),
+        "warned": int(warned_mask.sum()),
+        "rejected": len(rejected),
+    }
+    for issue in Issue:
+        hits = int(((issues & int(issue)) != 0).sum())
+        if hits:
+            counts[issue.name] = hits
+
+    if rejected:
+        quarantine(db, model, rejected, issues[rejected_index])
+        logger.warning(
+            "%s: quarantined %d of %d rows", model.__tablename__, len(rejected), len(rows)
+        )
+    return ValidationResult(passed, rejected, issues, counts)
@@ -2,4 +2,247 @@
 main.py
 """
 
-print("Hello, BRVM Finance Application!")
+import argparse
+import os
+import time
+from datetime import date, timedelta
+
+
+def export_command(args):
+    from db.session import SessionLocal
+    from export.parquet import export_dataset
+
+    started = time.perf_counter()
+    with SessionLocal() as db:
+        stats = export_dataset(
+            db, args.output, incremental=args.incremental, batch_size=args.batch_size
+        )
+    for table, counts in stats.items():
+        print(f"{table:30} {counts['rows']:10} rows {counts['partitions']:6} files")
+    print(f"Exported in {time.perf_counter() - started:.1f}s")
+
+
+def seed_command(args):
+    from db.session import SessionLocal
+    from db.seed import seed
+
+    with SessionLocal() as db:
+        stats = seed(db, args.workbook)
+    print(
+        f"Seeded {stats['companies']} companies and {stats['equities']} equities "
+        f"from {stats['rows']} rows "
+        f"(read {stats['read_seconds']:.2f}s, write {stats['write_seconds']:.2f}s)"
+    )
+
+
+def partitions_command(args):
+    from db.partitions import create_next_year_partitions
+    from db.session import SessionLocal
+
+    with SessionLocal() as db:
+        created = create_next_year_partitions(db)
+    print(f"Created partitions: {', '.join(created)}" if created else "Partitions up to date")
+
+
+def backfill_command(args):
+    from config.settings import get_settings
+    from db.changes import prune_changes
+    from db.session import SessionLocal, engine
+    from ingest.archive import RawArchive
+    from ingest.jobs import plan_job, run_job
+    from models.trading_calendar import TradingCalendar, materialize_calendar
+
+    settings = get_settings()
+    start, end = args.start, args.end
+    name = args.job or f"{'reingest' if args.offline else 'backfill'}-{start}-{end}"
+    with SessionLocal() as db:
+        materialize_calendar(db, start, end)
+        days = TradingCalendar.from_db(db).between(start, end)
+        shard_ids = plan_job(db, name, days, args.shards or args.workers * 4)
+    engine.dispose()
+    print(f"{name}: {len(shard_ids)} shards to run on {args.workers} workers")
+
+    archive = None
+    if settings.RAW_ARCHIVE_DIR:
+        archive = RawArchive(settings.RAW_ARCHIVE_DIR)
+    if args.offline:
+        if archive is None:
+            raise SystemExit("--offline needs RAW_ARCHIVE_DIR")
+        fetcher_options = {"archive": archive, "concurrency": settings.INGEST_CONCURRENCY}
+    else:
+        # the rate is a cap on the site, not per worker: adding workers
+        # only helps while fetching is below it
+        rate = args.rate or settings.INGEST_RATE_PER_HOST
+        print(f"{rate:g} requests/s to the site, {rate / args.workers:g} per worker")
+        fetcher_options = {
+            "concurrency": settings.INGEST_CONCURRENCY,
+            "rate_per_host": rate / args.workers,
+            "max_retries": settings.INGEST_MAX_RETRIES,
+            "archive": archive,
+        }
+    started = time.perf_counter()
+    rows = 0
+    for stats in run_job(
+        shard_ids,
+        args.workers,
+        settings.BRVM_BASE_URL,
+        args.step_days,
+        fetcher_options,
+        offline=args.offline,
+    ):
+        rows += stats["rows"]
+        print(
+            f"shard {stats['shard_id']:4} {stats['start']} → {stats['end']} "
+            f"{stats['days']:5} days {stats['rows']:9} rows "
+            f"{stats['seconds']:8.1f}s {stats['rows_per_second']:9.0f} rows/s"
+        )
+    seconds = time.perf_counter() - started
+    print(f"Total {rows} rows in {seconds:.1f}s ({rows / seconds if seconds else 0:.0f} rows/s)")
+
+    # every step adds change batches to the outbox off PostgreSQL
+    with SessionLocal() as db:
+        prune_changes(db)
+
+
+def prune_changes_command(args):
+    from db.changes import prune_changes
+    from db.session import SessionLocal
+
+    with SessionLocal() as db:
+        deleted = prune_changes(db, timedelta(days=args.days))
+    print(f"Deleted {deleted} change batches older than {args.days:g} days")
+
+
+def summaries_command(args):
+    from db.session import SessionLocal
+    from metrics.summary import rebuild_market_summaries
+
+    started = time.perf_counter()
+    with SessionLocal() as db:
+        stats = rebuild_market_summaries(db, args.start, args.end)
+    print(
+        f"Summarized {stats['summaries']} days with {stats['movers']} movers "
+        f"and {stats['countries']} country rows in {time.perf_counter() - started:.1f}s"
+    )
+
+
+def cache_command(args):
+    from config.settings import get_settings
+    from db.session import SessionLocal
+    from query.cache import HistoryCache
+
+    directory = args.directory or get_settings().HISTORY_CACHE_DIR
+    if not directory:
+        raise SystemExit("No cache directory: pass one or set HISTORY_CACHE_DIR")
+    cache = HistoryCache(directory)
+
+    def refresh(rebuild=False):
+        started = time.perf_counter()
+        with SessionLocal() as db:
+            stats = cache.rebuild(db) if rebuild else cache.refresh(db)
+        print(
+            f"{stats['method']}: {stats['days']} days written, {stats['rows']} cached "
+            f"in {time.perf_counter() - started:.1f}s"
+        )
+
+    refresh(args.rebuild)
+    if args.follow:
+        from db.changes import ChangeFeed
+        from db.session import engine
+
+        # refresh whenever new prices are committed
+        with ChangeFeed(engine, tables=["equity_eod_prices"]) as feed:
+            for _ in feed:
+                refresh()
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="BRVM Finance Application")
+    commands = parser.add_subparsers(dest="command")
+
+    export = commands.add_parser("export", help="Export the dataset to Parquet")
+    export.add_argument("output", help="Directory to write the snapshot to")
+    export.add_argument(
+        "--incremental", action="store_true",
+        help="Only rewrite partitions changed since the last export",
+    )
+    export.add_argument("--batch-size", type=int, default=50_000)
+    export.set_defaults(func=export_command)
+
+    seed = commands.add_parser("seed", help="Load companies and equities")
+    seed.add_argument(
+        "workbook", nargs="?", default="Data For DB.xlsx",
+        help="Workbook with a company_name/country/ticker/isin sheet",
+    )
+    seed.set_defaults(func=seed_command)
+
+    partitions = commands.add_parser(
+        "partitions", help="Create this and next year's price table partitions"
+    )
+    partitions.set_defaults(func=partitions_command)
+
+    backfill = commands.add_parser(
+        "backfill", help="Fetch and store a date range of bulletins"
+    )
+    backfill.add_argument("start", type=date.fromisoformat)
+    backfill.add_argument("end", type=date.fromisoformat)
+    backfill.add_argument("--job", help="Job name, reuse it to resume a run")
+    backfill.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    backfill.add_argument(
+        "--shards", type=int, help="Date-range shards (default: 4 per worker)"
+    )
+    backfill.add_argument(
+        "--step-days", type=int, default=20,
+        help="Trading days stored between checkpoints",
+    )
+    backfill.add_argument(
+        "--rate", type=float,
+        help="Requests per second to the site, shared by all workers "
+        "(default: INGEST_RATE_PER_HOST)",
+    )
+    backfill.add_argument(
+        "--offline", action="store_true",
+        help="Re-ingest pages from the raw archive without network access",
+    )
+    backfill.set_defaults(func=backfill_command)
+
+    prune = commands.add_parser(
+        "prune-changes", help="Delete old change batches from the outbox"
+    )
+    prune.add_argument(
+        "--days", type=float, default=7, help="Keep batches this recent (default: 7)"
+    )
+    prune.set_defaults(func=prune_changes_command)
+
+    summaries = commands.add_parser(
+        "summaries", help="Recompute the market summaries of a date range"
+    )
+    summaries.add_argument("start", type=date.fromisoformat)
+    summaries.add_argument("end", type=date.fromisoformat)
+    summaries.set_defaults(func=summaries_command)
+
+    cache = commands.add_parser(
+        "cache", help="Append new trading days to the price history cache"
+    )
+    cache.add_argument("directory", nargs="?", help="Default: HISTORY_CACHE_DIR")
+    cache.add_argument(
+        "--rebuild", action="store_true", help="Rewrite it from the database"
+    )
+    cache.add_argument(
+        "--follow", action="store_true", help="Keep refreshing on new prices"
+    )
+    cache.set_defaults(func=cache_command)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.command is None:
+        print("Hello, BRVM Finance Application!")
+        return
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
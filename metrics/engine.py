@@ -0,0 +1,213 @@
+"""
+Incremental derived-metrics engine over EOD prices
+"""
+
+from datetime import date
+
+import numpy as np
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from db.changes import change_watermark
+from db.upsert import batched, insert_for
+from models.metrics import EquityDailyMetric, MetricWatermark
+from models.trading import EquityEODPrice
+from query.prices import get_price_history
+
+WATERMARK = "equity_daily_metrics"
+WINDOWS = (20, 60)
+METRIC_FIELDS = (
+    "daily_return",
+    "vwap",
+    *(f"volatility_{w}" for w in WINDOWS),
+    *(f"avg_traded_value_{w}" for w in WINDOWS),
+)
+
+
+def previous_close(close: np.ndarray) -> np.ndarray:
+    """
+    Last traded close strictly before each session, per column.
+    `close` is a (sessions x equities) matrix with NaN on days without trades.
+    """
+    sessions = np.arange(close.shape[0])[:, None]
+    last_valid = np.where(~np.isnan(close), sessions, -1)
+    np.maximum.accumulate(last_valid, axis=0, out=last_valid)
+    previous = np.vstack([np.full((1, close.shape[1]), -1), last_valid[:-1]])
+    columns = np.arange(close.shape[1])[None, :]
+    return np.where(previous >= 0, close[previous, columns], np.nan)
+
+
+def rolling_mean_std(values: np.ndarray, window: int, min_periods: int):
+    """
+    Trailing mean and sample standard deviation over `window` rows,
+    ignoring NaN. Windows with fewer than `min_periods` values are NaN.
+    Uses cumulative sums, so the cost does not depend on the window.
+    """
+    valid = ~np.isnan(values)
+    filled = np.where(valid, values, 0.0)
+    zeros = np.zeros((1, values.shape[1]))
+    count_sum = np.vstack([zeros, np.cumsum(valid, axis=0)])
+    value_sum = np.vstack([zeros, np.cumsum(filled, axis=0)])
+    square_sum = np.vstack([zeros, np.cumsum(filled**2, axis=0)])
+
+    upper = np.arange(1, values.shape[0] + 1)
+    lower = np.maximum(upper - window, 0)
+    count = count_sum[upper] - count_sum[lower]
+    total = value_sum[upper] - value_sum[lower]
+    squares = square_sum[upper] - square_sum[lower]
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = total / count
+        variance = (squares - total * mean) / (count - 1)
+    enough = count >= max(min_periods, 1)
+    mean = np.where(enough, mean, np.nan)
+    std = np.where(enough & (count > 1), np.sqrt(np.maximum(variance, 0.0)), np.nan)
+    return mean, std
+
+
+def compute_metrics(close, volume, traded_value) -> dict[str, np.ndarray]:
+    """
+    Derived metrics for (sessions x equities) matrices of close, volume
+    and traded value. Metrics are NaN where the equity did not trade.
+    """
+    traded = ~np.isnan(close)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        daily_return = close / previous_close(close) - 1.0
+        vwap = np.where(volume > 0, traded_value / volume, np.nan)
+
+    metrics = {"daily_return": daily_return, "vwap": vwap}
+    liquidity = np.nan_to_num(traded_value)
+    for window in WINDOWS:
+        _, volatility = rolling_mean_std(daily_return, window, window // 2)
+        average, _ = rolling_mean_std(liquidity, window, window)
+        metrics[f"volatility_{window}"] = volatility
+        metrics[f"avg_traded_value_{window}"] = average
+    return {name: np.where(traded, values, np.nan) for name, values in metrics.items()}
+
+
+def _session_date(db: Session, condition, descending: bool, offset: int) -> date | None:
+    """The trading date `offset` sessions into the dates matching `condition`."""
+    column = EquityEODPrice.trading_date
+    stmt = (
+        select(column)
+        .distinct()
+        .where(condition)
+        .order_by(column.desc() if descending else column)
+        .offset(offset)
+        .limit(1)
+    )
+    return db.scalar(stmt)
+
+
+def _affected_range(db: Session, watermark: MetricWatermark):
+    """
+    First and last trading dates whose metrics must be (re)computed, or
+    None when nothing changed. New sessions after the watermark are
+    computed through the end of the data. A corrected price affects its
+    own session and the windows of the sessions that follow it; prices
+    updated in the overlap before the last run are treated as corrected.
+    """
+    column = EquityEODPrice.trading_date
+    if watermark.last_trading_date is None:
+        return db.scalar(select(func.min(column))), None
+
+    new_start = db.scalar(
+        select(func.min(column)).where(column > watermark.last_trading_date)
+    )
+    corrected = None
+    if watermark.last_source_update is not None:
+        corrected = db.scalar(
+            select(func.min(column)).where(
+                column <= watermark.last_trading_date,
+                EquityEODPrice.updated_at >= watermark.last_source_update,
+            )
+        )
+    if corrected is None:
+        return new_start, None
+    if new_start is not None:
+        return corrected, None
+    stop = _session_date(db, column >= corrected, False, max(WINDOWS))
+    return corrected, stop
+
+
+def refresh_metrics(db: Session, batch_size: int = 1000) -> dict:
+    """
+    Compute metrics for the sessions added or corrected since the last run
+    and move the watermark forward, all in one transaction. Re-running
+    without new data only recomputes the prices updated within
+    CHANGE_OVERLAP of the previous run, to the same values.
+    """
+    watermark = db.get(MetricWatermark, WATERMARK) or MetricWatermark(name=WATERMARK)
+    # taken before reading, so updates made during the run are seen next time
+    source_update = change_watermark(db)
+    start, stop = _affected_range(db, watermark)
+    if start is None:
+        return {"start": None, "stop": None, "sessions": 0, "rows": 0}
+
+    # history needed to fill the longest window of the first session,
+    # None (everything) when fewer sessions exist
+    history_start = _session_date(
+        db, EquityEODPrice.trading_date < start, True, max(WINDOWS)
+    )
+    matrix = get_price_history(
+        db,
+        start=history_start,
+        end=stop,
+        fields=("close_price", "volume", "traded_value"),
+        wide=True,
+    )
+    values = compute_metrics(
+        matrix.values["close_price"],
+        matrix.values["volume"],
+        matrix.values["traded_value"],
+    )
+
+    # rows to write: sessions in range where the equity traded
+    in_range = matrix.dates >= np.datetime64(start)
+    session_index, equity_index = np.nonzero(
+        in_range[:, None] & ~np.isnan(matrix.values["close_price"])
+    )
+    dates = matrix.dates.astype(object)
+    columns = {
+        name: np.where(np.isnan(array), None, array)[session_index, equity_index]
+        for name, array in values.items()
+    }
+    records = [
+        {
+            "equity_id": int(equity_id),
+            "trading_date": trading_date,
+            **{name: columns[name][i] for name in METRIC_FIELDS},
+        }
+        for i, (equity_id, trading_date) in enumerate(
+            zip(matrix.equity_ids[equity_index], dates[session_index])
+        )
+    ]
+
+    table = EquityDailyMetric.__table__
+    for batch in batched(records, batch_size):
+        stmt = insert_for(db, table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.equity_id, table.c.trading_date],
+            set_={
+                **{name: stmt.excluded[name] for name in METRIC_FIELDS},
+                "computed_at": func.now(),
+            },
+        )
+        # RETURNING lets the driver batch rows into multi-VALUES statements
+        db.execute(stmt.returning(table.c.metric_id), batch).all()
+
+    last_date = dates[-1] if len(dates) else None
+    if watermark.last_trading_date is None or (
+        last_date is not None and last_date > watermark.last_trading_date
+    ):
+        watermark.last_trading_date = last_date
+    watermark.last_source_update = source_update
+    db.add(watermark)
+    db.commit()
+
+    return {
+        "start": start,
+        "stop": last_date,
+        "sessions": int(in_range.sum()),
+        "rows": len(records),
+    }
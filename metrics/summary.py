@@ -0,0 +1,228 @@
+"""
+Per-day market summary: totals, breadth, top movers and aggregates by
+country, refreshed one trading day at a time
+"""
+
+from collections import defaultdict
+from datetime import date
+
+from sqlalchemy import delete, func, select, tuple_
+from sqlalchemy.orm import Session, aliased
+
+from db.instrument import instrumented
+from db.upsert import batched, insert_for
+from models.enums import MoverDirectionEnum
+from models.stocks import Company, Equity
+from models.summary import MarketCountrySummary, MarketDailyMover, MarketDailySummary
+from models.trading import EquityEODPrice
+
+# Gainers and losers kept per day
+TOP_MOVERS = 5
+
+SUMMARY_MODELS = (MarketDailySummary, MarketDailyMover, MarketCountrySummary)
+SUMMARY_KEYS = (
+    ("trading_date",),
+    ("trading_date", "direction", "rank"),
+    ("trading_date", "country"),
+)
+
+
+def _with_following_sessions(db: Session, dates) -> list[date]:
+    """
+    `dates` plus the session after each of them: its advancers and
+    decliners compare against closes on these days.
+    """
+    dates = sorted(set(dates))
+    column = EquityEODPrice.trading_date
+    sessions = db.scalars(
+        select(column)
+        .distinct()
+        .where(column.between(dates[0], dates[-1]))
+        .order_by(column)
+    ).all()
+    following = db.scalar(
+        select(column).where(column > dates[-1]).order_by(column).limit(1)
+    )
+    if following is not None:
+        sessions.append(following)
+    after = dict(zip(sessions, sessions[1:]))
+    return sorted(set(dates) | {after[day] for day in dates if day in after})
+
+
+def _day_rows(db: Session, dates):
+    """
+    (trading_date, equity_id, country, close, volume, traded_value,
+    previous_close) of every price on `dates`, the previous close being
+    the equity's last close before that day.
+    """
+    earlier = aliased(EquityEODPrice)
+    previous_close = (
+        select(earlier.close_price)
+        .where(
+            earlier.equity_id == EquityEODPrice.equity_id,
+            earlier.trading_date < EquityEODPrice.trading_date,
+        )
+        .order_by(earlier.trading_date.desc())
+        .limit(1)
+        .scalar_subquery()
+    )
+    stmt = (
+        select(
+            EquityEODPrice.trading_date,
+            EquityEODPrice.equity_id,
+            Company.country,
+            EquityEODPrice.close_price,
+            EquityEODPrice.volume,
+            EquityEODPrice.traded_value,
+            previous_close,
+        )
+        .join(Equity, Equity.equity_id == EquityEODPrice.equity_id)
+        .join(Company, Company.company_id == Equity.company_id)
+        .where(EquityEODPrice.trading_date.in_(dates))
+    )
+    return db.execute(stmt).all()
+
+
+class _Price:
+    """One equity's price on a summarized day."""
+
+    __slots__ = (
+        "equity_id", "country", "close_price", "volume", "traded_value",
+        "previous_close", "change",
+    )
+
+    def __init__(self, row):
+        (_, self.equity_id, self.country, self.close_price, self.volume,
+         self.traded_value, self.previous_close) = row
+        # None for an equity's first close
+        self.change = (
+            self.close_price / self.previous_close - 1.0 if self.previous_close else None
+        )
+
+
+def _totals(prices) -> dict:
+    changes = [price.change for price in prices if price.change is not None]
+    return {
+        "equities_traded": len(prices),
+        "total_volume": sum(price.volume or 0 for price in prices),
+        "total_traded_value": sum(price.traded_value or 0.0 for price in prices),
+        "advancers": sum(change > 0 for change in changes),
+        "decliners": sum(change < 0 for change in changes),
+        "unchanged": sum(change == 0 for change in changes),
+    }
+
+
+def _movers(trading_date: date, prices) -> list[dict]:
+    priced = [price for price in prices if price.change is not None]
+    gainers = sorted(
+        (price for price in priced if price.change > 0),
+        key=lambda price: (-price.change, price.equity_id),
+    )
+    losers = sorted(
+        (price for price in priced if price.change < 0),
+        key=lambda price: (price.change, price.equity_id),
+    )
+    return [
+        {
+            "trading_date": trading_date,
+            "direction": direction,
+            "rank": rank,
+            "equity_id": price.equity_id,
+            "close_price": price.close_price,
+            "previous_close": price.previous_close,
+            "change": price.change,
+        }
+        for direction, ranked in (
+            (MoverDirectionEnum.GAINER, gainers),
+            (MoverDirectionEnum.LOSER, losers),
+        )
+        for rank, price in enumerate(ranked[:TOP_MOVERS], 1)
+    ]
+
+
+def _replace(db: Session, model, keys, dates, records):
+    """
+    Upsert `records` and delete the other rows of `dates`. Concurrent
+    refreshes of the same day update each other's rows rather than
+    inserting the same key twice.
+    """
+    columns = [getattr(model, key) for key in keys]
+    stale = delete(model).where(model.trading_date.in_(dates))
+    if records:
+        stale = stale.where(
+            tuple_(*columns).not_in([tuple(r[key] for key in keys) for r in records])
+        )
+    db.execute(stale)
+    if not records:
+        return
+    stmt = insert_for(db, model)
+    set_ = {
+        field: stmt.excluded[field] for field in records[0] if field not in keys
+    }
+    if "computed_at" in model.__table__.c:
+        set_["computed_at"] = func.now()
+    # in key order, so concurrent refreshes lock rows in the same order
+    records = sorted(
+        records, key=lambda r: tuple(getattr(r[key], "value", r[key]) for key in keys)
+    )
+    db.execute(stmt.on_conflict_do_update(index_elements=keys, set_=set_), records)
+
+
+@instrumented("refresh_market_summaries")
+def refresh_market_summaries(db: Session, dates) -> dict:
+    """
+    Recompute the summary rows of `dates`, and of the session following
+    each of them, in one transaction. Call it once a trading day's prices
+    are stored; days without prices lose their summary.
+    Returns {"days", "summaries", "movers", "countries"}.
+    """
+    dates = list(dates)
+    if not dates:
+        return {"days": 0, "summaries": 0, "movers": 0, "countries": 0}
+    dates = _with_following_sessions(db, dates)
+
+    by_day = defaultdict(list)
+    for row in _day_rows(db, dates):
+        by_day[row.trading_date].append(_Price(row))
+
+    summaries, movers, countries = [], [], []
+    for trading_date, prices in sorted(by_day.items()):
+        summaries.append({"trading_date": trading_date, **_totals(prices)})
+        movers.extend(_movers(trading_date, prices))
+        by_country = defaultdict(list)
+        for price in prices:
+            by_country[price.country].append(price)
+        countries.extend(
+            {"trading_date": trading_date, "country": country, **_totals(group)}
+            for country, group in by_country.items()
+        )
+
+    for model, keys, records in zip(
+        SUMMARY_MODELS, SUMMARY_KEYS, (summaries, movers, countries)
+    ):
+        _replace(db, model, keys, dates, records)
+    db.commit()
+    return {
+        "days": len(dates),
+        "summaries": len(summaries),
+        "movers": len(movers),
+        "countries": len(countries),
+    }
+
+
+def rebuild_market_summaries(
+    db: Session, start: date, end: date, batch_days: int = 250
+) -> dict:
+    """
+    Recompute the summaries of every priced day between start and end,
+    one transaction per `batch_days` days.
+    """
+    column = EquityEODPrice.trading_date
+    dates = db.scalars(
+        select(column).distinct().where(column.between(start, end)).order_by(column)
+    ).all()
+    totals = {"days": 0, "summaries": 0, "movers": 0, "countries": 0}
+    for batch in batched(dates, batch_days):
+        for name, count in refresh_market_summaries(db, batch).items():
+            totals[name] += count
+    return totals
@@ -0,0 +1,42 @@
+"""
+Data model for the change-feed outbox, the polled fallback of
+PostgreSQL NOTIFY
+"""
+
+from datetime import datetime
+from sqlalchemy import (
+    Integer,
+    String,
+    Text,
+    func,
+    DateTime,
+    Index,
+)
+from sqlalchemy.orm import mapped_column, Mapped
+
+from db.base_class import Base
+
+
+class PriceChangeBatch(Base):
+    """
+    Changes to price or residual rows, encoded like a NOTIFY payload
+    (db.changes.encode) and stored in the writing transaction, so
+    subscribers see them once it commits.
+    """
+
+    __tablename__ = "price_change_batches"
+    __table_args__ = (
+        # pruning of consumed batches
+        Index("ix_price_change_batches_created", "created_at"),
+    )
+
+    # subscribers resume after the last batch_id they read
+    batch_id: Mapped[int] = mapped_column(
+        Integer, primary_key=True, autoincrement=True
+    )
+    table_name: Mapped[str] = mapped_column(String(64), nullable=False)
+    payload: Mapped[str] = mapped_column(Text, nullable=False)
+
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime, server_default=func.now(), nullable=False
+    )
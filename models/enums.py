@@ -28,3 +28,26 @@ class TradingStatusEnum(Enum):
     ACTIVE = "Active"
     SUSPENDED = "Suspended"
     DELISTED = "Delisted"
+
+
+# ====== Job-related Enums ======
+
+class JobStatusEnum(Enum):
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+
+
+# ====== Summary-related Enums ======
+
+class MoverDirectionEnum(Enum):
+    GAINER = "gainer"
+    LOSER = "loser"
+
+
+# ====== Change-feed Enums ======
+
+class ChangeOperationEnum(Enum):
+    INSERT = "insert"
+    UPDATE = "update"
@@ -0,0 +1,55 @@
+"""
+Data model for backfill jobs
+"""
+
+from datetime import datetime, date
+from sqlalchemy import (
+    Integer,
+    String,
+    Date,
+    func,
+    DateTime,
+    Float,
+    Enum as SQLEnum,
+    UniqueConstraint,
+)
+from sqlalchemy.orm import mapped_column, Mapped
+
+from db.base_class import Base
+from models.enums import JobStatusEnum
+
+
+class BackfillShard(Base):
+    """
+    One date range of a backfill job and how far it got.
+    """
+
+    __tablename__ = "backfill_shards"
+    __table_args__ = (
+        UniqueConstraint("job_name", "shard_start", name="uq_backfill_job_shard"),
+    )
+
+    shard_id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    job_name: Mapped[str] = mapped_column(String(100), nullable=False)
+    shard_start: Mapped[date] = mapped_column(Date, nullable=False)
+    shard_end: Mapped[date] = mapped_column(Date, nullable=False)
+    status: Mapped[JobStatusEnum] = mapped_column(
+        SQLEnum(JobStatusEnum), nullable=False, default=JobStatusEnum.PENDING
+    )
+    # checkpoint: every trading day up to this one is stored
+    last_completed_date: Mapped[date] = mapped_column(Date, nullable=True)
+
+    # progress counters, summed over every attempt
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    pages: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    failed_pages: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    rows: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    seconds: Mapped[float] = mapped_column(Float, nullable=False, default=0.0)
+    error: Mapped[str] = mapped_column(String(1000), nullable=True)
+
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime, server_default=func.now(), nullable=False
+    )
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime, server_default=func.now(), onupdate=func.now(), nullable=False
+    )
@@ -0,0 +1,64 @@
+"""
+Data model for derived metrics
+"""
+
+from datetime import datetime, date
+from sqlalchemy import (
+    Integer,
+    String,
+    ForeignKey,
+    Date,
+    func,
+    DateTime,
+    Float,
+    UniqueConstraint,
+)
+from sqlalchemy.orm import mapped_column, Mapped
+
+from db.base_class import Base
+
+
+class EquityDailyMetric(Base):
+    __tablename__ = "equity_daily_metrics"
+    __table_args__ = (
+        UniqueConstraint("equity_id", "trading_date", name="uq_metric_equity_date"),
+    )
+
+    metric_id: Mapped[int] = mapped_column(
+        Integer, primary_key=True, autoincrement=True
+    )
+    equity_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("equities.equity_id"), nullable=False
+    )
+    trading_date: Mapped[date] = mapped_column(
+        Date, ForeignKey("trading_days.trading_date"), nullable=False
+    )
+
+    # close-to-close return against the previous traded close
+    daily_return: Mapped[float] = mapped_column(Float, nullable=True)
+    # traded_value / volume
+    vwap: Mapped[float] = mapped_column(Float, nullable=True)
+    # standard deviation of daily returns over 20 and 60 sessions
+    volatility_20: Mapped[float] = mapped_column(Float, nullable=True)
+    volatility_60: Mapped[float] = mapped_column(Float, nullable=True)
+    # average traded value over 20 and 60 sessions, days without trades count as 0
+    avg_traded_value_20: Mapped[float] = mapped_column(Float, nullable=True)
+    avg_traded_value_60: Mapped[float] = mapped_column(Float, nullable=True)
+
+    computed_at: Mapped[datetime] = mapped_column(
+        DateTime, server_default=func.now(), onupdate=func.now(), nullable=False
+    )
+
+
+class MetricWatermark(Base):
+    __tablename__ = "metric_watermarks"
+
+    name: Mapped[str] = mapped_column(String(100), primary_key=True)
+    # last trading day the metrics were computed for
+    last_trading_date: Mapped[date] = mapped_column(Date, nullable=True)
+    # equity_eod_prices.updated_at from which the next run re-reads
+    last_source_update: Mapped[datetime] = mapped_column(DateTime, nullable=True)
+
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime, server_default=func.now(), onupdate=func.now(), nullable=False
+    )
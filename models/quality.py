@@ -0,0 +1,47 @@
+"""
+Data model for rows rejected by data-quality validation
+"""
+
+from datetime import datetime, date
+from sqlalchemy import (
+    Integer,
+    String,
+    Date,
+    func,
+    DateTime,
+    Index,
+    JSON,
+)
+from sqlalchemy.orm import mapped_column, Mapped
+
+from db.base_class import Base
+
+
+class QuarantinedRow(Base):
+    """
+    A price or residual row that failed validation, kept as received so it
+    can be inspected, corrected and re-ingested.
+    """
+
+    __tablename__ = "quarantined_rows"
+    __table_args__ = (
+        # review by table and day
+        Index("ix_quarantine_table_date", "table_name", "trading_date"),
+    )
+
+    quarantine_id: Mapped[int] = mapped_column(
+        Integer, primary_key=True, autoincrement=True
+    )
+    # table the row was meant for
+    table_name: Mapped[str] = mapped_column(String(64), nullable=False)
+    # no foreign keys: a rejected row may reference anything
+    equity_id: Mapped[int] = mapped_column(Integer, nullable=True)
+    trading_date: Mapped[date] = mapped_column(Date, nullable=True)
+    # comma-separated ingest.validation.Issue names
+    reasons: Mapped[str] = mapped_column(String(255), nullable=False)
+    payload: Mapped[dict] = mapped_column(JSON, nullable=False)
+    data_source: Mapped[str] = mapped_column(String(255), nullable=True)
+
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime, server_default=func.now(), nullable=False
+    )
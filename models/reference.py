@@ -0,0 +1,272 @@
+"""
+In-process cache of reference data: companies, equities and trading days
+"""
+
+import time
+import weakref
+from collections import OrderedDict
+from datetime import date
+from typing import NamedTuple
+
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session, object_session
+
+from models.enums import CountryEnum, StatusEnum, TradingStatusEnum
+from models.stocks import Company, Equity
+from models.trading import TradingDay
+
+
+class CompanyRef(NamedTuple):
+    company_id: int
+    company_name: str
+    country: CountryEnum
+    status: StatusEnum
+
+
+class EquityRef(NamedTuple):
+    equity_id: int
+    company_id: int
+    ticker: str
+    isin: str
+    listing_date: date | None
+    trading_status: TradingStatusEnum
+
+
+class TradingDayRef(NamedTuple):
+    trading_id: int
+    trading_date: date
+    is_open: bool
+
+
+class _Segment:
+    """
+    One cached table: its lookup indexes, load time and counters.
+    """
+
+    def __init__(self, name: str, keys: tuple[str, ...]):
+        self.name = name
+        self.indexes: dict[str, OrderedDict] = {key: OrderedDict() for key in keys}
+        self.loaded_at: float | None = None
+        # True when the whole table fitted in the cache, so a miss is final
+        self.complete = False
+        self.hits = 0
+        self.misses = 0
+        self.loads = 0
+        self.evictions = 0
+
+    def clear(self):
+        for index in self.indexes.values():
+            index.clear()
+        self.loaded_at = None
+        self.complete = False
+
+    def touch(self, ref):
+        for key, index in self.indexes.items():
+            index.move_to_end(getattr(ref, key))
+
+    def add(self, ref, max_size: int):
+        for key, index in self.indexes.items():
+            index[getattr(ref, key)] = ref
+        self.touch(ref)
+        # evict least recently used entries beyond the size limit
+        primary = next(iter(self.indexes.values()))
+        while len(primary) > max_size:
+            _, evicted = primary.popitem(last=False)
+            for key, index in self.indexes.items():
+                index.pop(getattr(evicted, key), None)
+            self.evictions += 1
+            self.complete = False
+
+
+class ReferenceCache:
+    """
+    Resolve tickers, ISINs and dates to reference rows without a query
+    per lookup.
+
+    Each table is loaded with a single query on first use and reloaded
+    once its entries are older than `ttl` seconds. At most `max_size`
+    rows are kept per table. Tables larger than that keep their most
+    recent rows, and a miss falls back to a one-row query. Inserts made
+    through the ORM (and therefore the models' create methods) mark the
+    table stale in every live cache.
+    """
+
+    def __init__(
+        self, ttl: float | None = 300.0, max_size: int = 10_000, clock=time.monotonic
+    ):
+        if max_size < 1:
+            raise ValueError("max_size must be at least 1")
+        self.ttl = ttl
+        self.max_size = max_size
+        self.clock = clock
+        self._segments = {
+            "companies": _Segment("companies", ("company_id", "company_name")),
+            "equities": _Segment("equities", ("ticker", "isin", "equity_id")),
+            "trading_days": _Segment("trading_days", ("trading_date",)),
+        }
+        _caches.add(self)
+
+    # --- public lookups ---
+
+    def company(self, db: Session, company_id: int) -> CompanyRef | None:
+        return self._lookup(db, "companies", "company_id", company_id)
+
+    def company_by_name(self, db: Session, company_name: str) -> CompanyRef | None:
+        return self._lookup(db, "companies", "company_name", company_name)
+
+    def equity_by_ticker(self, db: Session, ticker: str) -> EquityRef | None:
+        return self._lookup(db, "equities", "ticker", ticker)
+
+    def equity_by_isin(self, db: Session, isin: str) -> EquityRef | None:
+        return self._lookup(db, "equities", "isin", isin)
+
+    def equity_id(self, db: Session, ticker: str) -> int | None:
+        ref = self.equity_by_ticker(db, ticker)
+        return ref.equity_id if ref else None
+
+    def trading_day(self, db: Session, trading_date: date) -> TradingDayRef | None:
+        return self._lookup(db, "trading_days", "trading_date", trading_date)
+
+    # --- maintenance ---
+
+    def invalidate(self, *names: str):
+        """
+        Drop the given tables (all of them by default); they reload on next use.
+        """
+        for name in names or self._segments:
+            self._segments[name].clear()
+
+    def stats(self) -> dict:
+        """
+        Hit/miss counters per table, e.g. for a metrics exporter.
+        """
+        return {
+            name: {
+                "size": len(next(iter(segment.indexes.values()))),
+                "hits": segment.hits,
+                "misses": segment.misses,
+                "loads": segment.loads,
+                "evictions": segment.evictions,
+            }
+            for name, segment in self._segments.items()
+        }
+
+    # --- internals ---
+
+    def _lookup(self, db: Session, name: str, key: str, value):
+        segment = self._segments[name]
+        if segment.loaded_at is None or (
+            self.ttl is not None and self.clock() - segment.loaded_at > self.ttl
+        ):
+            self._load(db, segment)
+
+        ref = segment.indexes[key].get(value)
+        if ref is not None:
+            segment.hits += 1
+            segment.touch(ref)
+            return ref
+
+        segment.misses += 1
+        if segment.complete:
+            return None
+        ref = self._fetch_one(db, name, key, value)
+        if ref is not None:
+            segment.add(ref, self.max_size)
+        return ref
+
+    def _load(self, db: Session, segment: _Segment):
+        segment.clear()
+        stmt = _LOAD_QUERIES[segment.name]().limit(self.max_size + 1)
+        rows = db.execute(stmt).all()
+        ref_type = _REF_TYPES[segment.name]
+        # rows come newest first, keep them least recently used last
+        for row in reversed(rows[: self.max_size]):
+            segment.add(ref_type(*row), self.max_size)
+        segment.complete = len(rows) <= self.max_size
+        segment.loaded_at = self.clock()
+        segment.loads += 1
+
+    def _fetch_one(self, db: Session, name: str, key: str, value):
+        stmt = _LOAD_QUERIES[name]()
+        column = stmt.selected_columns[key]
+        row = db.execute(stmt.where(column == value).limit(1)).first()
+        return _REF_TYPES[name](*row) if row else None
+
+
+_REF_TYPES = {
+    "companies": CompanyRef,
+    "equities": EquityRef,
+    "trading_days": TradingDayRef,
+}
+
+_LOAD_QUERIES = {
+    "companies": lambda: select(
+        Company.company_id, Company.company_name, Company.country, Company.status
+    ).order_by(Company.company_id.desc()),
+    "equities": lambda: select(
+        Equity.equity_id,
+        Equity.company_id,
+        Equity.ticker,
+        Equity.isin,
+        Equity.listing_date,
+        Equity.trading_status,
+    ).order_by(Equity.equity_id.desc()),
+    "trading_days": lambda: select(
+        TradingDay.trading_id, TradingDay.trading_date, TradingDay.is_open
+    ).order_by(TradingDay.trading_date.desc()),
+}
+
+# Every live cache, so model inserts can invalidate all of them
+_caches: "weakref.WeakSet[ReferenceCache]" = weakref.WeakSet()
+
+
+def invalidate_reference_caches(*names: str):
+    """
+    Mark tables stale in every live cache, e.g. after a Core bulk insert.
+    """
+    for cache in list(_caches):
+        cache.invalidate(*names)
+
+
+# session.info key of the tables written in the open transaction
+_PENDING = "reference_cache_pending"
+
+
+def _record_write(name: str):
+    # fires at flush, before other sessions can see the row: only note
+    # the table here and invalidate once the transaction commits
+    def listener(mapper, connection, target):
+        session = object_session(target)
+        if session is not None:
+            session.info.setdefault(_PENDING, set()).add(name)
+        else:
+            invalidate_reference_caches(name)
+
+    return listener
+
+
+for _model, _name in (
+    (Company, "companies"),
+    (Equity, "equities"),
+    (TradingDay, "trading_days"),
+):
+    for _event in ("after_insert", "after_update", "after_delete"):
+        event.listen(_model, _event, _record_write(_name))
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed(session):
+    names = session.info.pop(_PENDING, None)
+    if names:
+        invalidate_reference_caches(*names)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_rolled_back(session, previous_transaction):
+    # a savepoint rollback leaves earlier writes of the transaction pending
+    if previous_transaction.parent is None:
+        session.info.pop(_PENDING, None)
+
+
+# Shared cache for ingestion code
+reference_cache = ReferenceCache()
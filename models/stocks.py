@@ -11,15 +11,21 @@ from sqlalchemy import (
     Enum as SQLEnum,
     func,
     DateTime,
+    UniqueConstraint,
 )
 from sqlalchemy.orm import relationship, mapped_column, Mapped, Session
 from sqlalchemy.exc import IntegrityError
 from db.base_class import Base
+from db.instrument import instrumented
 from models.enums import CountryEnum, StatusEnum, TradingStatusEnum
 
 
 class Company(Base):
     __tablename__ = "companies"
+    __table_args__ = (
+        # conflict target for seeding and name lookups
+        UniqueConstraint("company_name", name="uq_company_name"),
+    )
 
     # attributes
     company_id: Mapped[int] = mapped_column(Integer, primary_key=True)
@@ -40,6 +46,7 @@ class Company(Base):
     equities: Mapped[list["Equity"]] = relationship("Equity", back_populates="company")
 
     @classmethod
+    @instrumented("Company.create")
     def create(cls, db: Session, **kwargs):
         # check if company with same name exists
         company_name = kwargs.get("company_name")
@@ -86,8 +93,12 @@ class Equity(Base):
     eod_prices: Mapped[list["EquityEODPrice"]] = relationship(  # type:ignore
         "EquityEODPrice", back_populates="equity"
     )
+    residual_quantities: Mapped[list["EquityResidualQuantity"]] = relationship(  # type:ignore
+        "EquityResidualQuantity", back_populates="equity"
+    )
 
     @classmethod
+    @instrumented("Equity.create")
     def create(cls, db: Session, **kwargs):
         # Ensure required fileds are present
         required_fields = {"company_id", "ticker", "isin"}
@@ -98,17 +109,29 @@ class Equity(Base):
         # Default trading status
         kwargs.setdefault("trading_status", TradingStatusEnum.ACTIVE)
 
-        # validate company exists
+        # checked against the reference cache: a hit is confirmed with a
+        # query, and the unique constraints catch an equity it hasn't seen
+        from models.reference import reference_cache
+
+        # validate company exists, asking the database when the cache
+        # doesn't know it, e.g. created by another process since it loaded
         company_id = kwargs.get("company_id")
-        company = db.query(Company).filter_by(company_id=company_id).first()
-        if not company:
+        if (
+            reference_cache.company(db, company_id) is None
+            and db.get(Company, company_id) is None
+        ):
             raise ValueError(f"Company with ID '{company_id}' does not exist")
 
         # Optional: proactive uniqueness checks
-        if db.query(cls).filter_by(ticker=kwargs["ticker"]).first():
+        ticker, isin = kwargs["ticker"], kwargs["isin"]
+        if reference_cache.equity_by_ticker(db, ticker) and (
+            db.query(cls).filter_by(ticker=ticker).first()
+        ):
             raise ValueError("Ticker already exists")
 
-        if db.query(cls).filter_by(isin=kwargs["isin"]).first():
+        if reference_cache.equity_by_isin(db, isin) and (
+            db.query(cls).filter_by(isin=isin).first()
+        ):
             raise ValueError("ISIN already exists")
 
         equity = cls(**kwargs)
@@ -0,0 +1,87 @@
+"""
+Data model for the per-day market summary: totals, breadth, top movers
+and aggregates by country
+"""
+
+from datetime import datetime, date
+from sqlalchemy import (
+    BigInteger,
+    Integer,
+    ForeignKey,
+    Date,
+    func,
+    DateTime,
+    Float,
+    Enum as SQLEnum,
+)
+from sqlalchemy.orm import mapped_column, Mapped
+
+from db.base_class import Base
+from models.enums import CountryEnum, MoverDirectionEnum
+
+
+class MarketDailySummary(Base):
+    """
+    Market totals and breadth of one trading day. Equities without an
+    earlier close count towards the totals but not the breadth.
+    """
+
+    __tablename__ = "market_daily_summaries"
+
+    trading_date: Mapped[date] = mapped_column(
+        Date, ForeignKey("trading_days.trading_date"), primary_key=True
+    )
+    equities_traded: Mapped[int] = mapped_column(Integer, nullable=False)
+    total_volume: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    total_traded_value: Mapped[float] = mapped_column(Float, nullable=False)
+    # close against the equity's previous traded close
+    advancers: Mapped[int] = mapped_column(Integer, nullable=False)
+    decliners: Mapped[int] = mapped_column(Integer, nullable=False)
+    unchanged: Mapped[int] = mapped_column(Integer, nullable=False)
+
+    computed_at: Mapped[datetime] = mapped_column(
+        DateTime, server_default=func.now(), onupdate=func.now(), nullable=False
+    )
+
+
+class MarketDailyMover(Base):
+    """
+    The largest gainers and losers of one trading day, ranked from 1.
+    """
+
+    __tablename__ = "market_daily_movers"
+
+    trading_date: Mapped[date] = mapped_column(
+        Date, ForeignKey("trading_days.trading_date"), primary_key=True
+    )
+    direction: Mapped[MoverDirectionEnum] = mapped_column(
+        SQLEnum(MoverDirectionEnum), primary_key=True
+    )
+    rank: Mapped[int] = mapped_column(Integer, primary_key=True)
+    equity_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("equities.equity_id"), nullable=False
+    )
+    close_price: Mapped[float] = mapped_column(Float, nullable=False)
+    previous_close: Mapped[float] = mapped_column(Float, nullable=False)
+    # close / previous_close - 1
+    change: Mapped[float] = mapped_column(Float, nullable=False)
+
+
+class MarketCountrySummary(Base):
+    """
+    Totals and breadth of one trading day for the equities of companies
+    from one country.
+    """
+
+    __tablename__ = "market_country_summaries"
+
+    trading_date: Mapped[date] = mapped_column(
+        Date, ForeignKey("trading_days.trading_date"), primary_key=True
+    )
+    country: Mapped[CountryEnum] = mapped_column(SQLEnum(CountryEnum), primary_key=True)
+    equities_traded: Mapped[int] = mapped_column(Integer, nullable=False)
+    total_volume: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    total_traded_value: Mapped[float] = mapped_column(Float, nullable=False)
+    advancers: Mapped[int] = mapped_column(Integer, nullable=False)
+    decliners: Mapped[int] = mapped_column(Integer, nullable=False)
+    unchanged: Mapped[int] = mapped_column(Integer, nullable=False)
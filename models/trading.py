@@ -12,11 +12,38 @@ from sqlalchemy import (
     func,
     DateTime,
     Float,
+    Index,
     UniqueConstraint,
+    insert,
+    literal,
+    select,
+    tuple_,
 )
 from sqlalchemy.orm import relationship, mapped_column, Mapped, Session
+from sqlalchemy.exc import IntegrityError
 
 from db.base_class import Base
+from db.changes import publish_changes
+from db.instrument import instrumented
+from db.partitions import PARTITION_BY, date_bounds
+from db.upsert import batched, insert_for, on_conflict_update_changed, row_hash
+
+# Fields that must all be present for a row to carry full OHLCV data
+OHLCV_FIELDS = ("open_price", "high_price", "low_price", "close_price", "volume")
+
+# Values covered by row_hash; data_source is provenance, not a change
+EOD_HASH_FIELDS = OHLCV_FIELDS + ("traded_value",)
+RESIDUAL_HASH_FIELDS = ("buy_price", "sell_price", "buy_quantity", "sell_quantity")
+
+# Columns a bulk upsert overwrites on EOD prices whose values changed
+EOD_UPDATE_FIELDS = OHLCV_FIELDS + ("traded_value", "data_source", "full_data_flag")
+
+# Columns of an EOD price kept for each superseded version
+EOD_VERSION_COLUMNS = (
+    ("equity_id", "trading_date")
+    + EOD_HASH_FIELDS
+    + ("full_data_flag", "data_source", "row_hash")
+)
 
 
 class TradingDay(Base):
@@ -45,6 +72,7 @@ class TradingDay(Base):
     )
 
     @classmethod
+    @instrumented("TradingDay.create")
     def create(cls, db: Session, **kwargs):
         """
         Create a trading day if it doesn't exist, return the instance.
@@ -65,9 +93,46 @@ class TradingDay(Base):
         db.refresh(trading_day)
         return trading_day
 
+    @classmethod
+    @instrumented("TradingDay.bulk_create")
+    def bulk_create(cls, db: Session, rows) -> int:
+        """
+        Insert trading days that don't exist yet in a single statement.
+        Each row is a dict with trading_date and optionally is_open and note.
+        Returns the number of rows inserted.
+        """
+        records = [
+            {
+                "trading_date": row["trading_date"],
+                "is_open": row.get("is_open", True),
+                "note": row.get("note"),
+            }
+            for row in rows
+        ]
+        if not records:
+            return 0
+
+        table = cls.__table__
+        stmt = (
+            insert_for(db, table)
+            .on_conflict_do_nothing(index_elements=[table.c.trading_date])
+            .returning(table.c.trading_id)
+        )
+        inserted = len(db.execute(stmt, records).all())
+        db.commit()
+        return inserted
+
 
 class EquityEODPrice(Base):
     __tablename__ = "equity_eod_prices"
+    __table_args__ = (
+        # price history per equity and duplicate checks
+        UniqueConstraint("equity_id", "trading_date", name="uq_eod_equity_date"),
+        # cross-sectional reads for a single day
+        Index("ix_eod_date_equity", "trading_date", "equity_id"),
+        # yearly partitions on PostgreSQL, a plain table on SQLite
+        {"postgresql_partition_by": PARTITION_BY},
+    )
 
     # primary key
     eod_price_id: Mapped[int] = mapped_column(
@@ -91,6 +156,8 @@ class EquityEODPrice(Base):
     traded_value: Mapped[float] = mapped_column(Float, nullable=True)
     full_data_flag: Mapped[bool] = mapped_column(Boolean, nullable=False, default=False)
     data_source: Mapped[str] = mapped_column(String(255), nullable=True)
+    # digest of EOD_HASH_FIELDS, set on every write
+    row_hash: Mapped[str] = mapped_column(String(32), nullable=True)
 
     # timestamps
     created_at: Mapped[datetime] = mapped_column(
@@ -109,6 +176,7 @@ class EquityEODPrice(Base):
     )
 
     @classmethod
+    @instrumented("EquityEODPrice.create")
     def create(cls, db: Session, **kwargs):
         """
         Create a new EOD price if it doesn't exist. Returns the instance.
@@ -129,28 +197,255 @@ class EquityEODPrice(Base):
                 f"EOD price for equity_id '{equity_id}' on date '{trading_date}' already exists"
             )
         # --- Automatically derive full_data_flag ---
-        ohlcv_fields = [
-            "open_price",
-            "high_price",
-            "low_price",
-            "close_price",
-            "volume",
-        ]
-
         kwargs["full_data_flag"] = all(
-            kwargs.get(field) is not None for field in ohlcv_fields
+            kwargs.get(field) is not None for field in OHLCV_FIELDS
         )
+        # so a later bulk upsert of the same values sees no change
+        kwargs["row_hash"] = row_hash(kwargs, EOD_HASH_FIELDS)
 
         # Create new record
         eod_price = cls(**kwargs)
         db.add(eod_price)
+        publish_changes(db, cls.__tablename__, [(equity_id, trading_date, True)])
         db.commit()
         db.refresh(eod_price)
         return eod_price
 
+    @classmethod
+    @instrumented("EquityEODPrice.bulk_create", batched=True)
+    def bulk_create(cls, db: Session, rows, batch_size: int = 500):
+        """
+        Insert EOD prices in batches, leaving existing rows untouched.
+        Returns one {"batch", "inserted", "skipped", "conflicts"} dict per batch.
+        """
+        return cls._bulk_write(db, rows, batch_size, update=False)
+
+    @classmethod
+    @instrumented("EquityEODPrice.bulk_upsert", batched=True)
+    def bulk_upsert(cls, db: Session, rows, batch_size: int = 500):
+        """
+        Insert EOD prices in batches, overwriting existing rows whose values
+        changed; the replaced versions are kept in EquityEODPriceRevision.
+        Rows with the same values are left untouched.
+        Returns one {"batch", "inserted", "skipped", "conflicts", "updated",
+        "unchanged"} dict per batch, where conflicts = updated + unchanged.
+        """
+        return cls._bulk_write(db, rows, batch_size, update=True)
+
+    @classmethod
+    @instrumented("EquityEODPrice.correct")
+    def correct(cls, db: Session, **kwargs):
+        """
+        Store a corrected EOD price, or a new one when none exists yet.
+        The version it replaces is kept in EquityEODPriceRevision.
+        Returns the instance.
+        """
+        equity_id = kwargs.get("equity_id")
+        trading_date = kwargs.get("trading_date")
+        if None in (equity_id, trading_date, kwargs.get("close_price")):
+            raise ValueError(
+                "'equity_id', 'trading_date' and 'close_price' are required"
+            )
+
+        cls._bulk_write(db, [kwargs], batch_size=1, update=True)
+        return (
+            db.query(cls)
+            .filter_by(equity_id=equity_id, trading_date=trading_date)
+            .populate_existing()
+            .one()
+        )
+
+    @classmethod
+    def _prepare_batch(cls, batch):
+        """
+        Turn a batch of row dicts into insertable records.
+        Rows without a key or close price are skipped, and only the last
+        row is kept when the same (equity_id, trading_date) repeats.
+        """
+        by_key = {}
+        for row in batch:
+            key = (row.get("equity_id"), row.get("trading_date"))
+            if None in key or row.get("close_price") is None:
+                continue
+            by_key[key] = row
+        rows = list(by_key.values())
+
+        # --- Derive full_data_flag column by column ---
+        columns = {
+            field: [row.get(field) for row in rows]
+            for field in OHLCV_FIELDS + ("traded_value", "data_source")
+        }
+        flags = [
+            None not in values
+            for values in zip(*(columns[field] for field in OHLCV_FIELDS))
+        ]
+
+        records = [
+            {
+                "equity_id": equity_id,
+                "trading_date": trading_date,
+                "full_data_flag": flag,
+                **{field: values[i] for field, values in columns.items()},
+            }
+            for i, ((equity_id, trading_date), flag) in enumerate(
+                zip(by_key, flags)
+            )
+        ]
+        for record in records:
+            record["row_hash"] = row_hash(record, EOD_HASH_FIELDS)
+        return records, len(batch) - len(records)
+
+    @classmethod
+    def _bulk_write(cls, db: Session, rows, batch_size: int, update: bool):
+        results = []
+        for number, batch in enumerate(batched(rows, batch_size)):
+            records, skipped = cls._prepare_batch(batch)
+            result = {"batch": number, "inserted": 0, "skipped": skipped, "conflicts": 0}
+            results.append(result)
+            if not records:
+                continue
+
+            table = cls.__table__
+            stmt = insert_for(db, table)
+            keys = [table.c.equity_id, table.c.trading_date]
+            changed = []
+            if update:
+                pairs = [(r["equity_id"], r["trading_date"]) for r in records]
+                # stored row_hash by key
+                existing = {
+                    (equity_id, trading_date): stored
+                    for equity_id, trading_date, stored in db.query(
+                        cls.equity_id, cls.trading_date, cls.row_hash
+                    ).filter(
+                        date_bounds(cls.trading_date, (day for _, day in pairs)),
+                        tuple_(cls.equity_id, cls.trading_date).in_(pairs),
+                    )
+                }
+                changed = [
+                    pair
+                    for pair, record in zip(pairs, records)
+                    if pair in existing and existing[pair] != record["row_hash"]
+                ]
+            else:
+                stmt = stmt.on_conflict_do_nothing(index_elements=keys)
+
+            # One transaction per batch, with its revisions and change-feed events
+            try:
+                if update:
+                    now = None
+                    if changed:
+                        now = EquityEODPriceRevision.supersede(
+                            db,
+                            date_bounds(cls.trading_date, (day for _, day in changed)),
+                            tuple_(*keys).in_(changed),
+                        )
+                    stmt = on_conflict_update_changed(
+                        stmt, keys, EOD_UPDATE_FIELDS, now=now
+                    )
+                written = [
+                    tuple(key) for key in db.execute(stmt.returning(*keys), records)
+                ]
+                publish_changes(
+                    db,
+                    cls.__tablename__,
+                    [(*key, not update or key not in existing) for key in written],
+                )
+                db.commit()
+            except IntegrityError:
+                db.rollback()
+                raise ValueError(
+                    f"EOD price batch {number} violates a database constraint"
+                )
+
+            if update:
+                # RETURNING covers inserted and changed rows only
+                result["conflicts"] = len(existing)
+                result["inserted"] = len(records) - len(existing)
+                result["updated"] = len(written) - result["inserted"]
+                result["unchanged"] = len(existing) - result["updated"]
+            else:
+                result["inserted"] = len(written)
+                result["conflicts"] = len(records) - len(written)
+        return results
+
+
+class EquityEODPriceRevision(Base):
+    """
+    A superseded version of an EOD price. It was the stored version from
+    valid_from (the row's updated_at then) until valid_to, when a
+    correction replaced it; trading_date remains the day it describes.
+    """
+
+    __tablename__ = "equity_eod_price_revisions"
+    __table_args__ = (
+        # as-of reads: the version of each (date, equity) still valid at a time
+        Index("ix_eod_revision_as_of", "trading_date", "equity_id", "valid_to"),
+    )
+
+    revision_id: Mapped[int] = mapped_column(
+        Integer, primary_key=True, autoincrement=True
+    )
+    equity_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("equities.equity_id"), nullable=False
+    )
+    trading_date: Mapped[date] = mapped_column(
+        Date, ForeignKey("trading_days.trading_date"), nullable=False
+    )
+
+    # the superseded values
+    open_price: Mapped[float] = mapped_column(Float, nullable=True)
+    close_price: Mapped[float] = mapped_column(Float, nullable=False)
+    high_price: Mapped[float] = mapped_column(Float, nullable=True)
+    low_price: Mapped[float] = mapped_column(Float, nullable=True)
+    volume: Mapped[int] = mapped_column(Integer, nullable=True)
+    traded_value: Mapped[float] = mapped_column(Float, nullable=True)
+    full_data_flag: Mapped[bool] = mapped_column(Boolean, nullable=False, default=False)
+    data_source: Mapped[str] = mapped_column(String(255), nullable=True)
+    row_hash: Mapped[str] = mapped_column(String(32), nullable=True)
+
+    # knowledge time: [valid_from, valid_to)
+    valid_from: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    valid_to: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+
+    @classmethod
+    def supersede(cls, db: Session, *criteria, select_from=None) -> datetime:
+        """
+        Copy the stored EOD prices matching `criteria` (on the
+        equity_eod_prices table, optionally joined as `select_from`) into
+        the history, valid until now. Doesn't commit. Returns that time,
+        which the replacing versions must get as updated_at so the
+        history has no gaps.
+        """
+        # one timestamp for the batch; SQLite's clock isn't per transaction
+        now = db.scalar(select(func.now())).replace(tzinfo=None)
+        prices = EquityEODPrice.__table__
+        versions = select(
+            *(prices.c[column] for column in EOD_VERSION_COLUMNS),
+            prices.c.updated_at,
+            literal(now, DateTime),
+        ).where(*criteria)
+        if select_from is not None:
+            versions = versions.select_from(select_from)
+        db.execute(
+            insert(cls).from_select(
+                EOD_VERSION_COLUMNS + ("valid_from", "valid_to"), versions
+            )
+        )
+        return now
+
 
 class EquityResidualQuantity(Base):
     __tablename__ = "equity_residual_quantities"
+    __table_args__ = (
+        # residual history per equity and duplicate checks
+        UniqueConstraint(
+            "equity_id", "trading_date", name="uq_residual_equity_date"
+        ),
+        # cross-sectional reads for a single day
+        Index("ix_residual_date_equity", "trading_date", "equity_id"),
+        # yearly partitions on PostgreSQL, a plain table on SQLite
+        {"postgresql_partition_by": PARTITION_BY},
+    )
 
     residual_id: Mapped[int] = mapped_column(
         Integer, primary_key=True, autoincrement=True
@@ -166,6 +461,8 @@ class EquityResidualQuantity(Base):
     buy_quantity: Mapped[int] = mapped_column(Integer, nullable=True)
     sell_quantity: Mapped[int] = mapped_column(Integer, nullable=True)
     data_source: Mapped[str] = mapped_column(String(255), nullable=True)
+    # digest of RESIDUAL_HASH_FIELDS, set on every write
+    row_hash: Mapped[str] = mapped_column(String(32), nullable=True)
 
     created_at: Mapped[datetime] = mapped_column(
         DateTime, server_default=func.now(), nullable=False
@@ -183,6 +480,7 @@ class EquityResidualQuantity(Base):
     )
 
     @classmethod
+    @instrumented("EquityResidualQuantity.create")
     def create(cls, db: Session, **kwargs):
         """
         Create a new residual quantity record if it doesn't exist. Returns the instance.
@@ -203,18 +501,49 @@ class EquityResidualQuantity(Base):
                 f"Residual quantity for equity_id '{equity_id}' on date '{trading_date}' already exists"
             )
 
-        buy_qty = kwargs.get("buy_quantity")
-        sell_qty = kwargs.get("sell_quantity")
-
         # Validation
-        if buy_qty and kwargs.get("buy_price") is None:
-            raise ValueError("buy_price is required when buy_quantity is provided")
-
-        if sell_qty and kwargs.get("sell_price") is None:
-            raise ValueError("sell_price is required when sell_quantity is provided")
+        side = cls._unpriced_side(kwargs)
+        if side is not None:
+            raise ValueError(
+                f"{side}_price is required when {side}_quantity is provided"
+            )
 
+        kwargs["row_hash"] = row_hash(kwargs, RESIDUAL_HASH_FIELDS)
         residual_quantity = cls(**kwargs)
         db.add(residual_quantity)
+        publish_changes(db, cls.__tablename__, [(equity_id, trading_date, True)])
         db.commit()
         db.refresh(residual_quantity)
         return residual_quantity
+
+    @staticmethod
+    def _unpriced_side(row) -> str | None:
+        """"buy" or "sell" when that side has a quantity but no price."""
+        for side in ("buy", "sell"):
+            if row.get(f"{side}_quantity") and row.get(f"{side}_price") is None:
+                return side
+        return None
+
+    @classmethod
+    def _prepare_batch(cls, batch):
+        """
+        Turn a batch of row dicts into insertable records. Rows without a
+        key, or with a quantity but no price, are skipped, and only the
+        last row is kept when the same (equity_id, trading_date) repeats.
+        """
+        fields = RESIDUAL_HASH_FIELDS + ("data_source",)
+        by_key = {}
+        for row in batch:
+            key = (row.get("equity_id"), row.get("trading_date"))
+            if None in key or cls._unpriced_side(row) is not None:
+                continue
+            by_key[key] = {field: row.get(field) for field in fields}
+        return [
+            {
+                "equity_id": equity_id,
+                "trading_date": trading_date,
+                **values,
+                "row_hash": row_hash(values, RESIDUAL_HASH_FIELDS),
+            }
+            for (equity_id, trading_date), values in by_key.items()
+        ], len(batch) - len(by_key)
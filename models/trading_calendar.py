@@ -0,0 +1,170 @@
+"""
+BRVM trading calendar
+"""
+
+from bisect import bisect_left, bisect_right
+from datetime import date, timedelta
+from typing import Iterable, NamedTuple
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from db.instrument import instrumented
+from models.reference import invalidate_reference_caches
+from models.trading import TradingDay
+
+
+class FixedHoliday(NamedTuple):
+    """Holiday on the same day every year."""
+
+    month: int
+    day: int
+    name: str
+
+    def date_in(self, year: int) -> date:
+        return date(year, self.month, self.day)
+
+
+class EasterHoliday(NamedTuple):
+    """Holiday a fixed number of days after Easter Sunday."""
+
+    offset: int
+    name: str
+
+    def date_in(self, year: int) -> date:
+        return easter_sunday(year) + timedelta(days=self.offset)
+
+
+# Public holidays observed by the BRVM in Abidjan. Islamic holidays
+# (Korité, Tabaski, Maouloud...) follow the lunar calendar and are
+# announced each year, so they are passed as extra_holidays.
+UEMOA_HOLIDAYS = (
+    FixedHoliday(1, 1, "Jour de l'an"),
+    EasterHoliday(1, "Lundi de Pâques"),
+    FixedHoliday(5, 1, "Fête du travail"),
+    EasterHoliday(39, "Ascension"),
+    EasterHoliday(50, "Lundi de Pentecôte"),
+    FixedHoliday(8, 7, "Fête de l'indépendance"),
+    FixedHoliday(8, 15, "Assomption"),
+    FixedHoliday(11, 1, "Toussaint"),
+    FixedHoliday(11, 15, "Journée nationale de la paix"),
+    FixedHoliday(12, 25, "Noël"),
+)
+
+
+def easter_sunday(year: int) -> date:
+    """Gregorian Easter Sunday (anonymous Gregorian algorithm)."""
+    a = year % 19
+    b, c = divmod(year, 100)
+    d, e = divmod(b, 4)
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7  # noqa: E741
+    m = (a + 11 * h + 22 * l) // 451
+    month, day = divmod(h + l - 7 * m + 114, 31)
+    return date(year, month, day + 1)
+
+
+def holidays(
+    start: date, end: date, rules=UEMOA_HOLIDAYS, extra_holidays=()
+) -> dict:
+    """
+    Map each holiday between start and end (inclusive) to its name.
+    """
+    found = {}
+    for year in range(start.year, end.year + 1):
+        for rule in rules:
+            day = rule.date_in(year)
+            if start <= day <= end:
+                found.setdefault(day, rule.name)
+    for day in extra_holidays:
+        if start <= day <= end:
+            found.setdefault(day, "Jour férié")
+    return found
+
+
+def generate_trading_days(
+    start: date, end: date, rules=UEMOA_HOLIDAYS, extra_holidays=()
+) -> list[date]:
+    """
+    Business days between start and end (inclusive), without weekends
+    and holidays.
+    """
+    closed = holidays(start, end, rules, extra_holidays)
+    return [
+        day
+        for day in (start + timedelta(days=n) for n in range((end - start).days + 1))
+        if day.weekday() < 5 and day not in closed
+    ]
+
+
+@instrumented("materialize_calendar")
+def materialize_calendar(
+    db: Session, start: date, end: date, rules=UEMOA_HOLIDAYS, extra_holidays=()
+) -> int:
+    """
+    Insert the missing trading_days rows for a date range in one
+    statement. Weekday holidays are stored closed, with their name as note.
+    Returns the number of rows inserted.
+    """
+    closed = holidays(start, end, rules, extra_holidays)
+    rows = [
+        {"trading_date": day, "is_open": True}
+        for day in generate_trading_days(start, end, rules, extra_holidays)
+    ]
+    rows += [
+        {"trading_date": day, "is_open": False, "note": name}
+        for day, name in closed.items()
+        if day.weekday() < 5
+    ]
+    inserted = TradingDay.bulk_create(db, rows)
+    if inserted:
+        invalidate_reference_caches("trading_days")
+    return inserted
+
+
+class TradingCalendar:
+    """
+    In-memory calendar arithmetic over a sorted list of open days.
+    """
+
+    def __init__(self, days: Iterable[date]):
+        self.days = sorted(set(days))
+
+    @classmethod
+    def from_rules(
+        cls, start: date, end: date, rules=UEMOA_HOLIDAYS, extra_holidays=()
+    ):
+        return cls(generate_trading_days(start, end, rules, extra_holidays))
+
+    @classmethod
+    def from_db(cls, db: Session):
+        """Load every open trading day in one query."""
+        stmt = select(TradingDay.trading_date).where(TradingDay.is_open.is_(True))
+        return cls(db.scalars(stmt))
+
+    def __len__(self):
+        return len(self.days)
+
+    def __contains__(self, day: date):
+        return self.is_open(day)
+
+    def is_open(self, day: date) -> bool:
+        index = bisect_left(self.days, day)
+        return index < len(self.days) and self.days[index] == day
+
+    def next_trading_day(self, day: date) -> date | None:
+        """First trading day strictly after `day`."""
+        index = bisect_right(self.days, day)
+        return self.days[index] if index < len(self.days) else None
+
+    def previous_trading_day(self, day: date) -> date | None:
+        """Last trading day strictly before `day`."""
+        index = bisect_left(self.days, day)
+        return self.days[index - 1] if index > 0 else None
+
+    def between(self, start: date, end: date) -> list[date]:
+        """Trading days between start and end (inclusive)."""
+        return self.days[bisect_left(self.days, start):bisect_right(self.days, end)]
@@ -0,0 +1,309 @@
+"""
+Memory-mapped columnar cache of the full EOD price history
+
+Each price field is one (days x equities) float64 .npy file, NaN where an
+equity didn't trade, next to a dates.npy axis, in a generation directory:
+
+  root/manifest.json   generation, row count, equity axis, fields
+  root/<generation>/dates.npy, close_price.npy, ...
+
+Readers map the arrays read-only, so every process shares the same pages.
+New trading days are written in place past the row count and published
+by atomically replacing the manifest; a rebuild (or growing past the
+preallocated capacity) writes a new generation instead, so readers of the
+previous one are never disturbed.
+"""
+
+import fcntl
+import json
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from db.changes import change_watermark
+from db.instrument import instrumented
+from models.stocks import Equity
+from models.trading import EquityEODPrice
+from query.prices import PRICE_FIELDS, PriceMatrix, get_price_history, to_datetime64
+
+MANIFEST = "manifest.json"
+VERSION = 1
+
+# Spare trading days allocated past the data, about a year
+GROWTH = 260
+
+
+class CacheMissing(LookupError):
+    """The cache hasn't been built yet."""
+
+
+class HistoryCache:
+    """
+    The cache stored under `root`, holding `fields` of every equity on
+    every day with prices. Writers (rebuild, refresh) lock each other out.
+    """
+
+    def __init__(self, root, fields=PRICE_FIELDS):
+        self.root = Path(root)
+        self.fields = tuple(fields)
+
+    # --- reading ---
+
+    def manifest(self) -> dict:
+        try:
+            return json.loads((self.root / MANIFEST).read_text())
+        except FileNotFoundError:
+            raise CacheMissing(f"No history cache in {self.root}") from None
+
+    def _map(self, manifest: dict, name: str, mode: str = "r") -> np.ndarray:
+        path = self.root / manifest["generation"] / f"{name}.npy"
+        return np.load(path, mmap_mode=mode)
+
+    def read(
+        self,
+        fields=("close_price",),
+        start: date | None = None,
+        end: date | None = None,
+    ) -> PriceMatrix:
+        """
+        The cached history between start and end (inclusive) as a
+        PriceMatrix of read-only memory-mapped views; nothing is copied.
+        """
+        unknown = set(fields) - set(self.fields)
+        if unknown:
+            raise ValueError(f"Fields not cached: {', '.join(sorted(unknown))}")
+        try:
+            return self._read(self.manifest(), fields, start, end)
+        except FileNotFoundError:
+            # a writer replaced the generation between the two reads
+            return self._read(self.manifest(), fields, start, end)
+
+    def _read(self, manifest, fields, start, end) -> PriceMatrix:
+        rows = manifest["rows"]
+        dates = self._map(manifest, "dates")[:rows]
+        first, last = 0, rows
+        if start is not None:
+            first = np.searchsorted(dates, np.datetime64(start), "left")
+        if end is not None:
+            last = np.searchsorted(dates, np.datetime64(end), "right")
+        return PriceMatrix(
+            dates[first:last],
+            np.array(manifest["tickers"], dtype=object),
+            {field: self._map(manifest, field)[first:last] for field in fields},
+            np.array(manifest["equity_ids"], dtype=np.int64),
+        )
+
+    # --- writing ---
+
+    @contextmanager
+    def _writer(self):
+        """Serialize writers across processes."""
+        self.root.mkdir(parents=True, exist_ok=True)
+        with open(self.root / ".lock", "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            yield
+
+    def _publish(self, manifest: dict):
+        handle, temporary = tempfile.mkstemp(dir=self.root, suffix=".tmp")
+        with os.fdopen(handle, "w") as file:
+            json.dump(manifest, file)
+        os.replace(temporary, self.root / MANIFEST)
+
+    def _write_generation(self, manifest: dict, matrix: PriceMatrix, capacity: int):
+        """Write `matrix` into a new generation and publish it."""
+        name = f"g{manifest.get('number', 0) + 1:06}"
+        directory = self.root / name
+        # left over from a writer that died before publishing it
+        shutil.rmtree(directory, ignore_errors=True)
+        directory.mkdir()
+        rows, columns = len(matrix.dates), len(manifest["equity_ids"])
+
+        dates = np.lib.format.open_memmap(
+            directory / "dates.npy", "w+", "datetime64[D]", (capacity,)
+        )
+        dates[:rows] = matrix.dates
+        dates.flush()
+        for field in self.fields:
+            array = np.lib.format.open_memmap(
+                directory / f"{field}.npy", "w+", np.float64, (capacity, columns)
+            )
+            array[:] = np.nan
+            array[:rows] = matrix.values[field]
+            array.flush()
+
+        previous = manifest.get("generation")
+        manifest.update(
+            number=manifest.get("number", 0) + 1,
+            generation=name,
+            rows=rows,
+            capacity=capacity,
+        )
+        self._publish(manifest)
+        # keep the generation just replaced for readers still opening it
+        for stale in self.root.glob("g*"):
+            if stale.is_dir() and stale.name not in (name, previous):
+                shutil.rmtree(stale, ignore_errors=True)
+
+    def _equities(self, db: Session) -> list[tuple[int, str]]:
+        return [
+            tuple(row)
+            for row in db.execute(
+                select(Equity.equity_id, Equity.ticker).order_by(Equity.equity_id)
+            )
+        ]
+
+    def _source_update(self, db: Session) -> str:
+        return change_watermark(db).isoformat()
+
+    def _changed(self, db: Session, manifest: dict, last) -> bool:
+        """
+        Whether prices stamped since the manifest's watermark differ from
+        the cached days. Rows in the overlap are usually cached already,
+        so they are compared with the cache rather than taken as changes.
+        """
+        prices = EquityEODPrice.__table__
+        watermark = datetime.fromisoformat(manifest["source_update"])
+        rows = db.execute(
+            select(
+                prices.c.equity_id,
+                prices.c.trading_date,
+                *(prices.c[field] for field in self.fields),
+            ).where(
+                prices.c.trading_date <= last.item(),
+                prices.c.updated_at >= watermark,
+            )
+        ).all()
+        if not rows:
+            return False
+        columns = list(zip(*rows))
+        equity_ids = np.array(manifest["equity_ids"], dtype=np.int64)
+        ids = np.array(columns[0], dtype=np.int64)
+        if not np.isin(ids, equity_ids).all():
+            return True
+        dates = self._map(manifest, "dates")[:manifest["rows"]]
+        days = to_datetime64(columns[1])
+        index = np.minimum(np.searchsorted(dates, days), len(dates) - 1)
+        if (dates[index] != days).any():
+            return True
+        positions = np.searchsorted(equity_ids, ids)
+        for field, values in zip(self.fields, columns[2:]):
+            cached = self._map(manifest, field)[index, positions]
+            # NULL becomes NaN, as in the cache
+            stored = np.array(values, dtype=np.float64)
+            if not np.array_equal(cached, stored, equal_nan=True):
+                return True
+        return False
+
+    def _matrix(self, db: Session, equity_ids, start=None) -> PriceMatrix | None:
+        """
+        History from `start`, aligned to the `equity_ids` axis; None when
+        it has prices of an equity missing from the axis.
+        """
+        matrix = get_price_history(db, start=start, fields=self.fields, wide=True)
+        if not np.isin(matrix.equity_ids, equity_ids).all():
+            return None
+        columns = np.searchsorted(equity_ids, matrix.equity_ids)
+        values = {}
+        for field in self.fields:
+            aligned = np.full((len(matrix.dates), len(equity_ids)), np.nan)
+            aligned[:, columns] = matrix.values[field]
+            values[field] = aligned
+        return PriceMatrix(matrix.dates, None, values, equity_ids)
+
+    @instrumented("HistoryCache.rebuild")
+    def rebuild(self, db: Session) -> dict:
+        """Rewrite the whole cache from the database."""
+        with self._writer():
+            return self._rebuild(db)
+
+    def _rebuild(self, db: Session) -> dict:
+        source_update = self._source_update(db)
+        matrix = None
+        while matrix is None:
+            # an equity added since _equities() read them is read again
+            equities = self._equities(db)
+            equity_ids = np.array([row[0] for row in equities], dtype=np.int64)
+            matrix = self._matrix(db, equity_ids)
+        try:
+            manifest = self.manifest()
+        except CacheMissing:
+            manifest = {}
+        manifest.update(
+            version=VERSION,
+            fields=list(self.fields),
+            equity_ids=equity_ids.tolist(),
+            tickers=[row[1] for row in equities],
+            source_update=source_update,
+            built_at=datetime.now().isoformat(timespec="seconds"),
+        )
+        self._write_generation(manifest, matrix, len(matrix.dates) + GROWTH)
+        return {"method": "rebuild", "days": len(matrix.dates), "rows": manifest["rows"]}
+
+    @instrumented("HistoryCache.refresh")
+    def refresh(self, db: Session) -> dict:
+        """
+        Append the trading days stored since the last refresh. Falls back
+        to a rebuild when there is no cache yet, an equity was added, or
+        already cached days changed.
+        Returns {"method", "days", "rows"} where days were written.
+        """
+        with self._writer():
+            try:
+                manifest = self.manifest()
+            except CacheMissing:
+                return self._rebuild(db)
+            outdated = manifest.get("version") != VERSION
+            if outdated or manifest["fields"] != list(self.fields):
+                return self._rebuild(db)
+
+            rows = manifest["rows"]
+            last = self._map(manifest, "dates")[rows - 1] if rows else None
+            source_update = self._source_update(db)
+            if rows and manifest["source_update"] is not None:
+                if self._changed(db, manifest, last):
+                    return self._rebuild(db)
+            if self._equities(db) != [
+                tuple(pair) for pair in zip(manifest["equity_ids"], manifest["tickers"])
+            ]:
+                return self._rebuild(db)
+
+            equity_ids = np.array(manifest["equity_ids"], dtype=np.int64)
+            start = last.item() + timedelta(days=1) if rows else None
+            matrix = self._matrix(db, equity_ids, start)
+            if matrix is None:
+                return self._rebuild(db)
+            added = len(matrix.dates)
+            manifest["source_update"] = source_update
+            if rows + added > manifest["capacity"]:
+                existing = self._read(manifest, self.fields, None, None)
+                combined = PriceMatrix(
+                    np.concatenate([existing.dates, matrix.dates]),
+                    None,
+                    {
+                        field: np.vstack([existing.values[field], matrix.values[field]])
+                        for field in self.fields
+                    },
+                    equity_ids,
+                )
+                self._write_generation(manifest, combined, rows + added + GROWTH)
+                return {"method": "grow", "days": added, "rows": manifest["rows"]}
+
+            if added:
+                dates = self._map(manifest, "dates", "r+")
+                dates[rows:rows + added] = matrix.dates
+                dates.flush()
+                for field in self.fields:
+                    array = self._map(manifest, field, "r+")
+                    array[rows:rows + added] = matrix.values[field]
+                    array.flush()
+            # published only once the rows are written
+            manifest["rows"] = rows + added
+            self._publish(manifest)
+            return {"method": "append", "days": added, "rows": manifest["rows"]}
@@ -0,0 +1,92 @@
+"""
+Read API for the per-day market summary
+"""
+
+from datetime import date
+from typing import NamedTuple
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from db.instrument import instrumented
+from models.enums import CountryEnum, MoverDirectionEnum
+from models.stocks import Equity
+from models.summary import MarketCountrySummary, MarketDailyMover, MarketDailySummary
+
+BREADTH_FIELDS = (
+    "equities_traded",
+    "total_volume",
+    "total_traded_value",
+    "advancers",
+    "decliners",
+    "unchanged",
+)
+
+
+class Mover(NamedTuple):
+    ticker: str
+    close_price: float
+    previous_close: float
+    change: float
+
+
+class Breadth(NamedTuple):
+    equities_traded: int
+    total_volume: int
+    total_traded_value: float
+    advancers: int
+    decliners: int
+    unchanged: int
+
+
+class MarketSummary(NamedTuple):
+    trading_date: date
+    market: Breadth
+    # ranked from the largest move
+    gainers: list[Mover]
+    losers: list[Mover]
+    countries: dict[CountryEnum, Breadth]
+
+
+def _breadth(row) -> Breadth:
+    return Breadth(*(getattr(row, field) for field in BREADTH_FIELDS))
+
+
+@instrumented("get_market_summary")
+def get_market_summary(db: Session, trading_date: date) -> MarketSummary | None:
+    """
+    The stored summary of one trading day, or None when it hasn't been
+    computed. Reads a bounded number of rows by primary key, whatever
+    the size of the price history.
+    """
+    market = db.execute(
+        select(MarketDailySummary).where(MarketDailySummary.trading_date == trading_date)
+    ).scalar_one_or_none()
+    if market is None:
+        return None
+
+    movers = db.execute(
+        select(
+            MarketDailyMover.direction,
+            Equity.ticker,
+            MarketDailyMover.close_price,
+            MarketDailyMover.previous_close,
+            MarketDailyMover.change,
+        )
+        .join(Equity, Equity.equity_id == MarketDailyMover.equity_id)
+        .where(MarketDailyMover.trading_date == trading_date)
+        .order_by(MarketDailyMover.rank)
+    ).all()
+    countries = db.scalars(
+        select(MarketCountrySummary).where(
+            MarketCountrySummary.trading_date == trading_date
+        )
+    ).all()
+
+    return MarketSummary(
+        trading_date,
+        _breadth(market),
+        [Mover(*row[1:]) for row in movers if row[0] == MoverDirectionEnum.GAINER],
+        [Mover(*row[1:]) for row in movers if row[0] == MoverDirectionEnum.LOSER],
+        {row.country: _breadth(row) for row in countries},
+    )
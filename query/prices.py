@@ -0,0 +1,234 @@
+"""
+Columnar read API for EOD price history
+"""
+
+from datetime import date, datetime
+from typing import TYPE_CHECKING, NamedTuple, Sequence
+
+from sqlalchemy import String, select, type_coerce, union_all
+from sqlalchemy.orm import Session
+
+from db.instrument import instrumented
+from models.stocks import Equity
+from models.trading import EquityEODPrice, EquityEODPriceRevision
+
+if TYPE_CHECKING:
+    # numpy takes about 100 ms to import; imported when first needed
+    import numpy as np
+
+PRICE_FIELDS = (
+    "open_price",
+    "high_price",
+    "low_price",
+    "close_price",
+    "volume",
+    "traded_value",
+)
+
+# date.toordinal() of 1970-01-01, the datetime64 epoch
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+
+class PriceMatrix(NamedTuple):
+    """Wide output: one (dates x tickers) array per field."""
+
+    dates: "np.ndarray"
+    tickers: "np.ndarray"
+    values: "dict[str, np.ndarray]"
+    equity_ids: "np.ndarray"
+
+
+def _check_fields(fields: Sequence[str]) -> tuple[str, ...]:
+    fields = tuple(fields)
+    unknown = set(fields) - set(PRICE_FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown price fields: {', '.join(sorted(unknown))}")
+    if not fields:
+        raise ValueError("At least one price field is required")
+    return fields
+
+
+def to_datetime64(values: Sequence) -> "np.ndarray":
+    """
+    Convert dates from the driver (ISO strings on SQLite, date objects
+    elsewhere) to datetime64[D] without going through datetime objects.
+    """
+    import numpy as np
+
+    if len(values) and isinstance(values[0], str):
+        return np.array(values, dtype="datetime64[D]")
+    ordinals = np.fromiter((d.toordinal() for d in values), np.int64, len(values))
+    return (ordinals - _EPOCH_ORDINAL).astype("datetime64[D]")
+
+
+def as_of(knowledge_time: datetime):
+    """
+    EOD prices as they were stored at `knowledge_time` (in the database's
+    clock, like updated_at): current rows last changed by then, and the
+    superseded revisions valid then. A subquery with the key columns and
+    PRICE_FIELDS, to select from in place of equity_eod_prices.
+    """
+    prices = EquityEODPrice.__table__
+    revisions = EquityEODPriceRevision.__table__
+    columns = ("equity_id", "trading_date") + PRICE_FIELDS
+    current = select(*(prices.c[column] for column in columns)).where(
+        prices.c.updated_at <= knowledge_time
+    )
+    # at most one revision per key spans a given time
+    superseded = select(*(revisions.c[column] for column in columns)).where(
+        revisions.c.valid_to > knowledge_time,
+        revisions.c.valid_from <= knowledge_time,
+    )
+    return union_all(current, superseded).subquery("eod_prices_as_of")
+
+
+def _source(known_at: datetime | None):
+    return EquityEODPrice.__table__ if known_at is None else as_of(known_at)
+
+
+def _trading_date_column(db: Session, source):
+    # SQLite stores dates as ISO text; skip SQLAlchemy's per-row parsing
+    if db.get_bind().dialect.name == "sqlite":
+        return type_coerce(source.c.trading_date, String)
+    return source.c.trading_date
+
+
+def _select(db: Session, source, fields):
+    """(equity_id, ticker, trading_date, *fields) of `source` rows."""
+    return select(
+        source.c.equity_id,
+        Equity.ticker,
+        _trading_date_column(db, source),
+        *(source.c[field] for field in fields),
+    ).join(Equity, Equity.equity_id == source.c.equity_id)
+
+
+def _fetch_columns(db: Session, stmt, fields):
+    """
+    Run a Core SELECT of (equity_id, ticker, trading_date, *fields) and
+    transpose the cursor rows into one array per column; NULL becomes NaN.
+    Rows are returned sorted by ticker, then date, with each row's rank in
+    the sorted tickers present and the tickers and equity ids of the ranks.
+    """
+    import numpy as np
+
+    rows = db.connection().execute(stmt).all()
+    columns = list(zip(*rows)) if rows else [()] * (len(fields) + 3)
+
+    # rank equities by ticker once, rather than sorting every row's string
+    ids, id_index = np.unique(np.array(columns[0], dtype=np.int64), return_inverse=True)
+    last_row = np.zeros(len(ids), dtype=np.int64)
+    last_row[id_index] = np.arange(len(id_index))
+    tickers = np.array(columns[1], dtype=object)[last_row]
+    by_ticker = np.argsort(tickers, kind="stable")
+    rank_by_id = np.empty(len(ids), dtype=np.int64)
+    rank_by_id[by_ticker] = np.arange(len(ids))
+    ranks = rank_by_id[id_index]
+    tickers, ids = tickers[by_ticker], ids[by_ticker]
+
+    dates = to_datetime64(columns[2])
+    order = np.lexsort((dates, ranks))
+    ranks = ranks[order]
+
+    arrays = {
+        "ticker": tickers[ranks],
+        "trading_date": dates[order],
+    }
+    for field, values in zip(fields, columns[3:]):
+        arrays[field] = np.array(values, dtype=np.float64)[order]
+    return arrays, ranks, tickers, ids
+
+
+def _pivot(columns, ranks, tickers, equity_ids, fields) -> PriceMatrix:
+    import numpy as np
+
+    dates, date_index = np.unique(columns["trading_date"], return_inverse=True)
+    values = {}
+    for field in fields:
+        matrix = np.full((len(dates), len(tickers)), np.nan)
+        matrix[date_index, ranks] = columns[field]
+        values[field] = matrix
+    return PriceMatrix(dates, tickers, values, equity_ids)
+
+
+def _wide_frame(matrix: PriceMatrix, fields):
+    import pandas as pd
+
+    index = pd.DatetimeIndex(matrix.dates, name="trading_date")
+    frames = {
+        field: pd.DataFrame(
+            matrix.values[field],
+            index=index,
+            columns=pd.Index(matrix.tickers, name="ticker"),
+        )
+        for field in fields
+    }
+    if len(fields) == 1:
+        return frames[fields[0]]
+    return pd.concat(frames, axis=1, names=["field"])
+
+
+@instrumented("get_price_history")
+def get_price_history(
+    db: Session,
+    tickers: Sequence[str] | None = None,
+    start: date | None = None,
+    end: date | None = None,
+    fields: Sequence[str] = ("close_price",),
+    wide: bool = False,
+    as_frame: bool = False,
+    known_at: datetime | None = None,
+):
+    """
+    Price history for some or all tickers between start and end (inclusive).
+
+    Runs one Core SELECT and builds arrays straight from the cursor rows,
+    without ORM objects. Returns a dict of column arrays sorted by ticker
+    and date, a PriceMatrix when `wide`, or a pandas DataFrame when
+    `as_frame` (wide frames are indexed by date with one column per ticker).
+    With `known_at`, prices are read as_of that time instead of the latest.
+    """
+    fields = _check_fields(fields)
+    source = _source(known_at)
+    stmt = _select(db, source, fields)
+    if tickers is not None:
+        stmt = stmt.where(Equity.ticker.in_(list(tickers)))
+    if start is not None:
+        stmt = stmt.where(source.c.trading_date >= start)
+    if end is not None:
+        stmt = stmt.where(source.c.trading_date <= end)
+
+    columns, ranks, present, equity_ids = _fetch_columns(db, stmt, fields)
+    if not wide:
+        if as_frame:
+            import pandas as pd
+
+            return pd.DataFrame(columns)
+        return columns
+    matrix = _pivot(columns, ranks, present, equity_ids, fields)
+    return _wide_frame(matrix, fields) if as_frame else matrix
+
+
+@instrumented("get_cross_section")
+def get_cross_section(
+    db: Session,
+    trading_date: date,
+    fields: Sequence[str] = PRICE_FIELDS,
+    as_frame: bool = False,
+    known_at: datetime | None = None,
+):
+    """
+    Prices of every equity that traded on one day, as column arrays
+    sorted by ticker (or a DataFrame indexed by ticker when `as_frame`),
+    as_of `known_at` when given.
+    """
+    fields = _check_fields(fields)
+    source = _source(known_at)
+    stmt = _select(db, source, fields).where(source.c.trading_date == trading_date)
+
+    columns, _, _, _ = _fetch_columns(db, stmt, fields)
+    if as_frame:
+        import pandas as pd
+
+        return pd.DataFrame(columns).set_index("ticker")
+    return columns
@@ -0,0 +1,22 @@
+"""Test the import-time benchmark"""
+
+from benchmarks.startup import measure, parse_importtime
+
+REPORT = """\
+import time: self [us] | cumulative | imported package
+import time:       120 |        120 |   _io
+import time:       300 |        420 | db.engine
+import time:        50 |         50 |   _io
+"""
+
+
+def test_parse_importtime_keeps_first_import():
+    assert parse_importtime(REPORT) == {"_io": (120, 120), "db.engine": (300, 420)}
+
+
+def test_session_import_defers_settings_and_async():
+    result = measure("db.session", rounds=1, warmup=0)
+
+    assert result["eager"] == []
+    assert result["key"] is True
+    assert result["min"] > 0
@@ -0,0 +1,64 @@
+"""Test the benchmark suite runner and regression gate"""
+
+import json
+
+import pytest
+
+from benchmarks.suite import compare, main, run_suite
+
+
+def report(**timings):
+    return {
+        "params": {"backend": "sqlite", "scale": "small"},
+        "results": {
+            name: {"min": seconds, "key": not name.startswith("info")}
+            for name, seconds in timings.items()
+        },
+    }
+
+
+def test_compare_flags_key_regressions_only():
+    baseline = report(fast=1.0, slow=1.0, info_case=1.0, gone=1.0)
+    current = report(fast=0.5, slow=1.3, info_case=3.0)
+
+    rows, regressions = compare(baseline, current, threshold=0.25)
+
+    statuses = {name: status for name, *_, status in rows}
+    assert statuses == {
+        "fast": "faster",
+        "slow": "REGRESSED",
+        "info_case": "slower",
+        "gone": "missing",
+    }
+    assert regressions == ["slow", "gone"]
+
+
+def test_compare_within_threshold_passes():
+    _, regressions = compare(report(a=1.0), report(a=1.2), threshold=0.25)
+    assert regressions == []
+
+
+def test_run_and_compare_command(tmp_path, capsys):
+    baseline = tmp_path / "baseline.json"
+    main(["run", "--rounds", "1", "--only", "calendar.generate", "--save", str(baseline)])
+
+    saved = json.loads(baseline.read_text())
+    result = saved["results"]["calendar.generate"]
+    assert list(saved["results"]) == ["calendar.generate"]
+    assert result["rows"] > 7000
+    assert result["median"] > 0
+
+    slower = dict(saved)
+    slower["results"] = {
+        "calendar.generate": {**result, "min": result["min"] * 2}
+    }
+    current = tmp_path / "current.json"
+    current.write_text(json.dumps(slower))
+    assert main(["compare", str(baseline), str(current)]) == 1
+    assert main(["compare", str(baseline), str(baseline)]) == 0
+    assert "REGRESSED" in capsys.readouterr().out
+
+
+def test_run_suite_rejects_unknown_scale():
+    with pytest.raises(KeyError):
+        run_suite("sqlite:///:memory:", "huge", rounds=1)
@@ -2,19 +2,25 @@
 Configuration for all tests
 """
 
+import os
 import pytest
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
-from models.stocks import Company
+from models.stocks import Company, Equity
 from models.enums import CountryEnum, StatusEnum
+from models.reference import invalidate_reference_caches
 from db.base import Base
 
 # Use an in-memory SQLite database for fast tests
 TEST_DATABASE_URL = "sqlite:///:memory:"
 
-engine = create_engine(TEST_DATABASE_URL)
+# run_pipeline writes from a worker thread, one batch at a time
+engine = create_engine(TEST_DATABASE_URL, connect_args={"check_same_thread": False})
 TestingSessionLocal = sessionmaker(bind=engine)
 
+# Optional Postgres server for dialect-specific tests, skipped when unset
+TEST_POSTGRES_URL = os.environ.get("TEST_POSTGRES_URL")
+
 
 @pytest.fixture(scope="session", autouse=True)
 def create_test_database():
@@ -35,6 +41,8 @@ def db():
         if transaction.is_active:
             transaction.rollback()  # only rollback if still active
         connection.close()
+        # the shared cache may hold rows the rollback removed
+        invalidate_reference_caches()
 
 
 @pytest.fixture
@@ -46,3 +54,41 @@ def company(db):
         status=StatusEnum.ACTIVE,
     )
     return company
+
+
+@pytest.fixture
+def equity(db, company):
+    equity = Equity.create(
+        db,
+        company_id=company.company_id,
+        ticker="SGBC",
+        isin="CI0000000002",
+    )
+    return equity
+
+
+@pytest.fixture(scope="session")
+def pg_engine():
+    if not TEST_POSTGRES_URL:
+        pytest.skip("TEST_POSTGRES_URL is not set")
+    pg_engine = create_engine(TEST_POSTGRES_URL)
+    Base.metadata.drop_all(bind=pg_engine)
+    Base.metadata.create_all(bind=pg_engine)
+    yield pg_engine
+    Base.metadata.drop_all(bind=pg_engine)
+    pg_engine.dispose()
+
+
+@pytest.fixture(scope="function")
+def pg_db(pg_engine):
+    connection = pg_engine.connect()
+    transaction = connection.begin()
+    session = TestingSessionLocal(bind=connection)
+    try:
+        yield session
+    finally:
+        session.close()
+        if transaction.is_active:
+            transaction.rollback()
+        connection.close()
+        invalidate_reference_caches()
@@ -0,0 +1,178 @@
+"""Test the async engine, sessions and model writes on in-memory SQLite"""
+
+from datetime import date, timedelta
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from db.base import Base
+from db.engine import (
+    async_unit_of_work,
+    async_url,
+    build_async_engine,
+    pool_stats,
+)
+from ingest.fetcher import Page
+from ingest.pipeline import async_db_writer, run_pipeline
+from ingest.sources import bulletin_request
+from models.enums import CountryEnum
+from models.stocks import Company, Equity
+from models.trading import EquityEODPrice, TradingDay
+
+START = date(2024, 1, 1)
+
+
+@pytest_asyncio.fixture
+async def async_factory():
+    engine = build_async_engine("sqlite:///:memory:")
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+    yield async_sessionmaker(engine, autoflush=False, expire_on_commit=False)
+    await engine.dispose()
+
+
+@pytest_asyncio.fixture
+async def async_db(async_factory):
+    async with async_factory() as session:
+        yield session
+
+
+@pytest_asyncio.fixture
+async def equity(async_db):
+    company = await Company.acreate(
+        async_db, company_name="Async", country=CountryEnum.SENEGAL
+    )
+    equity = await Equity.acreate(
+        async_db, company_id=company.company_id, ticker="ASYN", isin="SN0000000009"
+    )
+    await TradingDay.abulk_create(
+        async_db, [{"trading_date": START + timedelta(days=i)} for i in range(5)]
+    )
+    return equity
+
+
+def rows(equity_id, days, close=105.0):
+    return [
+        {
+            "equity_id": equity_id,
+            "trading_date": START + timedelta(days=i),
+            "open_price": 100.0,
+            "high_price": 110.0,
+            "low_price": 95.0,
+            "close_price": close,
+            "volume": 1000,
+        }
+        for i in range(days)
+    ]
+
+
+def test_async_url_switches_driver():
+    assert async_url("sqlite:///:memory:").drivername == "sqlite+aiosqlite"
+    url = async_url("postgresql+psycopg2://u:p@db:5432/brvm")
+    assert url.drivername == "postgresql+asyncpg"
+    assert (url.password, url.host, url.database) == ("p", "db", "brvm")
+    with pytest.raises(ValueError):
+        async_url("mysql://db/brvm")
+
+
+@pytest.mark.asyncio
+async def test_async_pool_metrics(tmp_path):
+    engine = build_async_engine(f"sqlite:///{tmp_path / 'pool.db'}", pool_size=2)
+    try:
+        async with engine.connect() as first, engine.connect() as second:
+            await first.execute(select(1))
+            await second.execute(select(1))
+            assert pool_stats(engine)["checked_out"] == 2
+    finally:
+        await engine.dispose()
+
+    stats = pool_stats(engine)
+    assert stats["checkouts"] == 2
+    assert stats["capacity"] == 12
+    assert stats["checked_out"] == 0
+
+
+@pytest.mark.asyncio
+async def test_acreate_validates_like_create(async_db, equity):
+    assert equity.equity_id is not None
+    with pytest.raises(ValueError, match="Ticker already exists"):
+        await Equity.acreate(
+            async_db, company_id=equity.company_id, ticker="ASYN", isin="X"
+        )
+
+
+@pytest.mark.asyncio
+async def test_async_bulk_create_and_upsert(async_db, equity):
+    created = await EquityEODPrice.abulk_create(async_db, rows(equity.equity_id, 3))
+    [result] = await EquityEODPrice.abulk_upsert(
+        async_db, rows(equity.equity_id, 5, close=120.0)
+    )
+
+    assert [r["inserted"] for r in created] == [3]
+    assert (result["inserted"], result["updated"]) == (2, 3)
+    closes = await async_db.scalars(select(EquityEODPrice.close_price))
+    assert list(closes) == [120.0] * 5
+
+
+@pytest.mark.asyncio
+async def test_async_unit_of_work_rolls_back(async_factory, equity):
+    with pytest.raises(RuntimeError):
+        async with async_unit_of_work(async_factory) as db:
+            await EquityEODPrice.abulk_create(db, rows(equity.equity_id, 1))
+            db.add(TradingDay(trading_date=date(2030, 1, 1)))
+            await db.flush()
+            raise RuntimeError("boom")
+
+    async with async_factory() as db:
+        days = await db.scalar(select(func.count()).select_from(TradingDay))
+        prices = await db.scalar(select(func.count()).select_from(EquityEODPrice))
+    # the batch bulk_create committed is rolled back with the rest
+    assert (days, prices) == (5, 0)
+
+
+@pytest.mark.asyncio
+async def test_async_unit_of_work_commits(async_factory, equity):
+    async with async_unit_of_work(async_factory) as db:
+        await EquityEODPrice.abulk_create(db, rows(equity.equity_id, 2))
+        db.add(TradingDay(trading_date=date(2030, 1, 1)))
+
+    async with async_factory() as db:
+        days = await db.scalar(select(func.count()).select_from(TradingDay))
+        prices = await db.scalar(select(func.count()).select_from(EquityEODPrice))
+    assert (days, prices) == (6, 2)
+
+
+class _StaticFetcher:
+    concurrency = 2
+
+    def __init__(self, content):
+        self.content = content
+
+    async def fetch(self, request):
+        return Page(request, 200, self.content, None)
+
+
+@pytest.mark.asyncio
+async def test_pipeline_writes_through_async_session(async_db, equity):
+    requests = [bulletin_request(START + timedelta(days=i)) for i in range(5)]
+
+    def parse(page):
+        yield {
+            "equity_id": equity.equity_id,
+            "trading_date": page.request.trading_date,
+            "close_price": 100.0,
+        }
+
+    stats = await run_pipeline(
+        requests,
+        _StaticFetcher(b""),
+        parse,
+        async_db_writer(async_db, EquityEODPrice),
+        batch_size=2,
+    )
+
+    assert stats["rows"] == 5
+    count = await async_db.scalar(select(func.count()).select_from(EquityEODPrice))
+    assert count == 5
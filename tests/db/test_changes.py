@@ -0,0 +1,119 @@
+"""Test the change feed: payloads, the outbox fallback and NOTIFY"""
+
+import time
+from datetime import date, timedelta
+
+from sqlalchemy.orm import Session
+
+from db.changes import (
+    PAYLOAD_LIMIT,
+    Change,
+    ChangeFeed,
+    decode,
+    encode,
+    merge_changes,
+    prune_changes,
+    publish_changes,
+)
+from models.changes import PriceChangeBatch
+from models.enums import ChangeOperationEnum
+from models.trading import EquityEODPrice
+
+DAY = date(2024, 1, 2)
+INSERT, UPDATE = ChangeOperationEnum.INSERT, ChangeOperationEnum.UPDATE
+
+
+def test_payloads_round_trip_and_split():
+    changes = [
+        Change("equity_eod_prices", n, DAY + timedelta(days=n), INSERT)
+        for n in range(1000)
+    ] + [Change("equity_residual_quantities", 1, DAY, UPDATE)]
+
+    payloads = encode(changes)
+
+    assert len(payloads) > 2
+    assert all(len(payload) <= PAYLOAD_LIMIT for payload in payloads)
+    assert [change for payload in payloads for change in decode(payload)] == changes
+
+
+def test_merge_keeps_one_change_per_row():
+    changes = [
+        Change("equity_eod_prices", 1, DAY, UPDATE),
+        Change("equity_eod_prices", 2, DAY, INSERT),
+        Change("equity_eod_prices", 2, DAY, UPDATE),
+        Change("equity_eod_prices", 1, DAY, INSERT),
+        Change("equity_residual_quantities", 1, DAY, UPDATE),
+    ]
+
+    assert merge_changes(changes) == [
+        Change("equity_eod_prices", 1, DAY, INSERT),
+        Change("equity_eod_prices", 2, DAY, INSERT),
+        Change("equity_residual_quantities", 1, DAY, UPDATE),
+    ]
+
+
+def test_outbox_feed_batches_new_changes(db, equity):
+    def close(day, price):
+        return {
+            "equity_id": equity.equity_id, "trading_date": day, "close_price": price
+        }
+
+    EquityEODPrice.bulk_upsert(db, [close(DAY, 100.0)])
+    feed = ChangeFeed(db.connection(), tables=["equity_eod_prices"], linger=0)
+    assert feed.poll(timeout=0) == []
+
+    EquityEODPrice.bulk_upsert(
+        db, [close(DAY, 101.0), close(DAY + timedelta(days=1), 102.0)]
+    )
+    # unchanged rows aren't published
+    EquityEODPrice.bulk_upsert(db, [close(DAY, 101.0)])
+    publish_changes(db, "equity_residual_quantities", [(equity.equity_id, DAY, True)])
+
+    assert feed.poll(timeout=0) == [
+        Change("equity_eod_prices", equity.equity_id, DAY, UPDATE),
+        Change("equity_eod_prices", equity.equity_id, DAY + timedelta(days=1), INSERT),
+    ]
+    assert feed.poll(timeout=0) == []
+    assert db.query(PriceChangeBatch).count() == 3
+
+
+def test_create_publishes_the_new_row(db, equity):
+    feed = ChangeFeed(db.connection(), linger=0)
+
+    EquityEODPrice.create(
+        db, equity_id=equity.equity_id, trading_date=DAY, close_price=100.0
+    )
+
+    assert feed.poll(timeout=0) == [
+        Change("equity_eod_prices", equity.equity_id, DAY, INSERT)
+    ]
+
+
+def test_prune_uses_the_database_clock(db, monkeypatch):
+    publish_changes(db, "equity_eod_prices", [(1, DAY, True)])
+    # a local clock ahead of the UTC stamps SQLite writes
+    monkeypatch.setenv("TZ", "Etc/GMT-9")
+    time.tzset()
+    try:
+        assert prune_changes(db, older_than=timedelta(hours=1)) == 0
+    finally:
+        monkeypatch.undo()
+        time.tzset()
+    assert db.query(PriceChangeBatch).count() == 1
+
+
+def test_notify_feed_delivers_on_commit(pg_engine):
+    with ChangeFeed(pg_engine, linger=0.1) as feed, Session(pg_engine) as session:
+        publish_changes(session, "equity_eod_prices", [(1, DAY, False)])
+        session.rollback()
+        assert feed.poll(timeout=0.2) == []
+
+        publish_changes(session, "equity_eod_prices", [(1, DAY, True), (2, DAY, True)])
+        session.commit()
+        publish_changes(session, "equity_eod_prices", [(1, DAY, False)])
+        session.commit()
+
+        assert feed.poll(timeout=5) == [
+            Change("equity_eod_prices", 1, DAY, INSERT),
+            Change("equity_eod_prices", 2, DAY, INSERT),
+        ]
@@ -0,0 +1,116 @@
+"""Test statement instrumentation, N+1 warnings and export"""
+
+import logging
+from datetime import date, timedelta
+
+import pytest
+
+from db.instrument import (
+    assert_max_statements,
+    instrument,
+    log_stats,
+    operation,
+    prometheus_text,
+    reset,
+    snapshot,
+)
+from models.stocks import Equity
+from models.trading import EquityEODPrice, TradingDay
+
+START = date(2024, 1, 1)
+
+
+@pytest.fixture
+def bind(db):
+    reset()
+    yield instrument(db.get_bind())
+    reset()
+
+
+def add_equities(db, company, count):
+    return [
+        Equity.create(
+            db, company_id=company.company_id, ticker=f"N{i:02}", isin=f"NP{i:010}"
+        )
+        for i in range(count)
+    ]
+
+
+def test_equity_create_statement_count(db, bind, company):
+    company_id = company.company_id
+    # the reference cache loads companies and equities, the insert and the refresh
+    with assert_max_statements(4):
+        Equity.create(db, company_id=company_id, ticker="ONE", isin="X1")
+    # then only the equities the insert invalidated are reloaded
+    with assert_max_statements(3):
+        Equity.create(db, company_id=company_id, ticker="TWO", isin="X2")
+
+    with pytest.raises(AssertionError, match="3 statements executed, expected at most 2"):
+        with assert_max_statements(2):
+            Equity.create(db, company_id=company_id, ticker="THREE", isin="X3")
+
+
+def test_operations_accumulate_totals(db, bind, company):
+    add_equities(db, company, 3)
+    with operation("report") as scope:
+        db.query(Equity).all()
+
+    totals = snapshot()
+    assert totals["Equity.create"]["calls"] == 3
+    assert totals["Equity.create"]["statements"] == 4 + 3 + 3
+    assert totals["report"]["statements"] == scope.count == 1
+    assert totals["report"]["seconds"] > 0
+
+
+def test_lazy_loading_in_a_loop_warns(db, bind, company, caplog):
+    add_equities(db, company, 12)
+    db.expire_all()
+
+    with caplog.at_level(logging.WARNING, logger="db.instrument"):
+        with operation("price report"):
+            for equity in db.query(Equity):
+                equity.eod_prices
+
+    [record] = caplog.records
+    assert "Possible N+1 in price report: 12 identical statements" in record.message
+    assert record.operation == "price report"
+    assert snapshot()["price report"]["n_plus_one"] == 1
+
+
+def test_batched_writes_do_not_warn(db, bind, equity, caplog):
+    days = [START + timedelta(days=i) for i in range(30)]
+    TradingDay.bulk_create(db, [{"trading_date": day} for day in days])
+    rows = [
+        {"equity_id": equity.equity_id, "trading_date": day, "close_price": 1.0}
+        for day in days
+    ]
+
+    with caplog.at_level(logging.WARNING, logger="db.instrument"):
+        EquityEODPrice.bulk_upsert(db, rows, batch_size=2)
+
+    assert caplog.records == []
+    assert snapshot()["EquityEODPrice.bulk_upsert"]["statements"] >= 30
+
+
+def test_export_formats(db, bind, company, caplog):
+    add_equities(db, company, 1)
+
+    text = prometheus_text()
+    assert "# TYPE brvm_db_operation_statements_total counter" in text
+    assert 'brvm_db_operation_statements_total{operation="Equity.create"} 4' in text
+
+    with caplog.at_level(logging.INFO, logger="db.instrument"):
+        log_stats()
+    assert any('"operation": "Equity.create"' in r.message for r in caplog.records)
+
+
+def test_scopes_keep_counts_not_statements(db, bind, company):
+    with operation("report") as scope:
+        for _ in range(3):
+            db.query(Equity).all()
+    assert (scope.count, scope.sample) == (3, [])
+
+    with pytest.raises(AssertionError, match=r"(?s)24\. .*\.\.\. 6 more"):
+        with assert_max_statements(4):
+            for _ in range(30):
+                db.query(Equity).all()
@@ -0,0 +1,102 @@
+"""Test yearly range partitions of the price tables"""
+
+from datetime import date
+
+from sqlalchemy import select, text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.schema import CreateTable
+
+from db.partitions import (
+    create_next_year_partitions,
+    create_year_partition,
+    is_partition_name,
+    partitioned_tables,
+)
+from models.enums import CountryEnum
+from models.stocks import Company, Equity
+from models.trading import EquityEODPrice, EquityResidualQuantity, TradingDay
+
+
+def test_price_tables_are_partitioned():
+    assert partitioned_tables() == [
+        EquityEODPrice.__table__,
+        EquityResidualQuantity.__table__,
+    ]
+
+
+def test_postgres_ddl_partitions_by_trading_date():
+    ddl = str(CreateTable(EquityEODPrice.__table__).compile(dialect=postgresql.dialect()))
+
+    assert "PARTITION BY RANGE (trading_date)" in ddl
+    assert "PRIMARY KEY (eod_price_id, trading_date)" in ddl
+    # the model itself keeps the surrogate key
+    assert list(EquityEODPrice.__table__.primary_key.columns.keys()) == ["eod_price_id"]
+
+
+def test_partition_names():
+    assert is_partition_name("equity_eod_prices_2024")
+    assert is_partition_name("equity_residual_quantities_default")
+    assert not is_partition_name("equity_eod_prices")
+    assert not is_partition_name("equity_daily_metrics_2024")
+
+
+def test_sqlite_keeps_plain_tables(db, equity):
+    assert create_year_partition(db.connection(), EquityEODPrice.__table__, 2024) is False
+    assert create_next_year_partitions(db) == []
+
+    price = EquityEODPrice.create(
+        db, equity_id=equity.equity_id, trading_date=date(2024, 1, 2), close_price=1.0
+    )
+    assert price.eod_price_id is not None
+
+
+def _partition_of(pg_db, trading_date):
+    return pg_db.execute(
+        text(
+            "SELECT tableoid::regclass::text FROM equity_eod_prices "
+            "WHERE trading_date = :day"
+        ),
+        {"day": trading_date},
+    ).scalar()
+
+
+def test_postgres_partition_moves_default_rows(pg_db):
+    company = Company.create(pg_db, company_name="Partition", country=CountryEnum.MALI)
+    equity = Equity.create(
+        pg_db, company_id=company.company_id, ticker="PART", isin="ML0000000001"
+    )
+    days = [date(2023, 6, 1), date(2024, 6, 3)]
+    TradingDay.bulk_create(pg_db, [{"trading_date": day} for day in days])
+    EquityEODPrice.bulk_create(
+        pg_db,
+        [
+            {"equity_id": equity.equity_id, "trading_date": day, "close_price": 1.0}
+            for day in days
+        ],
+    )
+    assert _partition_of(pg_db, days[1]) == "equity_eod_prices_default"
+
+    created = create_next_year_partitions(pg_db, today=date(2023, 3, 1))
+
+    assert created == [
+        "equity_eod_prices_2023",
+        "equity_eod_prices_2024",
+        "equity_residual_quantities_2023",
+        "equity_residual_quantities_2024",
+    ]
+    assert _partition_of(pg_db, days[0]) == "equity_eod_prices_2023"
+    assert _partition_of(pg_db, days[1]) == "equity_eod_prices_2024"
+    assert create_next_year_partitions(pg_db, today=date(2023, 3, 1)) == []
+
+
+def test_postgres_cross_section_prunes_partitions(pg_db):
+    create_next_year_partitions(pg_db, today=date(2023, 3, 1))
+    stmt = select(EquityEODPrice.close_price).where(
+        EquityEODPrice.trading_date == date(2024, 6, 3)
+    )
+    sql = stmt.compile(dialect=pg_db.get_bind().dialect, compile_kwargs={"literal_binds": True})
+    plan = "\n".join(pg_db.execute(text(f"EXPLAIN {sql}")).scalars())
+
+    assert "equity_eod_prices_2024" in plan
+    assert "equity_eod_prices_2023" not in plan
+    assert "equity_eod_prices_default" not in plan
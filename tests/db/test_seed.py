@@ -0,0 +1,138 @@
+"""Test workbook seeding"""
+
+from datetime import date, datetime
+
+import pytest
+from sqlalchemy import update
+
+from db.seed import DEFAULT_WORKBOOK, read_listings, seed, seed_listings
+from models.enums import CountryEnum, TradingStatusEnum
+from models.reference import ReferenceCache
+from models.stocks import Company, Equity
+
+openpyxl = pytest.importorskip("openpyxl")
+
+HEADER = ("company_name", "Country", "ticker", "ISIN", "listing_date", "trading_status")
+
+
+def write_workbook(path, rows, header=HEADER):
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    sheet.title = "Listings"
+    sheet.append(["BRVM listings"])
+    sheet.append([])
+    sheet.append(header)
+    for row in rows:
+        sheet.append(row)
+    workbook.save(path)
+    return path
+
+
+LISTINGS = [
+    ("Sonatel", "Sénégal", "SNTS", "SN0000000019", datetime(1998, 10, 2), "Active"),
+    ("Orange Côte d'Ivoire", "Cote d’Ivoire", "ORAC", "CI0000000956", None, None),
+    ("Ecobank", "Togo", "ETIT", "TG0000000132", "2006-09-13", "suspended"),
+    ("Ecobank", "Togo", "ETIX", "TG0000000140", None, None),
+]
+
+
+def test_read_listings_maps_french_countries(tmp_path):
+    rows = read_listings(write_workbook(tmp_path / "seed.xlsx", LISTINGS))
+
+    assert [row.ticker for row in rows] == ["SNTS", "ORAC", "ETIT", "ETIX"]
+    assert rows[0].country == CountryEnum.SENEGAL
+    assert rows[0].listing_date == date(1998, 10, 2)
+    assert rows[1].country == CountryEnum.COTE_D_IVOIRE
+    assert rows[2].trading_status == TradingStatusEnum.SUSPENDED
+    assert rows[2].listing_date == date(2006, 9, 13)
+
+
+def test_read_listings_reports_every_problem(tmp_path):
+    path = write_workbook(
+        tmp_path / "bad.xlsx",
+        [
+            ("Sonatel", "Sénégal", "SNTS", "SN0000000019", None, None),
+            ("Other", "Ghana", "SNTS", "SN0000000019", None, None),
+            ("Third", "Mali", None, "BAD", None, None),
+        ],
+    )
+
+    with pytest.raises(ValueError) as error:
+        read_listings(path)
+
+    message = str(error.value)
+    assert "unknown country 'Ghana'" in message
+    assert "Listings!6: ticker is required" in message
+    assert "malformed ISIN 'BAD'" in message
+
+
+def test_read_listings_rejects_duplicates(tmp_path):
+    path = write_workbook(
+        tmp_path / "dupes.xlsx",
+        [
+            ("Sonatel", "Sénégal", "SNTS", "SN0000000019", None, None),
+            ("Sonatel", "Mali", "snts", "SN0000000027", None, None),
+        ],
+    )
+
+    with pytest.raises(ValueError) as error:
+        read_listings(path)
+
+    assert "duplicate ticker 'SNTS' (see Listings!4)" in str(error.value)
+    assert "company 'Sonatel' conflicts with Listings!4" in str(error.value)
+
+
+def test_shipped_workbook_has_no_listings():
+    assert read_listings(DEFAULT_WORKBOOK) == []
+
+
+def test_seed_is_idempotent(db, tmp_path):
+    path = write_workbook(tmp_path / "seed.xlsx", LISTINGS)
+
+    first = seed(db, path)
+    second = seed(db, path)
+
+    assert first["rows"] == 4
+    assert first["companies"] == second["companies"] == 3
+    assert first["equities"] == second["equities"] == 4
+    assert db.query(Company).count() == 3
+    assert db.query(Equity).count() == 4
+
+    ecobank = db.query(Company).filter_by(company_name="Ecobank").one()
+    assert sorted(e.ticker for e in ecobank.equities) == ["ETIT", "ETIX"]
+
+
+def test_reseed_keeps_updated_at_and_refreshes_caches(db, tmp_path):
+    path = write_workbook(tmp_path / "seed.xlsx", LISTINGS)
+    seed(db, path)
+    stamp = datetime(2020, 1, 1)
+    for model in (Company, Equity):
+        db.execute(update(model).values(updated_at=stamp))
+    cache = ReferenceCache()
+    assert cache.equity_by_ticker(db, "NEWT") is None
+
+    seed(db, path)
+    listed = LISTINGS + [("Sonatel", "Sénégal", "NEWT", "SN0000000027", None, None)]
+    changed = seed(db, write_workbook(tmp_path / "new.xlsx", listed))
+
+    assert changed["equities"] == 5
+    kept = db.query(Equity).filter(Equity.ticker != "NEWT")
+    assert {equity.updated_at for equity in kept} == {stamp}
+    assert {company.updated_at for company in db.query(Company)} == {stamp}
+    assert cache.equity_by_ticker(db, "NEWT") is not None
+
+
+def test_seed_updates_existing_equity(db, tmp_path, equity):
+    rows = read_listings(
+        write_workbook(
+            tmp_path / "seed.xlsx",
+            [("Test company", "Côte d'Ivoire", "SGBC", "CI0000000002", None, "Delisted")],
+        )
+    )
+
+    stats = seed_listings(db, rows)
+
+    assert stats == {"companies": 1, "equities": 1}
+    db.refresh(equity)
+    assert equity.trading_status == TradingStatusEnum.DELISTED
+    assert db.query(Company).count() == 1
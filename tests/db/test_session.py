@@ -0,0 +1,174 @@
+"""Test engine construction, pool metrics and lazy session setup"""
+
+import os
+import subprocess
+import sys
+
+import pytest
+from sqlalchemy import exc, text
+from sqlalchemy.orm import sessionmaker
+
+import db.session
+from config.settings import get_settings
+from db.engine import TimedQueuePool, build_engine, pool_stats, unit_of_work
+
+@pytest.fixture
+def file_engine(tmp_path):
+    engine = build_engine(
+        f"sqlite:///{tmp_path / 'pool.db'}",
+        pool_size=2,
+        max_overflow=1,
+        pool_timeout=0.05,
+    )
+    yield engine
+    engine.dispose()
+
+
+def test_build_engine_sizes_pool(file_engine):
+    assert isinstance(file_engine.pool, TimedQueuePool)
+    assert file_engine.pool.size() == 2
+    assert file_engine.pool._max_overflow == 1
+
+
+def test_memory_sqlite_has_no_pool_metrics():
+    engine = build_engine("sqlite:///:memory:", pool_size=2)
+    assert pool_stats(engine) is None
+
+
+def test_pool_stats_track_checkouts_and_timeouts(file_engine):
+    connections = [file_engine.connect() for _ in range(3)]
+    stats = pool_stats(file_engine)
+    assert stats["checkouts"] == 3
+    assert stats["checked_out"] == 3
+    assert stats["capacity"] == 3
+    assert stats["utilization"] == 1.0
+
+    # the pool is exhausted, the next checkout times out
+    with pytest.raises(exc.TimeoutError):
+        file_engine.connect()
+    assert pool_stats(file_engine)["timeouts"] == 1
+
+    for connection in connections:
+        connection.close()
+    stats = pool_stats(file_engine)
+    assert stats["checked_out"] == 0
+    assert stats["peak_checked_out"] == 3
+    assert stats["wait_max"] >= stats["wait_mean"] > 0
+
+
+def test_pool_stats_survive_dispose(file_engine):
+    file_engine.connect().close()
+    file_engine.dispose()
+    file_engine.connect().close()
+    assert pool_stats(file_engine)["checkouts"] == 2
+
+
+def test_server_side_cursors_stream_results(tmp_path):
+    engine = build_engine(f"sqlite:///{tmp_path / 'ss.db'}", server_side_cursors=True)
+    assert engine.get_execution_options()["stream_results"] is True
+    engine.dispose()
+
+
+def test_unit_of_work_commits_and_rolls_back(file_engine):
+    factory = sessionmaker(bind=file_engine)
+    with unit_of_work(factory) as db:
+        db.execute(text("CREATE TABLE items (name TEXT)"))
+        db.execute(text("INSERT INTO items VALUES ('kept')"))
+
+    with pytest.raises(RuntimeError):
+        with unit_of_work(factory) as db:
+            db.execute(text("INSERT INTO items VALUES ('dropped')"))
+            raise RuntimeError("boom")
+
+    with unit_of_work(factory) as db:
+        names = db.execute(text("SELECT name FROM items")).scalars().all()
+    assert names == ["kept"]
+    assert pool_stats(file_engine)["checked_out"] == 0
+
+
+def test_postgres_session_options(pg_engine):
+    engine = build_engine(
+        pg_engine.url.render_as_string(hide_password=False),
+        statement_timeout=1500,
+        read_only=True,
+    )
+    try:
+        with engine.connect() as connection:
+            timeout = connection.execute(text("SHOW statement_timeout")).scalar()
+            read_only = connection.execute(
+                text("SHOW default_transaction_read_only")
+            ).scalar()
+            with pytest.raises(exc.InternalError):
+                connection.execute(text("CREATE TEMP TABLE t (x int)"))
+    finally:
+        engine.dispose()
+    assert timeout == "1500ms"
+    assert read_only == "on"
+
+
+@pytest.fixture
+def lazy_session(tmp_path, monkeypatch):
+    """db.session configured for a SQLite file, rebuilt from scratch."""
+    monkeypatch.setenv("ENV", "test")
+    monkeypatch.setenv("SQLITE_TEST_DATABASE_URI", f"sqlite:///{tmp_path / 'lazy.db'}")
+    for name in ("HOST", "PORT", "USER", "PASSWORD", "DB"):
+        monkeypatch.setenv(f"POSTGRES_{name}", "1")
+    get_settings.cache_clear()
+    db.session._built.clear()
+    yield db.session
+    db.session.dispose_engines()
+    db.session._built.clear()
+    get_settings.cache_clear()
+
+
+def test_session_import_reads_no_settings():
+    env = {
+        name: value for name, value in os.environ.items()
+        if not name.startswith("POSTGRES_")
+    }
+    check = (
+        "import sys, db.session; "
+        "assert 'config.settings' not in sys.modules; "
+        "assert 'sqlalchemy.ext.asyncio' not in sys.modules"
+    )
+    result = subprocess.run([sys.executable, "-c", check], env=env, capture_output=True)
+    assert result.returncode == 0, result.stderr.decode()
+
+
+def test_engine_built_on_first_use(lazy_session):
+    assert "engine" not in lazy_session._built
+
+    with lazy_session.session_scope() as session:
+        assert session.execute(text("SELECT 1")).scalar() == 1
+
+    assert lazy_session.engine is lazy_session._built["engine"]
+    assert lazy_session.read_engine is lazy_session.engine
+    lazy_session.dispose_engines()
+    assert "engine" not in lazy_session._built
+
+
+def test_forked_child_gets_its_own_pool(lazy_session):
+    engine = lazy_session.engine
+    with engine.connect() as connection:
+        connection.execute(text("CREATE TABLE items (name TEXT)"))
+        connection.commit()
+    parent_pool = engine.pool
+
+    pid = os.fork()
+    if pid == 0:
+        # child: a fresh pool that still reaches the database
+        try:
+            with lazy_session.SessionLocal() as session:
+                session.execute(text("INSERT INTO items VALUES ('child')"))
+                session.commit()
+            os._exit(0 if engine.pool is not parent_pool else 1)
+        except BaseException:
+            os._exit(2)
+    _, status = os.waitpid(pid, 0)
+
+    assert os.waitstatus_to_exitcode(status) == 0
+    assert engine.pool is parent_pool
+    with engine.connect() as connection:
+        assert connection.execute(text("SELECT name FROM items")).scalars().all() == [
+            "child"
+        ]
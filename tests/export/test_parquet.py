@@ -0,0 +1,80 @@
+"""Test the Parquet export"""
+
+from datetime import date, timedelta
+
+import pytest
+from sqlalchemy import func, select, update
+
+pq = pytest.importorskip("pyarrow.parquet")
+
+from export.parquet import export_dataset, partition_path, read_manifest  # noqa: E402
+from models.stocks import Company, Equity  # noqa: E402
+from models.trading import EquityEODPrice, EquityResidualQuantity  # noqa: E402
+
+
+@pytest.fixture
+def prices(db, equity):
+    start = date(2024, 1, 25)
+    EquityEODPrice.bulk_create(
+        db,
+        [
+            {"equity_id": equity.equity_id, "trading_date": start + timedelta(days=n),
+             "close_price": 100.0 + n, "volume": n}
+            for n in range(10)
+        ],
+    )
+    EquityResidualQuantity.create(
+        db, equity_id=equity.equity_id, trading_date=start, buy_quantity=5,
+        buy_price=99.0,
+    )
+
+
+def test_full_export_partitions_by_month(db, prices, tmp_path):
+    stats = export_dataset(db, tmp_path, batch_size=3)
+
+    assert stats["equity_eod_prices"] == {"rows": 10, "partitions": 2}
+    assert stats["equity_residual_quantities"] == {"rows": 1, "partitions": 1}
+    january = pq.read_table(partition_path(tmp_path, EquityEODPrice, 2024, 1))
+    assert january.num_rows == 7
+    assert january.column("close_price").to_pylist()[0] == 100.0
+    assert january.schema.field("trading_date").type == "date32[day]"
+
+    equities = pq.read_table(tmp_path / "equities" / "part-0.parquet")
+    assert equities.column("ticker").to_pylist() == ["SGBC"]
+    assert equities.column("trading_status").to_pylist() == ["ACTIVE"]
+    assert "last_updated_at" in read_manifest(tmp_path)["tables"]["equity_eod_prices"]
+
+
+def age_rows(db, hours=1):
+    """Stamp every exported row an hour ago, as if the rows were old."""
+    old = db.scalar(select(func.now())) - timedelta(hours=hours)
+    for model in (Company, Equity, EquityEODPrice, EquityResidualQuantity):
+        db.execute(update(model).values(updated_at=old))
+
+
+def test_incremental_export_rewrites_changed_partitions(db, prices, tmp_path):
+    age_rows(db)
+    export_dataset(db, tmp_path)
+    unchanged = export_dataset(db, tmp_path, incremental=True)
+
+    def correct(day, close, stamp):
+        db.execute(
+            update(EquityEODPrice)
+            .where(EquityEODPrice.trading_date == day)
+            .values(close_price=close, updated_at=stamp)
+        )
+
+    stamp = db.scalar(select(func.now()))
+    correct(date(2024, 1, 26), 2.0, stamp)
+    january = export_dataset(db, tmp_path, incremental=True)
+    # a correction stamped in the same second as the previous export
+    correct(date(2024, 2, 2), 1.0, stamp)
+    changed = export_dataset(db, tmp_path, incremental=True)
+
+    assert unchanged["equity_eod_prices"] == {"rows": 0, "partitions": 0}
+    assert unchanged["equities"] == {"rows": 0, "partitions": 0}
+    assert january["equity_eod_prices"] == {"rows": 7, "partitions": 1}
+    # January is within the overlap and written again
+    assert changed["equity_eod_prices"] == {"rows": 10, "partitions": 2}
+    february = pq.read_table(partition_path(tmp_path, EquityEODPrice, 2024, 2))
+    assert 1.0 in february.column("close_price").to_pylist()
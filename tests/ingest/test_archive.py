@@ -0,0 +1,143 @@
+"""Test the raw page archive, conditional requests and offline re-ingestion"""
+
+import pickle
+import threading
+from datetime import date, timedelta
+
+import httpx
+import pytest
+import respx
+
+from ingest.archive import ArchiveFetcher, RawArchive
+from ingest.fetcher import Fetcher, Page
+from ingest.parser import parse_page
+from ingest.pipeline import run_pipeline
+from ingest.sources import bulletin_request, digest_of, requests_for
+
+BASE_URL = "https://brvm.test"
+TRADING_DATE = date(2024, 1, 2)
+ETAG = '"v1"'
+
+BULLETIN = """
+<html><body><table>
+  <tr><th>Symbole</th><th>Volume</th><th>Clôture</th></tr>
+  <tr><td>SGBC</td><td>100</td><td>10 250</td></tr>
+</table></body></html>
+""".encode("utf-8")
+
+
+@pytest.fixture
+def archive(tmp_path):
+    archive = RawArchive(tmp_path / "raw")
+    yield archive
+    archive.close()
+
+
+def test_identical_pages_share_one_blob(archive):
+    first = archive.put(bulletin_request(TRADING_DATE, BASE_URL), BULLETIN)
+    second = archive.put(
+        bulletin_request(TRADING_DATE + timedelta(days=1), BASE_URL), BULLETIN
+    )
+
+    assert first == second
+    assert len(list(archive.root.glob("blobs/*/*.zst"))) == 1
+    assert archive.blob_path(first).stat().st_size < len(BULLETIN)
+    assert archive.read_blob(first) == BULLETIN
+
+
+def test_archive_index_by_url_and_date(archive):
+    request = bulletin_request(TRADING_DATE, BASE_URL)
+    digest = archive.put(request, BULLETIN, etag=ETAG)
+
+    entry = archive.lookup(request.url)
+    assert entry.request == request
+    assert (entry.digest, entry.etag, entry.size) == (digest, ETAG, len(BULLETIN))
+    assert archive.lookup(f"{BASE_URL}/missing") is None
+    assert list(archive.entries(TRADING_DATE, TRADING_DATE)) == [entry]
+    assert list(archive.entries(TRADING_DATE, TRADING_DATE, kinds=["quotes"])) == []
+
+
+def test_archive_reopens_after_pickling(archive):
+    archive.put(bulletin_request(TRADING_DATE, BASE_URL), BULLETIN)
+
+    copy = pickle.loads(pickle.dumps(archive))
+
+    assert copy.lookup(bulletin_request(TRADING_DATE, BASE_URL).url) is not None
+    copy.close()
+
+
+@pytest.mark.asyncio
+async def test_fetch_archives_and_revalidates(archive):
+    request = bulletin_request(TRADING_DATE, BASE_URL)
+    with respx.mock(base_url=BASE_URL) as router:
+        route = router.get(path__regex=r".*").mock(
+            side_effect=[
+                httpx.Response(200, content=BULLETIN, headers={"ETag": ETAG}),
+                httpx.Response(304),
+            ]
+        )
+        async with Fetcher(rate_per_host=None, archive=archive) as fetcher:
+            fresh = await fetcher.fetch(request)
+            cached = await fetcher.fetch(request)
+
+    assert "If-None-Match" not in route.calls[0].request.headers
+    assert route.calls[1].request.headers["If-None-Match"] == ETAG
+    assert fresh.digest == cached.digest == archive.lookup(request.url).digest
+    assert cached.status_code == 304
+    assert cached.content == BULLETIN
+
+
+@pytest.mark.asyncio
+async def test_archive_calls_run_off_the_event_loop(archive, monkeypatch):
+    threads = []
+    for name in ("lookup", "put"):
+        method = getattr(archive, name)
+
+        def record(*args, _method=method, **kwargs):
+            threads.append(threading.current_thread().name)
+            return _method(*args, **kwargs)
+
+        monkeypatch.setattr(archive, name, record)
+
+    with respx.mock(base_url=BASE_URL) as router:
+        router.get(path__regex=r".*").mock(
+            return_value=httpx.Response(200, content=BULLETIN)
+        )
+        async with Fetcher(rate_per_host=None, archive=archive) as fetcher:
+            await fetcher.fetch(bulletin_request(TRADING_DATE, BASE_URL))
+
+    assert len(threads) == 2
+    assert all(name.startswith("raw-archive") for name in threads)
+
+
+def test_rows_reference_the_archived_blob(archive):
+    request = bulletin_request(TRADING_DATE, BASE_URL)
+    digest = archive.put(request, BULLETIN)
+    page = archive.lookup(request.url)
+
+    [row] = parse_page(Page(request, 200, BULLETIN, page.fetched_at, digest))
+
+    assert digest_of(row.data_source) == page.digest
+    assert archive.read_source(row.data_source) == BULLETIN
+
+
+@pytest.mark.asyncio
+async def test_offline_reingest_needs_no_network(archive):
+    days = [TRADING_DATE, TRADING_DATE + timedelta(days=1)]
+    archive.put(bulletin_request(days[0], BASE_URL), BULLETIN)
+    rows = []
+
+    # respx fails any request that reaches the network
+    with respx.mock(assert_all_called=False):
+        async with ArchiveFetcher(archive) as fetcher:
+            stats = await run_pipeline(
+                requests_for(days, base_url=BASE_URL),
+                fetcher,
+                parse_page,
+                rows.extend,
+            )
+
+    assert stats["pages"] == 1
+    assert stats["failed"] == 3
+    assert [row.ticker for row in rows] == ["SGBC"]
+    assert digest_of(rows[0].data_source) is not None
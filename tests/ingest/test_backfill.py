@@ -0,0 +1,187 @@
+"""Test the COPY / batched-insert backfill writer"""
+
+from datetime import date, datetime, timedelta
+
+import pytest
+from sqlalchemy import select
+
+from ingest.backfill import backfill
+from models.enums import CountryEnum
+from models.stocks import Company, Equity
+from models.trading import (
+    EquityEODPrice,
+    EquityEODPriceRevision,
+    EquityResidualQuantity,
+    TradingDay,
+)
+
+START = date(2024, 1, 1)
+
+
+@pytest.fixture(params=["db", "pg_db"])
+def session(request):
+    """Run each test on SQLite and, when configured, on PostgreSQL."""
+    return request.getfixturevalue(request.param)
+
+
+@pytest.fixture
+def equity_id(session):
+    company = Company.create(
+        session, company_name="Backfill", country=CountryEnum.SENEGAL
+    )
+    equity = Equity.create(
+        session, company_id=company.company_id, ticker="BKFL", isin="SN0000000001"
+    )
+    TradingDay.bulk_create(
+        session, [{"trading_date": START + timedelta(days=i)} for i in range(10)]
+    )
+    return equity.equity_id
+
+
+def eod_rows(equity_id, days, close=105.0):
+    return [
+        {
+            "equity_id": equity_id,
+            "trading_date": START + timedelta(days=i),
+            "open_price": 100.0,
+            "high_price": 110.0,
+            "low_price": 95.0,
+            "close_price": close,
+            "volume": 1000,
+            "traded_value": 105000.0,
+            "data_source": "Official, reconstructed",
+        }
+        for i in range(days)
+    ]
+
+
+def test_backfill_inserts_then_updates(session, equity_id):
+    first = backfill(session, EquityEODPrice, eod_rows(equity_id, 5), chunk_size=2)
+    second = backfill(
+        session, EquityEODPrice, eod_rows(equity_id, 8, close=120.0), chunk_size=3
+    )
+
+    expected = "copy" if session.get_bind().dialect.name == "postgresql" else "insert"
+    assert first["method"] == expected
+    assert (first["inserted"], first["updated"]) == (5, 0)
+    assert (second["inserted"], second["updated"], second["unchanged"]) == (3, 5, 0)
+
+    prices = session.query(EquityEODPrice).order_by(EquityEODPrice.trading_date).all()
+    assert [p.close_price for p in prices] == [120.0] * 8
+    assert all(p.full_data_flag for p in prices)
+    assert prices[0].data_source == "Official, reconstructed"
+
+
+def test_backfill_skips_unchanged_rows(session, equity_id):
+    backfill(session, EquityEODPrice, eod_rows(equity_id, 5))
+    stale = datetime(2000, 1, 1)
+    session.query(EquityEODPrice).update({"updated_at": stale})
+    rows = eod_rows(equity_id, 6)
+    rows[1]["close_price"] = 120.0
+    # provenance alone is not a change
+    rows[2]["data_source"] = "sha256:0123"
+
+    stats = backfill(session, EquityEODPrice, rows, chunk_size=4)
+
+    assert (stats["inserted"], stats["updated"], stats["unchanged"]) == (1, 1, 4)
+    touched = session.scalars(
+        select(EquityEODPrice.trading_date).where(EquityEODPrice.updated_at > stale)
+    ).all()
+    assert sorted(touched) == [START + timedelta(days=1), START + timedelta(days=5)]
+
+
+def test_backfill_keeps_replaced_versions(session, equity_id):
+    backfill(session, EquityEODPrice, eod_rows(equity_id, 3))
+    stale = datetime(2000, 1, 1)
+    session.query(EquityEODPrice).update({"created_at": stale, "updated_at": stale})
+    rows = eod_rows(equity_id, 3)
+    rows[1]["close_price"] = 120.0
+
+    backfill(session, EquityEODPrice, rows, chunk_size=2)
+
+    (revision,) = session.query(EquityEODPriceRevision).all()
+    assert revision.trading_date == START + timedelta(days=1)
+    assert (revision.close_price, revision.valid_from) == (105.0, stale)
+    current = session.query(EquityEODPrice).filter_by(
+        trading_date=revision.trading_date
+    )
+    assert current.one().updated_at == revision.valid_to
+
+
+def test_backfill_without_update_keeps_existing(session, equity_id):
+    backfill(session, EquityEODPrice, eod_rows(equity_id, 3))
+    stats = backfill(
+        session, EquityEODPrice, eod_rows(equity_id, 4, close=1.0), update=False
+    )
+
+    assert (stats["inserted"], stats["conflicts"]) == (1, 3)
+    closes = [p.close_price for p in session.query(EquityEODPrice)]
+    assert sorted(closes) == [1.0, 105.0, 105.0, 105.0]
+
+
+def test_backfill_skips_invalid_and_keeps_last_duplicate(session, equity_id):
+    rows = eod_rows(equity_id, 3)
+    rows.append({**rows[0], "close_price": 99.0, "volume": None})
+    rows.append({"equity_id": equity_id, "trading_date": None, "close_price": 1.0})
+
+    stats = backfill(session, EquityEODPrice, rows, chunk_size=10)
+
+    assert stats["rows"] == 5
+    assert stats["skipped"] == 2
+    assert stats["inserted"] == 3
+    first = session.query(EquityEODPrice).filter_by(trading_date=START).one()
+    assert first.close_price == 99.0
+    assert first.full_data_flag is False
+
+
+def test_backfill_residual_quantities(session, equity_id):
+    rows = [
+        {
+            "equity_id": equity_id,
+            "trading_date": START + timedelta(days=i),
+            "buy_price": 100.0,
+            "buy_quantity": 10 * i,
+            "sell_price": None,
+            "sell_quantity": None,
+        }
+        for i in range(4)
+    ]
+    # a sell quantity without its price, rejected like create() does
+    rows.append(
+        {**rows[0], "trading_date": START + timedelta(days=5), "sell_quantity": 5}
+    )
+
+    stats = backfill(session, EquityResidualQuantity, rows)
+
+    assert stats["inserted"] == 4
+    assert stats["skipped"] == 1
+    quantities = session.query(EquityResidualQuantity.buy_quantity).all()
+    assert sorted(q for q, in quantities) == [0, 10, 20, 30]
+
+
+def test_backfill_rejects_other_models(db):
+    with pytest.raises(ValueError, match="not supported"):
+        backfill(db, TradingDay, [])
+
+
+def test_backfill_publishes_inserted_and_changed_rows(session, equity_id, monkeypatch):
+    published = []
+    monkeypatch.setattr(
+        "ingest.backfill.publish_changes",
+        lambda db, table, rows: published.append((table, sorted(map(tuple, rows)))),
+    )
+    backfill(session, EquityEODPrice, eod_rows(equity_id, 2))
+    # written before this transaction
+    stale = datetime(2000, 1, 1)
+    session.query(EquityEODPrice).update({"created_at": stale, "updated_at": stale})
+    rows = eod_rows(equity_id, 3)
+    rows[1]["close_price"] = 120.0
+
+    backfill(session, EquityEODPrice, rows)
+    backfill(session, EquityEODPrice, eod_rows(equity_id, 4), publish=False)
+
+    day = [START + timedelta(days=i) for i in range(3)]
+    assert published == [
+        ("equity_eod_prices", [(equity_id, day[0], True), (equity_id, day[1], True)]),
+        ("equity_eod_prices", [(equity_id, day[1], False), (equity_id, day[2], True)]),
+    ]
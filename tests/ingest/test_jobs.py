@@ -0,0 +1,133 @@
+"""Test sharded, resumable backfill jobs against a mocked BRVM site"""
+
+from datetime import date, timedelta
+
+import httpx
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from ingest.jobs import plan_job, run_shard, split_shards
+from ingest.sources import BULLETIN_PATH
+from models.enums import JobStatusEnum
+from models.jobs import BackfillShard
+from models.trading import EquityEODPrice, EquityResidualQuantity, TradingDay
+
+BASE_URL = "https://brvm.test"
+DAYS = [date(2024, 1, 1) + timedelta(days=offset) for offset in range(10)]
+
+BULLETIN = """
+<html><body>
+<table>
+  <tr><th>Symbole</th><th>Volume</th><th>Ouverture</th><th>Plus haut</th>
+      <th>Plus bas</th><th>Clôture</th></tr>
+  <tr><td>SGBC</td><td>100</td><td>10 000</td><td>10 500</td>
+      <td>9 900</td><td>10 250</td></tr>
+  <tr><td>XXXX</td><td>5</td><td>1</td><td>1</td><td>1</td><td>1</td></tr>
+</table>
+<table>
+  <tr><th>Symbole</th><th>Prix achat</th><th>Qté achat</th>
+      <th>Prix vente</th><th>Qté vente</th></tr>
+  <tr><td>SGBC</td><td>10 200</td><td>50</td><td>10 300</td><td>20</td></tr>
+</table>
+</body></html>
+"""
+
+
+@pytest.fixture
+def job_db(db):
+    """Session whose commits and rollbacks stay inside the test transaction."""
+    session = Session(bind=db.bind, join_transaction_mode="create_savepoint")
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def trading_days(job_db, equity):
+    TradingDay.bulk_create(job_db, [{"trading_date": day} for day in DAYS])
+    return DAYS
+
+
+def brvm_site(fail_after=None):
+    """Fetcher options serving one bulletin per day; fails past `fail_after`."""
+    fetched = []
+
+    def respond(request):
+        day = date.fromisoformat(request.url.params["date"])
+        if fail_after and day > fail_after:
+            raise RuntimeError("site went away")
+        if request.url.path != BULLETIN_PATH:
+            return httpx.Response(200, text="<html></html>")
+        fetched.append(day)
+        return httpx.Response(200, text=BULLETIN)
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(respond))
+    options = {"client": client, "rate_per_host": None, "backoff": 0, "max_retries": 0}
+    return options, fetched
+
+
+def count(db, model):
+    return db.scalar(select(func.count()).select_from(model))
+
+
+def test_split_shards_covers_every_day_once():
+    ranges = split_shards(DAYS, 3)
+
+    assert ranges == [
+        (DAYS[0], DAYS[3]),
+        (DAYS[4], DAYS[6]),
+        (DAYS[7], DAYS[9]),
+    ]
+    assert split_shards(DAYS[:2], 5) == [(DAYS[0], DAYS[0]), (DAYS[1], DAYS[1])]
+    with pytest.raises(ValueError):
+        split_shards(DAYS, 0)
+
+
+def test_plan_job_resumes_unfinished_shards(job_db, trading_days):
+    first = plan_job(job_db, "jan", trading_days, 3)
+    job_db.get(BackfillShard, first[0]).status = JobStatusEnum.DONE
+    job_db.commit()
+
+    # a rerun keeps the original shards and skips the finished one
+    assert plan_job(job_db, "jan", trading_days, 5) == first[1:]
+
+
+def test_run_shard_stores_rows_and_checkpoints(job_db, trading_days):
+    [shard_id] = plan_job(job_db, "jan", trading_days, 1)
+    options, fetched = brvm_site()
+
+    stats = run_shard(job_db, shard_id, BASE_URL, step_days=4, fetcher_options=options)
+
+    shard = job_db.get(BackfillShard, shard_id)
+    assert shard.status == JobStatusEnum.DONE
+    assert shard.last_completed_date == DAYS[-1]
+    assert shard.attempts == 1
+    assert stats["days"] == len(DAYS)
+    assert stats["rows"] == shard.rows == 2 * len(DAYS)
+    assert fetched == DAYS
+    assert count(job_db, EquityEODPrice) == len(DAYS)
+    assert count(job_db, EquityResidualQuantity) == len(DAYS)
+
+
+def test_run_shard_resumes_after_a_crash(job_db, trading_days):
+    [shard_id] = plan_job(job_db, "jan", trading_days, 1)
+    options, _ = brvm_site(fail_after=DAYS[3])
+
+    with pytest.raises(ExceptionGroup):
+        run_shard(job_db, shard_id, BASE_URL, step_days=4, fetcher_options=options)
+
+    shard = job_db.get(BackfillShard, shard_id)
+    assert shard.status == JobStatusEnum.FAILED
+    assert "site went away" in shard.error
+    # the first step was stored before the crash
+    assert shard.last_completed_date == DAYS[3]
+    assert count(job_db, EquityEODPrice) == 4
+
+    options, fetched = brvm_site()
+    stats = run_shard(job_db, shard_id, BASE_URL, step_days=4, fetcher_options=options)
+
+    assert shard.status == JobStatusEnum.DONE
+    assert shard.attempts == 2
+    assert fetched == DAYS[4:]
+    assert stats["days"] == 6
+    assert count(job_db, EquityEODPrice) == len(DAYS)
@@ -0,0 +1,126 @@
+"""Test the streaming bulletin parser"""
+
+import tracemalloc
+from datetime import date
+
+import pytest
+
+from ingest.parser import (
+    EODRow,
+    ResidualRow,
+    normalize_header,
+    parse_document,
+    parse_number,
+)
+
+BACKENDS = ["lxml", "html.parser"]
+TRADING_DATE = date(2024, 1, 2)
+
+BULLETIN = """
+<html><body>
+<table>
+  <tr><th>Symbole</th><th>Nom</th><th>Volume</th><th>Valeur (FCFA)</th>
+      <th>Ouverture</th><th>Plus haut</th><th>Plus bas</th><th>Clôture</th></tr>
+  <tr><td>SGBC</td><td>Société Générale</td><td>1 234</td><td>12 345 678,50</td>
+      <td>10 000</td><td>10 500</td><td>9 900</td><td><b>10 250,5</b></td></tr>
+  <tr><td>SNTS</td><td>Sonatel</td><td>-</td><td>-</td>
+      <td>-</td><td>-</td><td>-</td><td>15 000</td></tr>
+</table>
+<table>
+  <tr><th>Symbole</th><th>Prix achat</th><th>Qté achat</th>
+      <th>Prix vente</th><th>Qté vente</th></tr>
+  <tr><td>SGBC</td><td>10 200</td><td>50</td><td>10 300</td><td>20</td></tr>
+</table>
+<table><tr><th>Indice</th><th>Valeur</th></tr><tr><td>BRVM-C</td><td>210,5</td></tr></table>
+</body></html>
+""".encode("utf-8")
+
+
+def test_parse_number_french_format():
+    assert parse_number("1 234,50") == 1234.5
+    assert parse_number("12\xa0345") == 12345.0
+    assert parse_number("1 000", integer=True) == 1000
+    assert parse_number(" - ") is None
+    assert parse_number("") is None
+    assert parse_number("n.d.") is None
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_parse_document_skips_malformed_cells(backend, caplog):
+    page = BULLETIN.replace(b"<td>10 500</td>", b"<td>10.500.0</td>")
+
+    rows = list(parse_document(page, TRADING_DATE, "boc", backend=backend))
+
+    assert rows[0].high_price is None
+    assert rows[0].close_price == 10250.5
+    assert len(rows) == 3
+    assert "10.500.0" in caplog.text
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+@pytest.mark.parametrize("cell", ["nan", "inf", "1e400"])
+def test_parse_document_skips_non_finite_cells(backend, cell, caplog):
+    page = BULLETIN.replace(b"<td>1 234</td>", f"<td>{cell}</td>".encode()).replace(
+        b"<td>10 500</td>", f"<td>{cell}</td>".encode()
+    )
+
+    rows = list(parse_document(page, TRADING_DATE, "boc", backend=backend))
+
+    assert rows[0].volume is None
+    assert rows[0].high_price is None
+    assert rows[0].close_price == 10250.5
+    assert len(rows) == 3
+    assert cell in caplog.text
+
+
+def test_normalize_header():
+    assert normalize_header(" Cours de Clôture (FCFA) ") == "cours de cloture"
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_parse_document_rows(backend):
+    rows = list(parse_document(BULLETIN, TRADING_DATE, "boc", backend=backend))
+
+    assert rows == [
+        EODRow("SGBC", TRADING_DATE, 10000.0, 10500.0, 9900.0, 10250.5,
+               1234, 12345678.5, "boc"),
+        EODRow("SNTS", TRADING_DATE, None, None, None, 15000.0,
+               None, None, "boc"),
+        ResidualRow("SGBC", TRADING_DATE, 10200.0, 50, 10300.0, 20, "boc"),
+    ]
+
+
+def test_parse_document_unknown_backend():
+    with pytest.raises(ValueError, match="Unknown parser backend"):
+        parse_document(BULLETIN, TRADING_DATE, backend="regex")
+
+
+def generate_page(tickers=47):
+    rows = "".join(
+        f"<tr><td>T{i:03}</td><td>1 000</td><td>2 500,50</td></tr>"
+        for i in range(tickers)
+    )
+    return (
+        "<html><body><table><tr><th>Symbole</th><th>Volume</th>"
+        f"<th>Clôture</th></tr>{rows}</table></body></html>"
+    ).encode("utf-8")
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_parse_memory_does_not_grow_with_pages(backend):
+    page = generate_page()
+    pages = 200
+
+    tracemalloc.start()
+    count = sum(
+        1
+        for _ in range(pages)
+        for _ in parse_document(page, TRADING_DATE, backend=backend)
+    )
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    assert count == pages * 47
+    # about 500 KB of HTML goes through, a bounded working set stays behind
+    assert pages * len(page) > 500_000
+    assert peak < 256 * 1024
@@ -0,0 +1,165 @@
+"""Test the fetcher and ingestion pipeline against a mocked BRVM site"""
+
+import asyncio
+import time
+from datetime import date, timedelta
+
+import httpx
+import pytest
+import respx
+
+from ingest.fetcher import Fetcher
+from ingest.pipeline import db_writer, run_pipeline
+from ingest.sources import requests_for, bulletin_request
+from models.trading import EquityEODPrice
+
+BASE_URL = "https://brvm.test"
+LATENCY = 0.02
+
+
+def trading_dates(days):
+    return [date(2024, 1, 1) + timedelta(days=offset) for offset in range(days)]
+
+
+@pytest.fixture
+def brvm_site():
+    """Local stand-in for the BRVM site with a fixed response latency."""
+    state = {"in_flight": 0, "max_in_flight": 0}
+
+    async def respond(request):
+        state["in_flight"] += 1
+        state["max_in_flight"] = max(state["max_in_flight"], state["in_flight"])
+        await asyncio.sleep(LATENCY)
+        state["in_flight"] -= 1
+        return httpx.Response(200, text=str(request.url))
+
+    with respx.mock(base_url=BASE_URL, assert_all_called=False) as router:
+        router.get(path__regex=r"^/fr/").mock(side_effect=respond)
+        yield router, state
+
+
+@pytest.mark.asyncio
+async def test_fetch_retries_transient_errors():
+    with respx.mock(base_url=BASE_URL) as router:
+        route = router.get(path__regex=r".*").mock(
+            side_effect=[httpx.Response(503), httpx.ConnectError("boom"),
+                         httpx.Response(200, text="ok")]
+        )
+        async with Fetcher(backoff=0, rate_per_host=None) as fetcher:
+            page = await fetcher.fetch(bulletin_request(date(2024, 1, 2), BASE_URL))
+
+    assert page.content == b"ok"
+    assert route.call_count == 3
+
+
+@pytest.mark.asyncio
+async def test_fetch_gives_up_after_max_retries():
+    with respx.mock(base_url=BASE_URL) as router:
+        route = router.get(path__regex=r".*").mock(return_value=httpx.Response(500))
+        async with Fetcher(backoff=0, max_retries=2) as fetcher:
+            with pytest.raises(httpx.HTTPStatusError):
+                await fetcher.fetch(bulletin_request(date(2024, 1, 2), BASE_URL))
+
+    assert route.call_count == 3
+
+
+@pytest.mark.asyncio
+async def test_fetch_respects_concurrency_limit(brvm_site):
+    _, state = brvm_site
+    requests = list(requests_for(trading_dates(10), base_url=BASE_URL))
+
+    async with Fetcher(concurrency=3, rate_per_host=None) as fetcher:
+        await asyncio.gather(*(fetcher.fetch(r) for r in requests))
+
+    assert state["max_in_flight"] == 3
+
+
+@pytest.mark.asyncio
+async def test_fetch_rate_limits_per_host(brvm_site):
+    requests = list(requests_for(trading_dates(3), base_url=BASE_URL))
+
+    started = time.perf_counter()
+    async with Fetcher(concurrency=6, rate_per_host=50) as fetcher:
+        await asyncio.gather(*(fetcher.fetch(r) for r in requests))
+
+    # six requests to one host, 20ms apart
+    assert time.perf_counter() - started >= 5 / 50
+
+
+@pytest.mark.asyncio
+async def test_pipeline_throughput(brvm_site):
+    requests = list(
+        requests_for(trading_dates(20), tickers=["SGBC", "SNTS"], base_url=BASE_URL)
+    )
+    written = []
+
+    async with Fetcher(concurrency=10, rate_per_host=None) as fetcher:
+        stats = await run_pipeline(
+            requests, fetcher, parse=lambda page: [page.request.url],
+            write=written.extend, batch_size=7,
+        )
+
+    assert stats["pages"] == len(requests) == 60
+    assert sorted(written) == sorted(r.url for r in requests)
+    # concurrent fetching beats one-page-at-a-time by a wide margin
+    assert stats["pages_per_second"] > 3 / LATENCY
+
+
+@pytest.mark.asyncio
+async def test_blocking_writer_does_not_stall_fetching(brvm_site):
+    router, _ = brvm_site
+    requests = list(requests_for(trading_dates(10), base_url=BASE_URL))
+    served_during_writes = []
+
+    def slow_write(batch):
+        before = router.calls.call_count
+        time.sleep(0.1)
+        served_during_writes.append(router.calls.call_count - before)
+
+    async with Fetcher(concurrency=2, rate_per_host=None) as fetcher:
+        stats = await run_pipeline(
+            requests, fetcher, parse=lambda page: [page.request.url],
+            write=slow_write, batch_size=2,
+        )
+
+    assert stats["pages"] == 20
+    # pages kept arriving while the first batch was being written
+    assert served_during_writes[0] > 0
+
+
+@pytest.mark.asyncio
+async def test_pipeline_counts_failed_pages():
+    requests = list(requests_for(trading_dates(2), base_url=BASE_URL))
+
+    with respx.mock(base_url=BASE_URL) as router:
+        router.get("/fr/bulletins-officiels-de-la-cote").mock(
+            return_value=httpx.Response(404)
+        )
+        router.get("/fr/cours-actions/0").mock(return_value=httpx.Response(200))
+        async with Fetcher(rate_per_host=None) as fetcher:
+            stats = await run_pipeline(
+                requests, fetcher, lambda page: [], lambda batch: None
+            )
+
+    assert stats["pages"] == 2
+    assert stats["failed"] == 2
+
+
+@pytest.mark.asyncio
+async def test_pipeline_writes_to_database(db, equity, brvm_site):
+    dates = trading_dates(5)
+
+    def parse(page):
+        yield {
+            "equity_id": equity.equity_id,
+            "trading_date": page.request.trading_date,
+            "close_price": 100.0,
+        }
+
+    async with Fetcher(rate_per_host=None) as fetcher:
+        await run_pipeline(
+            [bulletin_request(d, BASE_URL) for d in dates], fetcher, parse,
+            db_writer(db, EquityEODPrice), batch_size=2,
+        )
+
+    assert db.query(EquityEODPrice).count() == 5
@@ -0,0 +1,135 @@
+"""Test vectorized row validation and the quarantine"""
+
+from datetime import date, timedelta
+
+import numpy as np
+
+from ingest.validation import Issue, check_eod, check_residual, reasons, validate_rows
+from models.quality import QuarantinedRow
+from models.trading import EquityEODPrice, EquityResidualQuantity
+
+DAY = date(2024, 1, 2)
+
+
+def eod(equity_id=1, trading_date=DAY, **values):
+    row = {
+        "equity_id": equity_id,
+        "trading_date": trading_date,
+        "open_price": 100.0,
+        "high_price": 105.0,
+        "low_price": 98.0,
+        "close_price": 102.0,
+        "volume": 10,
+        "traded_value": 1010.0,
+        "data_source": "test",
+    }
+    row.update(values)
+    return row
+
+
+def test_eod_checks_flag_each_issue():
+    rows = [
+        eod(),
+        eod(close_price=None),
+        eod(low_price=110.0),
+        eod(open_price=120.0),
+        eod(volume=-1),
+        eod(traded_value=5000.0),
+        eod(volume=0, traded_value=10.0),
+        eod(equity_id=None),
+        # missing range fields are not errors
+        eod(open_price=None, high_price=None, low_price=None, traded_value=1020.0),
+    ]
+
+    issues = check_eod(rows)
+
+    assert issues[0] == 0
+    assert issues[1] & Issue.MISSING_CLOSE
+    assert issues[2] & Issue.HIGH_BELOW_LOW
+    assert issues[3] == Issue.OPEN_OUTSIDE_RANGE
+    assert issues[4] & Issue.NEGATIVE_VOLUME
+    assert issues[5] == Issue.VALUE_MISMATCH
+    assert issues[6] == Issue.VALUE_MISMATCH
+    assert issues[7] == Issue.MISSING_KEY
+    assert issues[8] == 0
+
+
+def test_price_band_uses_batch_and_previous_closes():
+    rows = [
+        eod(trading_date=DAY + timedelta(days=1), close_price=110.0, high_price=111.0),
+        eod(trading_date=DAY, close_price=102.0),
+        eod(equity_id=2, close_price=102.0),
+    ]
+
+    issues = check_eod(rows, previous_close={1: 101.0, 2: 90.0})
+
+    # 102 -> 110 within the batch, 90 -> 102 against the stored close
+    assert issues[0] == Issue.PRICE_BAND
+    assert issues[1] == 0
+    assert issues[2] == Issue.PRICE_BAND
+
+
+def test_residual_checks():
+    rows = [
+        {"equity_id": 1, "trading_date": DAY, "buy_price": 99.0, "buy_quantity": 5,
+         "sell_price": 101.0, "sell_quantity": 3},
+        {"equity_id": 1, "trading_date": DAY, "buy_price": None, "buy_quantity": 5},
+        {"equity_id": 1, "trading_date": DAY, "buy_price": 102.0, "sell_price": 101.0},
+        {"equity_id": 1, "trading_date": DAY, "sell_price": 101.0, "sell_quantity": -2},
+    ]
+
+    issues = check_residual(rows)
+
+    assert list(issues) == [
+        0,
+        Issue.QUANTITY_WITHOUT_PRICE,
+        Issue.CROSSED_BOOK,
+        Issue.NEGATIVE_QUANTITY,
+    ]
+    assert reasons(int(Issue.MISSING_KEY | Issue.PRICE_BAND)) == "MISSING_KEY,PRICE_BAND"
+
+
+def test_validate_rows_quarantines_rejects(db, equity):
+    EquityEODPrice.bulk_create(db, [eod(equity.equity_id, DAY - timedelta(days=1))])
+    rows = [
+        eod(equity.equity_id, close_price=120.0, high_price=121.0),
+        eod(equity.equity_id, DAY + timedelta(days=1), low_price=130.0),
+        eod(equity.equity_id, DAY + timedelta(days=2), close_price=103.0),
+    ]
+
+    result = validate_rows(db, EquityEODPrice, rows)
+
+    assert result.passed == [rows[0], rows[2]]
+    assert result.counts["accepted"] == 1
+    assert result.counts["warned"] == 1
+    assert result.counts["rejected"] == 1
+    # the rejected row moved 102 -> 120 -> 102
+    assert result.counts["PRICE_BAND"] == 2
+    [stored] = db.query(QuarantinedRow).all()
+    assert stored.table_name == "equity_eod_prices"
+    assert stored.equity_id == equity.equity_id
+    assert stored.reasons.split(",") == [
+        "HIGH_BELOW_LOW",
+        "OPEN_OUTSIDE_RANGE",
+        "CLOSE_OUTSIDE_RANGE",
+        "VALUE_MISMATCH",
+        "PRICE_BAND",
+    ]
+    assert stored.payload["trading_date"] == "2024-01-03"
+
+    # a retried step doesn't quarantine the same rejects again
+    assert validate_rows(db, EquityEODPrice, rows).counts["rejected"] == 1
+    assert db.query(QuarantinedRow).count() == 1
+
+
+def test_validate_rows_residual_batch(db, equity):
+    result = validate_rows(
+        db,
+        EquityResidualQuantity,
+        [{"equity_id": equity.equity_id, "trading_date": DAY, "buy_quantity": 5}],
+    )
+
+    assert result.passed == []
+    assert result.counts == {"accepted": 0, "warned": 0, "rejected": 1,
+                             "QUANTITY_WITHOUT_PRICE": 1}
+    assert np.array_equal(result.issues, [Issue.QUANTITY_WITHOUT_PRICE])
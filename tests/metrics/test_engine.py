@@ -0,0 +1,133 @@
+"""Test the incremental metrics engine"""
+
+from datetime import date, timedelta
+
+import numpy as np
+import pytest
+from sqlalchemy import func, select, update
+
+from metrics.engine import compute_metrics, refresh_metrics, rolling_mean_std
+from models.metrics import EquityDailyMetric
+from models.trading import EquityEODPrice
+
+START = date(2024, 1, 1)
+
+
+def test_rolling_mean_std_matches_direct_computation():
+    rng = np.random.default_rng(0)
+    values = rng.normal(size=(50, 3))
+    values[rng.random(values.shape) < 0.2] = np.nan
+
+    mean, std = rolling_mean_std(values, window=10, min_periods=5)
+
+    for t in range(50):
+        for j in range(3):
+            window = values[max(0, t - 9):t + 1, j]
+            window = window[~np.isnan(window)]
+            if len(window) < 5:
+                assert np.isnan(mean[t, j]) and np.isnan(std[t, j])
+            else:
+                assert mean[t, j] == pytest.approx(window.mean())
+                assert std[t, j] == pytest.approx(window.std(ddof=1))
+
+
+def test_compute_metrics_skips_days_without_trades():
+    close = np.array([[100.0], [np.nan], [110.0]])
+    volume = np.array([[10.0], [np.nan], [5.0]])
+    traded_value = np.array([[1000.0], [np.nan], [560.0]])
+
+    metrics = compute_metrics(close, volume, traded_value)
+
+    assert np.isnan(metrics["daily_return"][0, 0])
+    assert np.isnan(metrics["daily_return"][1, 0])
+    # return against the last traded close
+    assert metrics["daily_return"][2, 0] == pytest.approx(0.1)
+    assert metrics["vwap"][2, 0] == pytest.approx(112.0)
+
+
+def add_prices(db, equity_id, days, offset=0, close=None):
+    EquityEODPrice.bulk_upsert(
+        db,
+        [
+            {
+                "equity_id": equity_id,
+                "trading_date": START + timedelta(days=offset + n),
+                "close_price": close or 100.0 + offset + n,
+                "volume": 10,
+                "traded_value": 10 * (close or 100.0 + offset + n),
+            }
+            for n in range(days)
+        ],
+    )
+
+
+def metric(db, equity_id, day):
+    return (
+        db.query(EquityDailyMetric)
+        .filter_by(equity_id=equity_id, trading_date=START + timedelta(days=day))
+        .one()
+    )
+
+
+def age_prices(db, hours=1):
+    """Stamp every price an hour ago, as if the rows were old."""
+    old = db.scalar(select(func.now())) - timedelta(hours=hours)
+    db.execute(update(EquityEODPrice).values(updated_at=old))
+
+
+def test_refresh_is_incremental_and_idempotent(db, equity):
+    add_prices(db, equity.equity_id, 30)
+
+    first = refresh_metrics(db)
+    before = metric(db, equity.equity_id, 29).volatility_20
+    # rows written within the overlap are read again, to the same values
+    again = refresh_metrics(db)
+    assert metric(db, equity.equity_id, 29).volatility_20 == before
+    age_prices(db)
+    settled = refresh_metrics(db)
+    add_prices(db, equity.equity_id, 2, offset=30)
+    appended = refresh_metrics(db)
+
+    assert first["rows"] == 30
+    assert again["rows"] == 30
+    assert settled["rows"] == 0
+    assert appended["sessions"] == 2
+    assert appended["start"] == START + timedelta(days=30)
+    assert db.query(EquityDailyMetric).count() == 32
+    assert metric(db, equity.equity_id, 1).daily_return == pytest.approx(0.01)
+    assert metric(db, equity.equity_id, 31).volatility_20 is not None
+
+
+def test_refresh_recomputes_corrected_window(db, equity):
+    add_prices(db, equity.equity_id, 100)
+    age_prices(db)
+    refresh_metrics(db)
+
+    # a corrected bulletin for day 10, likely in the same second as the run
+    add_prices(db, equity.equity_id, 1, offset=10, close=200.0)
+    result = refresh_metrics(db)
+
+    assert result["start"] == START + timedelta(days=10)
+    # the correction and the 60-session windows that follow it
+    assert result["sessions"] == 61
+    assert metric(db, equity.equity_id, 10).daily_return == pytest.approx(200 / 109 - 1)
+    assert metric(db, equity.equity_id, 11).daily_return == pytest.approx(111 / 200 - 1)
+
+
+def test_refresh_sees_corrections_stamped_before_it_ran(db, equity):
+    add_prices(db, equity.equity_id, 100)
+    age_prices(db)
+    # a writer whose transaction started before the run commits after it,
+    # with an updated_at in the same second as the run's watermark
+    stamp = db.scalar(select(func.now()))
+    refresh_metrics(db)
+    db.execute(
+        update(EquityEODPrice)
+        .where(EquityEODPrice.trading_date == START + timedelta(days=10))
+        .values(close_price=200.0, updated_at=stamp)
+    )
+
+    result = refresh_metrics(db)
+
+    assert result["start"] == START + timedelta(days=10)
+    assert metric(db, equity.equity_id, 10).daily_return == pytest.approx(200 / 109 - 1)
@@ -0,0 +1,164 @@
+"""Test the per-day market summary and its read API"""
+
+import threading
+from datetime import date, timedelta
+
+import pytest
+from sqlalchemy import delete, insert
+from sqlalchemy.orm import Session
+
+from db.base_class import Base
+from db.instrument import assert_max_statements
+from metrics.summary import TOP_MOVERS, rebuild_market_summaries, refresh_market_summaries
+from models.enums import CountryEnum
+from models.stocks import Company, Equity
+from models.summary import MarketDailySummary
+from models.trading import EquityEODPrice, TradingDay
+from query.market import get_market_summary
+
+DAY = date(2024, 1, 2)
+NEXT_DAY = DAY + timedelta(days=1)
+
+
+@pytest.fixture
+def equities(db, equity):
+    """SGBC in Côte d'Ivoire plus two Senegalese equities."""
+    senegal = Company.create(db, company_name="Sonatel", country=CountryEnum.SENEGAL)
+    return [equity] + [
+        Equity.create(
+            db, company_id=senegal.company_id, ticker=ticker, isin=f"SN000000000{n}"
+        )
+        for n, ticker in enumerate(("SNTS", "SDSC"))
+    ]
+
+
+def add_closes(db, equities, trading_date, closes, volume=10):
+    EquityEODPrice.bulk_upsert(
+        db,
+        [
+            {
+                "equity_id": equity.equity_id,
+                "trading_date": trading_date,
+                "close_price": close,
+                "volume": volume,
+                "traded_value": volume * close,
+            }
+            for equity, close in zip(equities, closes)
+            if close is not None
+        ],
+    )
+
+
+def test_summary_totals_breadth_movers_and_countries(db, equities):
+    add_closes(db, equities, DAY, [100.0, 200.0, 300.0])
+    add_closes(db, equities, NEXT_DAY, [110.0, 180.0, 300.0])
+
+    refresh_market_summaries(db, [DAY, NEXT_DAY])
+    first = get_market_summary(db, DAY)
+    summary = get_market_summary(db, NEXT_DAY)
+
+    # no earlier closes: counted in totals only
+    assert first.market.equities_traded == 3
+    assert (first.market.advancers, first.market.decliners) == (0, 0)
+    assert first.gainers == first.losers == []
+
+    assert summary.market.total_volume == 30
+    assert summary.market.total_traded_value == pytest.approx(5900.0)
+    market = summary.market
+    assert (market.advancers, market.decliners, market.unchanged) == (1, 1, 1)
+    assert [(m.ticker, m.change) for m in summary.gainers] == [
+        ("SGBC", pytest.approx(0.1))
+    ]
+    assert [(m.ticker, m.previous_close) for m in summary.losers] == [("SNTS", 200.0)]
+    assert summary.countries[CountryEnum.SENEGAL].equities_traded == 2
+    assert summary.countries[CountryEnum.SENEGAL].decliners == 1
+    assert summary.countries[CountryEnum.COTE_D_IVOIRE].advancers == 1
+
+
+def test_refresh_updates_the_following_session(db, equities):
+    add_closes(db, equities, DAY, [100.0, None, None])
+    add_closes(db, equities, NEXT_DAY, [110.0, None, None])
+    refresh_market_summaries(db, [DAY, NEXT_DAY])
+
+    # a corrected close changes the next day's breadth too
+    add_closes(db, equities, DAY, [120.0, None, None])
+    stats = refresh_market_summaries(db, [DAY])
+
+    assert stats["days"] == 2
+    summary = get_market_summary(db, NEXT_DAY)
+    assert (summary.market.advancers, summary.market.decliners) == (0, 1)
+    assert summary.losers[0].previous_close == 120.0
+
+
+def test_movers_are_capped_and_ranked(db, company):
+    equities = [
+        Equity.create(
+            db, company_id=company.company_id, ticker=f"T{n:02}", isin=f"CI{n:010}"
+        )
+        for n in range(TOP_MOVERS + 2)
+    ]
+    add_closes(db, equities, DAY, [100.0] * len(equities))
+    add_closes(db, equities, NEXT_DAY, [101.0 + n for n in range(len(equities))])
+
+    rebuild_market_summaries(db, DAY, NEXT_DAY)
+    summary = get_market_summary(db, NEXT_DAY)
+
+    assert len(summary.gainers) == TOP_MOVERS
+    assert summary.gainers[0].ticker == equities[-1].ticker
+    assert [m.change for m in summary.gainers] == sorted(
+        (m.change for m in summary.gainers), reverse=True
+    )
+
+
+def test_read_is_constant_per_day(db, equities):
+    for offset in range(5):
+        add_closes(db, equities, DAY + timedelta(days=offset), [100.0 + offset] * 3)
+    rebuild_market_summaries(db, DAY, DAY + timedelta(days=4))
+
+    assert db.query(MarketDailySummary).count() == 5
+    with assert_max_statements(3, bind=db.get_bind()) as scope:
+        assert get_market_summary(db, DAY + timedelta(days=4)).market.advancers == 3
+    assert scope.count == 3
+    assert get_market_summary(db, DAY - timedelta(days=1)) is None
+
+
+def test_concurrent_refreshes_of_a_day_upsert(pg_engine):
+    with Session(pg_engine) as db:
+        company = Company.create(db, company_name="Race", country=CountryEnum.MALI)
+        equity = Equity.create(
+            db, company_id=company.company_id, ticker="RACE", isin="ML0000000009"
+        )
+        TradingDay.bulk_create(db, [{"trading_date": DAY}])
+        add_closes(db, [equity], DAY, [100.0])
+    try:
+        with Session(pg_engine) as first, Session(pg_engine) as second:
+            # another shard's refresh of DAY, not committed yet
+            first.execute(
+                insert(MarketDailySummary),
+                {
+                    "trading_date": DAY, "equities_traded": 0, "total_volume": 0,
+                    "total_traded_value": 0.0, "advancers": 0, "decliners": 0,
+                    "unchanged": 0,
+                },
+            )
+            errors = []
+
+            def refresh():
+                try:
+                    refresh_market_summaries(second, [DAY])
+                except Exception as exc:
+                    errors.append(exc)
+
+            thread = threading.Thread(target=refresh)
+            thread.start()
+            thread.join(0.5)
+            first.commit()
+            thread.join(10)
+
+            assert errors == []
+            assert second.get(MarketDailySummary, DAY).equities_traded == 1
+    finally:
+        with Session(pg_engine) as db:
+            for table in reversed(Base.metadata.sorted_tables):
+                db.execute(delete(table))
+            db.commit()
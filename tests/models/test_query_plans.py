@@ -0,0 +1,60 @@
+"""Make sure time-series lookups are served by an index"""
+
+import pytest
+from datetime import date
+from sqlalchemy import select, text
+from models.trading import EquityEODPrice, EquityResidualQuantity
+
+MODELS = [EquityEODPrice, EquityResidualQuantity]
+
+
+def history_query(model):
+    """Price history for one equity over a date range."""
+    return select(model).where(
+        model.equity_id == 1,
+        model.trading_date >= date(2024, 1, 1),
+        model.trading_date <= date(2024, 12, 31),
+    )
+
+
+def duplicate_check_query(model):
+    """The lookup done by the create() methods."""
+    return select(model).where(
+        model.equity_id == 1, model.trading_date == date(2024, 1, 2)
+    )
+
+
+def cross_section_query(model):
+    """Every equity on a single day."""
+    return select(model).where(model.trading_date == date(2024, 1, 2))
+
+
+QUERIES = [history_query, duplicate_check_query, cross_section_query]
+
+
+def explain(db, stmt, prefix):
+    compiled = stmt.compile(
+        dialect=db.get_bind().dialect, compile_kwargs={"literal_binds": True}
+    )
+    rows = db.execute(text(f"{prefix} {compiled}")).all()
+    return "\n".join(str(row[-1]) for row in rows)
+
+
+@pytest.mark.parametrize("model", MODELS)
+@pytest.mark.parametrize("query", QUERIES)
+def test_sqlite_lookup_uses_index(db, model, query):
+    plan = explain(db, query(model), "EXPLAIN QUERY PLAN")
+
+    assert "USING INDEX" in plan
+    assert "SCAN" not in plan
+
+
+@pytest.mark.parametrize("model", MODELS)
+@pytest.mark.parametrize("query", QUERIES)
+def test_postgres_lookup_uses_index(pg_db, model, query):
+    # make any sequential scan stand out even on an empty table
+    pg_db.execute(text("SET LOCAL enable_seqscan = off"))
+    plan = explain(pg_db, query(model), "EXPLAIN")
+
+    assert "Index" in plan
+    assert "Seq Scan" not in plan
@@ -0,0 +1,139 @@
+"""Test the reference-data cache"""
+
+import pytest
+from datetime import date
+from sqlalchemy import event
+
+from models.reference import ReferenceCache, invalidate_reference_caches
+from models.stocks import Company, Equity
+from models.trading import TradingDay
+from models.enums import CountryEnum, TradingStatusEnum
+
+
+@pytest.fixture
+def count_queries(db):
+    """Count the statements sent through the test connection."""
+    counter = {"queries": 0}
+
+    def before_execute(*args):
+        counter["queries"] += 1
+
+    bind = db.get_bind()
+    event.listen(bind, "before_cursor_execute", before_execute)
+    yield counter
+    event.remove(bind, "before_cursor_execute", before_execute)
+
+
+def test_lookups_resolve_from_one_load(db, equity, count_queries):
+    cache = ReferenceCache()
+
+    by_ticker = cache.equity_by_ticker(db, "SGBC")
+    by_isin = cache.equity_by_isin(db, "CI0000000002")
+
+    assert by_ticker.equity_id == equity.equity_id
+    assert by_isin == by_ticker
+    assert cache.equity_id(db, "SGBC") == equity.equity_id
+    assert count_queries["queries"] == 1
+    assert cache.stats()["equities"]["hits"] == 3
+
+
+def test_unknown_key_is_a_miss_without_query(db, equity, count_queries):
+    cache = ReferenceCache()
+    cache.equity_by_ticker(db, "SGBC")
+
+    assert cache.equity_by_ticker(db, "NOPE") is None
+    assert count_queries["queries"] == 1
+    assert cache.stats()["equities"]["misses"] == 1
+
+
+def test_create_invalidates_cache(db, company):
+    cache = ReferenceCache()
+    assert cache.equity_by_ticker(db, "SNTS") is None
+
+    Equity.create(db, company_id=company.company_id, ticker="SNTS", isin="SN0000000001")
+
+    assert cache.equity_by_ticker(db, "SNTS") is not None
+    assert cache.stats()["equities"]["loads"] == 2
+
+
+def test_invalidation_waits_for_commit(db, company):
+    cache = ReferenceCache()
+    cache.equity_by_ticker(db, "SGBC")
+
+    db.add(
+        Equity(
+            company_id=company.company_id,
+            ticker="SNTS",
+            isin="SN0000000001",
+            trading_status=TradingStatusEnum.ACTIVE,
+        )
+    )
+    db.flush()
+    cache.equity_by_ticker(db, "SGBC")
+    assert cache.stats()["equities"]["loads"] == 1
+
+    db.commit()
+    cache.equity_by_ticker(db, "SGBC")
+    assert cache.stats()["equities"]["loads"] == 2
+
+
+def test_rollback_discards_pending_invalidation(db, company):
+    cache = ReferenceCache()
+    db.add(
+        Equity(
+            company_id=company.company_id,
+            ticker="SNTS",
+            isin="SN0000000001",
+            trading_status=TradingStatusEnum.ACTIVE,
+        )
+    )
+    db.flush()
+    db.rollback()
+    cache.equity_by_ticker(db, "SGBC")
+
+    db.commit()
+    cache.equity_by_ticker(db, "SGBC")
+
+    assert cache.stats()["equities"]["loads"] == 1
+
+
+def test_trading_day_and_company_lookups(db, company):
+    cache = ReferenceCache()
+    TradingDay.create(db, trading_date=date(2024, 1, 2))
+
+    assert cache.trading_day(db, date(2024, 1, 2)).is_open is True
+    assert cache.trading_day(db, date(2024, 1, 3)) is None
+    assert cache.company_by_name(db, "Test company").company_id == company.company_id
+
+
+def test_ttl_expiry_reloads(db, equity):
+    now = [0.0]
+    cache = ReferenceCache(ttl=10, clock=lambda: now[0])
+    cache.equity_by_ticker(db, "SGBC")
+
+    now[0] = 11.0
+    cache.equity_by_ticker(db, "SGBC")
+
+    assert cache.stats()["equities"]["loads"] == 2
+
+
+def test_max_size_evicts_and_falls_back_to_query(db, company):
+    for i in range(3):
+        Company.create(db, company_name=f"Company {i}", country=CountryEnum.MALI)
+    cache = ReferenceCache(max_size=2)
+
+    assert cache.company_by_name(db, "Test company") is not None
+    stats = cache.stats()["companies"]
+    assert stats["size"] == 2
+    assert stats["misses"] == 1
+    assert stats["evictions"] == 1
+
+
+def test_invalidate_reference_caches(db, equity):
+    cache = ReferenceCache()
+    cache.equity_by_ticker(db, "SGBC")
+
+    invalidate_reference_caches("equities")
+    cache.equity_by_ticker(db, "SGBC")
+
+    assert cache.stats()["equities"]["loads"] == 2
@@ -0,0 +1,172 @@
+"""Test trading models"""
+
+import pytest
+from datetime import date, datetime, timedelta
+from models.trading import TradingDay, EquityEODPrice, EquityEODPriceRevision
+
+
+def make_rows(equity_id, start, days, **overrides):
+    rows = []
+    for offset in range(days):
+        row = {
+            "equity_id": equity_id,
+            "trading_date": start + timedelta(days=offset),
+            "open_price": 100.0,
+            "high_price": 110.0,
+            "low_price": 95.0,
+            "close_price": 105.0,
+            "volume": 1000,
+            "traded_value": 105000.0,
+        }
+        row.update(overrides)
+        rows.append(row)
+    return rows
+
+
+def test_create_trading_day_returns_existing(db):
+    first = TradingDay.create(db, trading_date=date(2024, 1, 2))
+    second = TradingDay.create(db, trading_date=date(2024, 1, 2))
+
+    assert first.trading_id == second.trading_id
+
+
+def test_create_eod_price_sets_full_data_flag(db, equity):
+    price = EquityEODPrice.create(
+        db, **make_rows(equity.equity_id, date(2024, 1, 2), 1)[0]
+    )
+    partial = EquityEODPrice.create(
+        db,
+        equity_id=equity.equity_id,
+        trading_date=date(2024, 1, 3),
+        close_price=105.0,
+    )
+
+    assert price.full_data_flag is True
+    assert partial.full_data_flag is False
+
+
+def test_create_eod_price_duplicate(db, equity):
+    row = make_rows(equity.equity_id, date(2024, 1, 2), 1)[0]
+    EquityEODPrice.create(db, **row)
+
+    with pytest.raises(ValueError, match="already exists"):
+        EquityEODPrice.create(db, **row)
+
+
+def test_bulk_upsert_after_create_sees_no_change(db, equity):
+    row = make_rows(equity.equity_id, date(2024, 1, 2), 1)[0]
+    EquityEODPrice.create(db, **row)
+
+    (result,) = EquityEODPrice.bulk_upsert(db, [row])
+
+    assert (result["updated"], result["unchanged"]) == (0, 1)
+    assert db.query(EquityEODPriceRevision).count() == 0
+
+
+def test_bulk_create_batches(db, equity):
+    rows = make_rows(equity.equity_id, date(2024, 1, 1), 25)
+
+    results = EquityEODPrice.bulk_create(db, rows, batch_size=10)
+
+    assert [r["inserted"] for r in results] == [10, 10, 5]
+    assert db.query(EquityEODPrice).count() == 25
+    assert all(p.full_data_flag for p in db.query(EquityEODPrice))
+
+
+def test_bulk_create_reports_conflicts_and_skips(db, equity):
+    EquityEODPrice.bulk_create(db, make_rows(equity.equity_id, date(2024, 1, 1), 5))
+    rows = make_rows(equity.equity_id, date(2024, 1, 1), 8)
+    rows.append({"equity_id": equity.equity_id, "trading_date": None})
+
+    (result,) = EquityEODPrice.bulk_create(db, rows)
+
+    assert result == {"batch": 0, "inserted": 3, "skipped": 1, "conflicts": 5}
+    assert db.query(EquityEODPrice).count() == 8
+
+
+def test_bulk_create_flags_partial_rows(db, equity):
+    rows = make_rows(equity.equity_id, date(2024, 1, 1), 2)
+    rows[1]["volume"] = None
+
+    EquityEODPrice.bulk_create(db, rows)
+
+    flags = [
+        p.full_data_flag
+        for p in db.query(EquityEODPrice).order_by(EquityEODPrice.trading_date)
+    ]
+    assert flags == [True, False]
+
+
+def test_bulk_upsert_overwrites_existing(db, equity):
+    EquityEODPrice.bulk_create(db, make_rows(equity.equity_id, date(2024, 1, 1), 3))
+    rows = make_rows(equity.equity_id, date(2024, 1, 2), 3, close_price=120.0)
+
+    (result,) = EquityEODPrice.bulk_upsert(db, rows)
+
+    assert result["inserted"] == 1
+    assert result["conflicts"] == 2
+    assert (result["updated"], result["unchanged"]) == (2, 0)
+    closes = [
+        p.close_price
+        for p in db.query(EquityEODPrice).order_by(EquityEODPrice.trading_date)
+    ]
+    assert closes == [105.0, 120.0, 120.0, 120.0]
+
+
+def test_bulk_upsert_leaves_unchanged_rows_alone(db, equity):
+    EquityEODPrice.bulk_create(db, make_rows(equity.equity_id, date(2024, 1, 1), 3))
+    stale = datetime(2000, 1, 1)
+    db.query(EquityEODPrice).update({"updated_at": stale})
+    rows = make_rows(equity.equity_id, date(2024, 1, 1), 3)
+    # same value, read back as an int
+    rows[0]["close_price"] = 105
+    rows[2]["close_price"] = 120.0
+
+    (result,) = EquityEODPrice.bulk_upsert(db, rows)
+
+    assert result["inserted"] == 0
+    assert (result["updated"], result["unchanged"]) == (1, 2)
+    stamps = [
+        p.updated_at
+        for p in db.query(EquityEODPrice).order_by(EquityEODPrice.trading_date)
+    ]
+    assert stamps[:2] == [stale, stale]
+    assert stamps[2] > stale
+
+
+def test_bulk_upsert_keeps_superseded_versions(db, equity):
+    EquityEODPrice.bulk_create(db, make_rows(equity.equity_id, date(2024, 1, 1), 2))
+    stored = datetime(2024, 1, 1, 18, 0)
+    db.query(EquityEODPrice).update({"updated_at": stored})
+
+    EquityEODPrice.bulk_upsert(
+        db, make_rows(equity.equity_id, date(2024, 1, 1), 2, close_price=104.0)
+    )
+    EquityEODPrice.bulk_upsert(
+        db, make_rows(equity.equity_id, date(2024, 1, 1), 1, close_price=104.0)
+    )
+
+    revisions = db.query(EquityEODPriceRevision).order_by(
+        EquityEODPriceRevision.trading_date
+    ).all()
+    assert [r.close_price for r in revisions] == [105.0, 105.0]
+    assert all(r.valid_from == stored for r in revisions)
+    # the corrected rows are current from the moment the old ones ended
+    current = db.query(EquityEODPrice).order_by(EquityEODPrice.trading_date).all()
+    assert [p.updated_at for p in current] == [r.valid_to for r in revisions]
+
+
+def test_correct_eod_price(db, equity):
+    created = EquityEODPrice.correct(
+        db, equity_id=equity.equity_id, trading_date=date(2024, 1, 2), close_price=105.0
+    )
+    corrected = EquityEODPrice.correct(
+        db, equity_id=equity.equity_id, trading_date=date(2024, 1, 2), close_price=104.5
+    )
+
+    assert corrected.eod_price_id == created.eod_price_id
+    assert corrected.close_price == 104.5
+    (revision,) = db.query(EquityEODPriceRevision).all()
+    assert revision.close_price == 105.0
+    with pytest.raises(ValueError):
+        EquityEODPrice.correct(db, equity_id=equity.equity_id, trading_date=None)
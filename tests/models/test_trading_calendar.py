@@ -0,0 +1,66 @@
+"""Test the trading calendar"""
+
+from datetime import date
+
+from models.trading import TradingDay
+from models.trading_calendar import (
+    TradingCalendar,
+    easter_sunday,
+    generate_trading_days,
+    holidays,
+    materialize_calendar,
+)
+
+
+def test_easter_sunday():
+    assert easter_sunday(2024) == date(2024, 3, 31)
+    assert easter_sunday(2025) == date(2025, 4, 20)
+    assert easter_sunday(2000) == date(2000, 4, 23)
+
+
+def test_holidays_include_movable_feasts():
+    found = holidays(date(2024, 1, 1), date(2024, 12, 31))
+
+    assert found[date(2024, 4, 1)] == "Lundi de Pâques"
+    assert found[date(2024, 5, 9)] == "Ascension"
+    assert date(2024, 12, 25) in found
+
+
+def test_generate_trading_days_skips_weekends_and_holidays():
+    days = generate_trading_days(
+        date(2024, 4, 1), date(2024, 4, 14), extra_holidays=[date(2024, 4, 10)]
+    )
+
+    # Easter Monday, Korité and both weekends are closed
+    assert days == [
+        date(2024, 4, 2), date(2024, 4, 3), date(2024, 4, 4), date(2024, 4, 5),
+        date(2024, 4, 8), date(2024, 4, 9), date(2024, 4, 11), date(2024, 4, 12),
+    ]
+
+
+def test_calendar_navigation():
+    calendar = TradingCalendar.from_rules(date(2024, 12, 20), date(2025, 1, 10))
+
+    assert calendar.is_open(date(2024, 12, 24))
+    assert not calendar.is_open(date(2024, 12, 25))
+    assert date(2024, 12, 28) not in calendar
+    assert calendar.next_trading_day(date(2024, 12, 31)) == date(2025, 1, 2)
+    assert calendar.previous_trading_day(date(2024, 12, 26)) == date(2024, 12, 24)
+    assert calendar.next_trading_day(date(2025, 1, 10)) is None
+    assert calendar.between(date(2024, 12, 24), date(2024, 12, 27)) == [
+        date(2024, 12, 24), date(2024, 12, 26), date(2024, 12, 27),
+    ]
+
+
+def test_materialize_calendar_inserts_missing_days(db):
+    TradingDay.create(db, trading_date=date(2024, 1, 2))
+
+    inserted = materialize_calendar(db, date(2024, 1, 1), date(2024, 1, 31))
+    again = materialize_calendar(db, date(2024, 1, 1), date(2024, 1, 31))
+
+    new_years_day = db.query(TradingDay).filter_by(trading_date=date(2024, 1, 1)).one()
+    assert inserted == 22
+    assert again == 0
+    assert new_years_day.is_open is False
+    assert new_years_day.note == "Jour de l'an"
+    assert len(TradingCalendar.from_db(db)) == 22
@@ -0,0 +1,161 @@
+"""Test the memory-mapped price history cache"""
+
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import pytest
+from sqlalchemy import func, select, update
+
+import query.cache
+from models.stocks import Equity
+from models.trading import EquityEODPrice
+from query.cache import CacheMissing, HistoryCache
+
+DAY = date(2024, 1, 2)
+
+
+@pytest.fixture
+def equities(db, company, equity):
+    other = Equity.create(
+        db, company_id=company.company_id, ticker="SIBC", isin="CI0000000902"
+    )
+    return [equity, other]
+
+
+def add_closes(db, equity, days, close=100.0):
+    EquityEODPrice.bulk_upsert(
+        db,
+        [
+            {
+                "equity_id": equity.equity_id,
+                "trading_date": DAY + timedelta(days=offset),
+                "close_price": close + offset,
+                "volume": 10,
+            }
+            for offset in days
+        ],
+    )
+
+
+def test_rebuild_aligns_equities_and_reads_memory_maps(db, equities, tmp_path):
+    add_closes(db, equities[0], range(3))
+    add_closes(db, equities[1], [1])
+    cache = HistoryCache(tmp_path)
+    with pytest.raises(CacheMissing):
+        cache.read()
+
+    assert cache.rebuild(db) == {"method": "rebuild", "days": 3, "rows": 3}
+    matrix = cache.read(["close_price", "volume"])
+
+    assert list(matrix.tickers) == ["SGBC", "SIBC"]
+    assert matrix.dates[0] == np.datetime64(DAY)
+    close = matrix.values["close_price"]
+    assert isinstance(close, np.memmap)
+    assert not close.flags.writeable
+    np.testing.assert_array_equal(
+        close, [[100.0, np.nan], [101.0, 101.0], [102.0, np.nan]]
+    )
+    assert matrix.values["volume"][1, 1] == 10
+    with pytest.raises(ValueError):
+        cache.read(["adjusted_close"])
+
+
+def test_refresh_appends_new_days_in_place(db, equities, tmp_path):
+    add_closes(db, equities[0], range(2))
+    cache = HistoryCache(tmp_path)
+    cache.refresh(db)
+    generation = cache.manifest()["generation"]
+
+    add_closes(db, equities[0], range(2, 4))
+    add_closes(db, equities[1], [3])
+    stats = cache.refresh(db)
+
+    assert stats == {"method": "append", "days": 2, "rows": 4}
+    assert cache.manifest()["generation"] == generation
+    matrix = cache.read(start=DAY + timedelta(days=1), end=DAY + timedelta(days=2))
+    assert list(matrix.dates) == [np.datetime64(DAY + timedelta(days=d)) for d in (1, 2)]
+    np.testing.assert_array_equal(matrix.values["close_price"], [[101, np.nan], [102, np.nan]])
+    assert cache.read().values["close_price"][3, 1] == 103.0
+    assert cache.refresh(db)["days"] == 0
+
+
+def test_corrections_and_new_equities_rebuild(db, company, equities, tmp_path):
+    add_closes(db, equities[0], range(3))
+    cache = HistoryCache(tmp_path)
+    cache.refresh(db)
+
+    # a corrected close on an already cached day
+    db.execute(
+        update(EquityEODPrice)
+        .where(EquityEODPrice.trading_date == DAY)
+        .values(close_price=99.0, updated_at=datetime.now() + timedelta(minutes=1))
+    )
+    assert cache.refresh(db)["method"] == "rebuild"
+    assert cache.read().values["close_price"][0, 0] == 99.0
+
+    Equity.create(db, company_id=company.company_id, ticker="SAFC", isin="CI0000000903")
+    assert cache.refresh(db)["method"] == "rebuild"
+    assert list(cache.read().tickers) == ["SGBC", "SIBC", "SAFC"]
+    # only the current and the previous generation are kept
+    assert len([path for path in tmp_path.iterdir() if path.is_dir()]) == 2
+
+
+def test_refresh_grows_past_capacity(db, equities, tmp_path, monkeypatch):
+    monkeypatch.setattr(query.cache, "GROWTH", 2)
+    add_closes(db, equities[0], range(2))
+    cache = HistoryCache(tmp_path)
+    cache.refresh(db)
+    before = cache.read()
+
+    add_closes(db, equities[0], range(2, 5))
+    stats = cache.refresh(db)
+
+    assert stats == {"method": "grow", "days": 3, "rows": 5}
+    assert cache.manifest()["capacity"] == 7
+    np.testing.assert_array_equal(
+        cache.read().values["close_price"][:, 0], [100, 101, 102, 103, 104]
+    )
+    # views opened before are still valid
+    assert before.values["close_price"][1, 0] == 101.0
+
+
+def test_refresh_sees_corrections_stamped_before_it_ran(db, equities, tmp_path):
+    add_closes(db, equities[0], range(3))
+    stamp = db.scalar(select(func.max(EquityEODPrice.updated_at)))
+    cache = HistoryCache(tmp_path)
+    cache.refresh(db)
+    # rows in the overlap that match the cache don't force a rebuild
+    assert cache.refresh(db)["method"] == "append"
+
+    # committed after the refresh by a transaction that started before it
+    db.execute(
+        update(EquityEODPrice)
+        .where(EquityEODPrice.trading_date == DAY)
+        .values(close_price=99.0, updated_at=stamp)
+    )
+    assert cache.refresh(db)["method"] == "rebuild"
+    assert cache.read().values["close_price"][0, 0] == 99.0
+
+
+def test_refresh_rebuilds_for_an_equity_added_while_reading(
+    db, company, equities, tmp_path, monkeypatch
+):
+    add_closes(db, equities[0], range(2))
+    cache = HistoryCache(tmp_path)
+    cache.refresh(db)
+    before = cache._equities(db)
+    other = Equity.create(
+        db, company_id=company.company_id, ticker="SAFC", isin="CI0000000903"
+    )
+    add_closes(db, other, [2])
+
+    # the new equity is only seen once its prices are read
+    reads = iter([before])
+    real = HistoryCache._equities
+    monkeypatch.setattr(
+        HistoryCache, "_equities", lambda self, db: next(reads, None) or real(self, db)
+    )
+    assert cache.refresh(db)["method"] == "rebuild"
+    matrix = cache.read()
+    assert list(matrix.tickers) == ["SGBC", "SIBC", "SAFC"]
+    assert matrix.values["close_price"][2, 2] == 102.0
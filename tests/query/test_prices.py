@@ -0,0 +1,122 @@
+"""Test the columnar price read API"""
+
+import numpy as np
+import pytest
+from datetime import date, datetime, timedelta
+
+from db.instrument import assert_max_statements
+from models.stocks import Equity
+from models.trading import EquityEODPrice
+from query.prices import get_cross_section, get_price_history, to_datetime64
+
+DATES = [date(2024, 1, 2), date(2024, 1, 3), date(2024, 1, 4)]
+
+
+@pytest.fixture
+def prices(db, company):
+    sgbc = Equity.create(db, company_id=company.company_id, ticker="SGBC", isin="CI01")
+    snts = Equity.create(db, company_id=company.company_id, ticker="SNTS", isin="SN01")
+    rows = [
+        {"equity_id": sgbc.equity_id, "trading_date": d, "close_price": 100.0 + i,
+         "volume": 10 * (i + 1)}
+        for i, d in enumerate(DATES)
+    ]
+    # SNTS did not trade on the second day
+    rows += [
+        {"equity_id": snts.equity_id, "trading_date": d, "close_price": 200.0 + i}
+        for i, d in enumerate(DATES) if i != 1
+    ]
+    EquityEODPrice.bulk_create(db, rows)
+
+
+def test_history_long_columns(db, prices):
+    columns = get_price_history(
+        db, ["SGBC"], start=DATES[1], fields=["close_price", "volume"]
+    )
+
+    assert list(columns["ticker"]) == ["SGBC", "SGBC"]
+    assert columns["trading_date"].dtype == np.dtype("datetime64[D]")
+    assert list(columns["close_price"]) == [101.0, 102.0]
+    assert list(columns["volume"]) == [20.0, 30.0]
+
+
+def test_history_wide_matrix(db, prices):
+    matrix = get_price_history(db, wide=True)
+
+    assert list(matrix.tickers) == ["SGBC", "SNTS"]
+    assert len(matrix.dates) == 3
+    close = matrix.values["close_price"]
+    assert close.shape == (3, 2)
+    assert close[0].tolist() == [100.0, 200.0]
+    assert np.isnan(close[1, 1])
+
+
+def test_history_frames(db, prices):
+    wide = get_price_history(db, end=DATES[0], as_frame=True, wide=True)
+    long = get_price_history(db, fields=["close_price", "volume"], as_frame=True)
+
+    assert list(wide.columns) == ["SGBC", "SNTS"]
+    assert wide.loc["2024-01-02", "SNTS"] == 200.0
+    assert len(long) == 5
+    assert long["volume"].isna().sum() == 2
+
+
+def test_reads_run_one_statement(db, prices):
+    with assert_max_statements(1, bind=db.get_bind()):
+        get_price_history(db, ["SNTS"], wide=True)
+    with assert_max_statements(1, bind=db.get_bind()):
+        get_cross_section(db, DATES[0])
+
+
+def test_history_empty(db, prices):
+    columns = get_price_history(db, ["NOPE"])
+
+    assert len(columns["ticker"]) == 0
+    assert columns["close_price"].dtype == np.float64
+
+
+def test_history_unknown_field(db):
+    with pytest.raises(ValueError, match="Unknown price fields"):
+        get_price_history(db, fields=["price"])
+
+
+def test_cross_section(db, prices):
+    columns = get_cross_section(db, DATES[1])
+    frame = get_cross_section(db, DATES[0], as_frame=True)
+
+    assert list(columns["ticker"]) == ["SGBC"]
+    assert list(frame.index) == ["SGBC", "SNTS"]
+    assert frame.loc["SNTS", "close_price"] == 200.0
+
+
+def test_to_datetime64_accepts_strings_and_dates():
+    expected = np.array(["2024-01-02", "2024-01-03"], dtype="datetime64[D]")
+
+    assert (to_datetime64(["2024-01-02", "2024-01-03"]) == expected).all()
+    assert (to_datetime64(DATES[:2]) == expected).all()
+    assert to_datetime64([]).dtype == np.dtype("datetime64[D]")
+
+
+def test_history_as_of_knowledge_time(db, prices):
+    published = datetime(2024, 1, 4, 18, 0)
+    db.query(EquityEODPrice).update({"updated_at": published})
+    sgbc = db.query(Equity).filter_by(ticker="SGBC").one()
+    # a corrected bulletin for the first day
+    EquityEODPrice.correct(
+        db, equity_id=sgbc.equity_id, trading_date=DATES[0], close_price=99.0
+    )
+    corrected_at = db.query(EquityEODPrice.updated_at).filter_by(
+        equity_id=sgbc.equity_id, trading_date=DATES[0]
+    ).scalar()
+
+    def closes(known_at):
+        history = get_price_history(db, ["SGBC"], known_at=known_at)
+        return history["close_price"].tolist()
+
+    assert closes(published - timedelta(hours=1)) == []
+    assert closes(published) == [100.0, 101.0, 102.0]
+    assert closes(corrected_at - timedelta(microseconds=1)) == [100.0, 101.0, 102.0]
+    assert closes(corrected_at) == [99.0, 101.0, 102.0]
+    assert closes(None) == [99.0, 101.0, 102.0]
+    section = get_cross_section(db, DATES[0], ["close_price"], known_at=published)
+    assert section["close_price"].tolist() == [100.0, 200.0]